@@ -1,135 +1,454 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, jsonify
-from flask_sqlalchemy import SQLAlchemy
+from flask import Flask, render_template, request, redirect, url_for, flash, jsonify, make_response, Response, abort, stream_with_context, stream_template, g, has_request_context
 from flask_login import LoginManager, UserMixin, login_user, login_required, logout_user, current_user
-from werkzeug.security import generate_password_hash, check_password_hash
-from sqlalchemy import case
-import os
-from datetime import datetime
+from werkzeug.http import is_resource_modified
 from werkzeug.utils import secure_filename
+from werkzeug.middleware.proxy_fix import ProxyFix
+from sqlalchemy import and_, func, insert, update
+from sqlalchemy.orm import joinedload
+from collections import namedtuple
+import os
+import json
+import hashlib
+import math
+import uuid
+import click
+from datetime import datetime, timezone
+from zoneinfo import ZoneInfo
+from page_cache import LocationCaches, TTLCache
+import compression
+import images
+from upload_store import UploadStore, is_immutable
+import assets
+import locations
+import menu_admin
+import menu_api
+import menu_io
+import menu_bulk
+import menu_search
+import migrations
+import rate_limit
+import static_export
+import db_config
+import metrics
+from jobs import JobQueue
+from change_feed import ChangeFeed, FeedBusy
+from models import db, User, Location, MenuCategory, MenuItem, OpeningHours, BackgroundJob, SpecialOpeningHours, ChangeEvent
+from static_export import Page, StaticExport
+from schedule import Schedule, WEEKDAYS
 
 app = Flask(__name__)
 app.config['SECRET_KEY'] = 'dein-geheimer-schluessel'
-app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///restaurant.db'
+app.config['SQLALCHEMY_DATABASE_URI'] = db_config.database_url()
+app.config['SQLALCHEMY_ENGINE_OPTIONS'] = db_config.engine_options(app.config['SQLALCHEMY_DATABASE_URI'])
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 app.config['UPLOAD_FOLDER'] = 'static/uploads'
+app.config['CONTENT_VERSION_FILE'] = os.path.join(app.instance_path, 'content_version')
+app.config['ASSET_MANIFEST'] = os.path.join(app.static_folder, 'dist', 'manifest.json')
+app.config['TIMEZONE'] = 'Europe/Berlin'
+# Die Speisekarte beim ersten Aufruf nach einer Änderung gestreamt ausliefern
+app.config['STREAM_PAGES'] = os.environ.get('STREAM_PAGES', '1') != '0'
+# Anfragen ab dieser Dauer (ms) werden samt SQL ins Log geschrieben, leer = aus
+app.config['SLOW_REQUEST_MS'] = int(os.environ.get('SLOW_REQUEST_MS', 0)) or None
+# Bearer-Token für /metrics; in Produktion (FLASK_ENV=production) ohne Token kein /metrics
+app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+app.config['PRODUCTION'] = os.environ.get('FLASK_ENV') == 'production'
+# Hochgeladene Originale bis zur Verarbeitung durch den Job process_image
+app.config['PENDING_UPLOAD_FOLDER'] = os.path.join(app.instance_path, 'pending_uploads')
+# Bilddateien, die jünger sind (Sekunden), löscht die Freigabe nicht sofort, weil ein
+# paralleler Upload desselben Bildes sie gerade wiederverwenden kann; das erledigt gc-uploads
+app.config['UPLOAD_RELEASE_MIN_AGE'] = int(os.environ.get('UPLOAD_RELEASE_MIN_AGE', 3600))
+# Threads pro Prozess für Hintergrund-Jobs, 0 = nur über "flask run-jobs"
+app.config['JOB_WORKERS'] = int(os.environ.get('JOB_WORKERS', 1))
+# Suche über SQLite FTS5, falls vorhanden; 0 erzwingt den Index im Speicher
+app.config['MENU_SEARCH_FTS'] = os.environ.get('MENU_SEARCH_FTS', '1') != '0'
+# Ziel von "flask export-static"; ist es gesetzt, wird nach jeder Admin-Änderung neu exportiert
+app.config['STATIC_EXPORT_FOLDER'] = os.environ.get('STATIC_EXPORT_FOLDER')
+# Adresse des Flask-Servers für /api/status und den Admin-Bereich der exportierten Seite
+app.config['STATIC_EXPORT_ORIGIN'] = os.environ.get('STATIC_EXPORT_ORIGIN')
+# Dynamische Antworten ab dieser Größe (Bytes) mit gzip bzw. Brotli komprimieren, 0 = nie
+app.config['COMPRESS_MIN_SIZE'] = int(os.environ.get('COMPRESS_MIN_SIZE', 500))
+app.config['COMPRESS_LEVEL'] = 6
+app.config['COMPRESS_BROTLI_QUALITY'] = 4
+# Live-Verbindungen auf /events: gleichzeitig pro Worker (jede belegt einen Thread),
+# Abfrageintervall für Änderungen anderer Worker und Höchstdauer bis zum Neuverbinden
+app.config['EVENTS_MAX_CLIENTS'] = int(os.environ.get('EVENTS_MAX_CLIENTS', 2))
+app.config['EVENTS_POLL_INTERVAL'] = float(os.environ.get('EVENTS_POLL_INTERVAL', 1))
+app.config['EVENTS_MAX_AGE'] = int(os.environ.get('EVENTS_MAX_AGE', 300))
+# Anzahl vorgeschalteter Proxys (z.B. 1 bei Render), deren X-Forwarded-For vertraut wird
+app.config['PROXY_COUNT'] = int(os.environ.get('PROXY_COUNT', 0))
+# Angemeldete Benutzer so viele Sekunden pro Worker zwischenspeichern
+app.config['USER_CACHE_TTL'] = float(os.environ.get('USER_CACHE_TTL', 30))
+# Anmeldeversuche als "Anzahl/Sekunden" je IP-Adresse und je Benutzername
+app.config['LOGIN_LIMIT_IP'] = rate_limit.parse_limit(os.environ.get('LOGIN_LIMIT_IP', '10/60'))
+app.config['LOGIN_LIMIT_USER'] = rate_limit.parse_limit(os.environ.get('LOGIN_LIMIT_USER', '20/300'))
+app.config['RATE_LIMIT_FOLDER'] = os.path.join(app.instance_path, 'rate_limit')
+# Slug des Standorts für Anfragen ohne passenden Hostnamen oder Pfadpräfix, leer = der älteste
+app.config['DEFAULT_LOCATION'] = os.environ.get('DEFAULT_LOCATION')
+# So lange (Sekunden) kennt ein Worker neue Standorte womöglich noch nicht
+app.config['LOCATION_CACHE_TTL'] = float(os.environ.get('LOCATION_CACHE_TTL', 60))
+
+# Jede Anfrage erhält ihren Standort aus dem Pfadpräfix /<slug> oder dem Hostnamen
+location_registry = locations.LocationRegistry(app, db, Location, app.config['DEFAULT_LOCATION'],
+                                               ttl=app.config['LOCATION_CACHE_TTL'])
+app.wsgi_app = locations.LocationMiddleware(app.wsgi_app, location_registry)
+
+if app.config['PROXY_COUNT']:
+    # Sonst sähe die Drosselung nur die Adresse des Proxys
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_COUNT'])
 
 # Stelle sicher, dass der Upload-Ordner existiert
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 
-db = SQLAlchemy(app)
+# Gerenderte öffentliche Seiten, serialisierte Speisekarte und fertig kodierte
+# API-Antworten werden pro Worker und Standort zwischengespeichert und über
+# den Versionsstempel des Standorts invalidiert
+location_caches = LocationCaches(app.config['CONTENT_VERSION_FILE'])
+
+# Hochgeladene Bilder werden nach ihrem Inhalt benannt und nur einmal gespeichert
+upload_store = UploadStore(app.config['UPLOAD_FOLDER'])
+
+# Zuordnung style.css -> dist/style.<hash>.css, erzeugt mit "flask build-assets"
+asset_manifest = assets.load_manifest(app.config['ASSET_MANIFEST'])
+
+@app.url_defaults
+def fingerprinted_static(endpoint, values):
+    # url_for('static', filename='style.css') liefert die gebaute Datei, falls vorhanden
+    if endpoint == 'static' and 'filename' in values:
+        values['filename'] = asset_manifest.get(values['filename'], values['filename'])
+
+db.init_app(app)
+with app.app_context():
+    # WAL, busy_timeout usw. für jede SQLite-Verbindung
+    db_config.configure_sqlite(db.engine)
+    metrics.init_app(app, db.engine)
+# Nach metrics registriert und damit vorher ausgeführt: /metrics sieht die gesendeten Bytes
+response_compression = compression.Compression(app)
 login_manager = LoginManager(app)
 login_manager.login_view = 'login'
+user_cache = TTLCache(app.config['USER_CACHE_TTL'])
+# Token-Buckets in Dateien unter instance/, die sich alle Worker per mmap teilen
+login_limiter = rate_limit.LoginLimiter(app.config['RATE_LIMIT_FOLDER'], app.config['LOGIN_LIMIT_IP'],
+                                        app.config['LOGIN_LIMIT_USER'])
+
+job_queue = JobQueue(app, db, BackgroundJob, workers=app.config['JOB_WORKERS'])
+
+def current_location():
+    # Aus der Anfrage (Pfadpräfix oder Hostname), in CLI-Befehlen aus g (--location), sonst der Standard
+    if has_request_context() and locations.ENVIRON_KEY in request.environ:
+        return request.environ[locations.ENVIRON_KEY]
+    return g.get('location') or location_registry.default()
+
+def current_location_id():
+    location = current_location()
+    return location.id if location else None
+
+def caches(location_id=None):
+    # Versionsstempel, Seiten- und API-Cache des aktuellen oder des angegebenen Standorts, in
+    # einer Anfrage für deren Pfadpräfix (gleicher Standort über Hostname oder /<slug>/)
+    if location_id is not None:
+        return location_caches.get(location_id)
+    return location_caches.get(current_location_id(), request.script_root if has_request_context() else '')
+
+@app.context_processor
+def inject_location():
+    return {'location': current_location(), 'locations': location_registry.all()}
+
+# Jede Änderung an diesen Modellen landet mit den genannten Feldern im Änderungsprotokoll
+CHANGE_FEED_MODELS = {
+    MenuItem: ('menu_item', ('category_id', 'name', 'description', 'price', 'vegetarian', 'vegan', 'spicy')),
+    MenuCategory: ('menu_category', ('name', 'display_name', 'order', 'is_drink_category')),
+    OpeningHours: ('opening_hours', ('day', 'weekday', 'closed', 'open_time_1', 'close_time_1',
+                                     'open_time_2', 'close_time_2')),
+    SpecialOpeningHours: ('special_opening_hours', ('date', 'note', 'closed', 'open_time_1', 'close_time_1',
+                                                    'open_time_2', 'close_time_2')),
+}
+change_feed = ChangeFeed(app, db, ChangeEvent, CHANGE_FEED_MODELS, poll_interval=app.config['EVENTS_POLL_INTERVAL'],
+                         max_clients=app.config['EVENTS_MAX_CLIENTS'], max_age=app.config['EVENTS_MAX_AGE'],
+                         location=current_location_id)
+
+# Vorgruppierte Speisekarte: Kategorien in Anzeigereihenfolge, jeweils mit ihren Gerichten
+MenuSnapshot = namedtuple('MenuSnapshot', ['categories', 'food_categories', 'drink_categories'])
+
+def build_menu_snapshot():
+    # Eine einzige Abfrage lädt alle Kategorien des Standorts samt Gerichten,
+    # die Templates iterieren danach nur noch über category.items
+    categories = MenuCategory.query.options(
+        joinedload(MenuCategory.items)
+    ).filter(MenuCategory.location_id == current_location_id()).order_by(MenuCategory.order).all()
+    return MenuSnapshot(
+        categories=categories,
+        food_categories=[c for c in categories if not c.is_drink_category],
+        drink_categories=[c for c in categories if c.is_drink_category]
+    )
+
+# Kategorie mit einem Iterator über ihre Gerichte, für das gestreamte Rendern
+MenuSection = namedtuple('MenuSection', ['id', 'name', 'display_name', 'items'])
+
+def menu_sections():
+    # Wie build_menu_snapshot, aber Speisen und Getränke sind Generatoren über MenuSection. Kategorien und
+    # Gerichte kommen aus je einer Abfrage; die Gerichte werden blockweise in
+    # Anzeigereihenfolge gelesen, so dass nie die ganze Karte im Speicher liegt
+    is_drink = func.coalesce(MenuCategory.is_drink_category, False)
+    location_id = current_location_id()
+    categories = MenuCategory.query.filter(MenuCategory.location_id == location_id).order_by(
+        is_drink, MenuCategory.order, MenuCategory.id).all()
+    position = {category.id: index for index, category in enumerate(categories)}
+    items = iter(db.session.scalars(
+        db.select(MenuItem).join(MenuCategory, MenuItem.category_id == MenuCategory.id)
+        .where(MenuCategory.location_id == location_id)
+        .order_by(is_drink, MenuCategory.order, MenuCategory.id, MenuItem.id)
+        .execution_options(yield_per=200)
+    ))
+    upcoming = None
+    started = False
+
+    def category_items(category_id):
+        nonlocal upcoming, started
+        if not started:
+            upcoming, started = next(items, None), True
+        # Gerichte übersprungener Kategorien überlesen
+        while upcoming is not None and position[upcoming.category_id] < position[category_id]:
+            upcoming = next(items, None)
+        while upcoming is not None and upcoming.category_id == category_id:
+            item, upcoming = upcoming, next(items, None)
+            yield item
+
+    def sections(drinks):
+        for category in categories:
+            if bool(category.is_drink_category) == drinks:
+                yield MenuSection(category.id, category.name, category.display_name, category_items(category.id))
+
+    return MenuSnapshot(categories, sections(False), sections(True))
+
+def opening_hours_in_week_order():
+    return OpeningHours.query.filter_by(location_id=current_location_id()).order_by(OpeningHours.weekday).all()
 
-# Models
-class User(UserMixin, db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(120), nullable=False)
-
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
-class MenuCategory(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(50), unique=True, nullable=False)
-    display_name = db.Column(db.String(50), nullable=False)
-    order = db.Column(db.Integer, nullable=False)
-    is_drink_category = db.Column(db.Boolean, default=False)
-    items = db.relationship('MenuItem', backref='category', lazy=True)
-
-class MenuItem(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text)
-    price = db.Column(db.Float, nullable=False)
-    category_id = db.Column(db.Integer, db.ForeignKey('menu_category.id'), nullable=False)
-    vegetarian = db.Column(db.Boolean, default=False)
-    vegan = db.Column(db.Boolean, default=False)
-    spicy = db.Column(db.Boolean, default=False)
-    image_path = db.Column(db.String(255))
-
-class OpeningHours(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    day = db.Column(db.String(20), nullable=False)
-    open_time_1 = db.Column(db.String(5))
-    close_time_1 = db.Column(db.String(5))
-    open_time_2 = db.Column(db.String(5))
-    close_time_2 = db.Column(db.String(5))
-    closed = db.Column(db.Boolean, default=False)
+def upcoming_special_hours():
+    today = datetime.now(ZoneInfo(app.config['TIMEZONE'])).date()
+    return SpecialOpeningHours.query.filter(
+        SpecialOpeningHours.location_id == current_location_id(),
+        SpecialOpeningHours.date >= today
+    ).order_by(SpecialOpeningHours.date).all()
+
+class SessionUser(UserMixin):
+    # Angemeldeter Benutzer ohne Bindung an eine Session, damit er anfrageübergreifend im Cache liegen kann
+    def __init__(self, user):
+        self.id = user.id
+        self.username = user.username
 
 @login_manager.user_loader
 def load_user(user_id):
-    return User.query.get(int(user_id))
+    loaded = []
+
+    def load():
+        user = db.session.get(User, int(user_id))
+        loaded.append(user)
+        return SessionUser(user) if user else None
+
+    user = user_cache.get_or_load(int(user_id), load)
+    metrics.record_cache('users', not loaded)
+    return user
+
+def seed_location(location_id):
+    # Standard-Kategorien und -Öffnungszeiten für einen neuen Standort
+    categories = [
+        MenuCategory(name='vorspeisen', display_name='Vorspeisen', order=1),
+        MenuCategory(name='hauptgerichte', display_name='Hauptgerichte', order=2),
+        MenuCategory(name='desserts', display_name='Desserts', order=3),
+        MenuCategory(name='getraenke', display_name='Getränke', order=4, is_drink_category=True)
+    ]
+    opening_hours = [
+        OpeningHours(day='Montag', weekday=0, closed=True),
+        OpeningHours(day='Dienstag', weekday=1, open_time_1='11:30', close_time_1='14:30'),
+        OpeningHours(day='Mittwoch', weekday=2, open_time_1='11:30', close_time_1='14:30'),
+        OpeningHours(day='Donnerstag', weekday=3, open_time_1='11:30', close_time_1='14:30'),
+        OpeningHours(day='Freitag', weekday=4, open_time_1='11:30', close_time_1='14:30'),
+        OpeningHours(day='Samstag', weekday=5, open_time_1='17:00', close_time_1='22:00'),
+        OpeningHours(day='Sonntag', weekday=6, open_time_1='11:30', close_time_1='14:30')
+    ]
+    for row in categories + opening_hours:
+        row.location_id = location_id
+    db.session.add_all(categories + opening_hours)
 
 def init_db():
-    # Create tables
-    db.create_all()
+    # Tabellen, Spalten, Indizes und Suchindex über die versionierten Migrationen anlegen;
+    # Migration 8 legt dabei auch den ersten Standort an
+    migrations.upgrade(db.engine)
+    location_registry.refresh()
     
     # Check if admin user exists
     if not User.query.filter_by(username='admin').first():
         admin = User(username='admin')
         admin.set_password('admin')
         db.session.add(admin)
-        
-        # Add default categories
-        categories = [
-            MenuCategory(name='vorspeisen', display_name='Vorspeisen', order=1),
-            MenuCategory(name='hauptgerichte', display_name='Hauptgerichte', order=2),
-            MenuCategory(name='desserts', display_name='Desserts', order=3),
-            MenuCategory(name='getraenke', display_name='Getränke', order=4, is_drink_category=True)
-        ]
-        db.session.add_all(categories)
-        
-        # Add default opening hours
-        opening_hours = [
-            OpeningHours(day='Montag', closed=True),
-            OpeningHours(day='Dienstag', open_time_1='11:30', close_time_1='14:30'),
-            OpeningHours(day='Mittwoch', open_time_1='11:30', close_time_1='14:30'),
-            OpeningHours(day='Donnerstag', open_time_1='11:30', close_time_1='14:30'),
-            OpeningHours(day='Freitag', open_time_1='11:30', close_time_1='14:30'),
-            OpeningHours(day='Samstag', open_time_1='17:00', close_time_1='22:00'),
-            OpeningHours(day='Sonntag', open_time_1='11:30', close_time_1='14:30')
-        ]
-        db.session.add_all(opening_hours)
-        
+        seed_location(location_registry.default().id)
         db.session.commit()
 
+def save_uploaded_image(file):
+    # Speichert nur die verkleinerten Varianten ohne Metadaten, nicht das Original
+    variants = upload_store.save(file)
+    return variants['src'], json.dumps(variants)
+
+def release_uploaded_image(image_path, image_variants):
+    # Nach dem Commit aufrufen: Dateien werden nur gelöscht, wenn kein Gericht
+    # mehr auf dasselbe Bild verweist, an keinem Standort, und save() sie nicht
+    # gerade für einen noch nicht committeten Upload wiederverwendet hat
+    if not image_path:
+        return
+    if MenuItem.query.filter_by(image_path=image_path).count() == 0:
+        upload_store.remove(image_path, json.loads(image_variants) if image_variants else None,
+                            min_age=app.config['UPLOAD_RELEASE_MIN_AGE'])
+
+def stash_upload(file):
+    # Nur prüfen und unverändert ablegen; die Varianten erzeugt der Job process_image
+    images.verify(file.stream)
+    file.stream.seek(0)
+    os.makedirs(app.config['PENDING_UPLOAD_FOLDER'], exist_ok=True)
+    name = uuid.uuid4().hex + os.path.splitext(file.filename)[1].lower()
+    file.save(os.path.join(app.config['PENDING_UPLOAD_FOLDER'], name))
+    return name
+
+def discard_upload(name):
+    if name:
+        try:
+            os.remove(os.path.join(app.config['PENDING_UPLOAD_FOLDER'], name))
+        except FileNotFoundError:
+            pass
+
+def enqueue_image(menu_item, upload):
+    # Der key sorgt dafür, dass bei mehreren Uploads nur der neueste übernommen wird
+    job_queue.enqueue('process_image', {'item_id': menu_item.id, 'upload': upload},
+                      key=f'menu_item:{menu_item.id}:image')
+
+@job_queue.task('process_image')
+def process_image_job(payload, job):
+    menu_item = db.session.get(MenuItem, payload['item_id'])
+    if menu_item is None or job_queue.superseded(job):
+        # Gericht gelöscht oder inzwischen ein neueres Bild hochgeladen
+        discard_upload(payload['upload'])
+        return
+    with open(os.path.join(app.config['PENDING_UPLOAD_FOLDER'], payload['upload']), 'rb') as f:
+        image_path, image_variants = save_uploaded_image(f)
+    old_image = (menu_item.image_path, menu_item.image_variants)
+    menu_item.image_path, menu_item.image_variants = image_path, image_variants
+    db.session.commit()
+    content_changed(menu_item.location_id)
+    if old_image[0] != image_path:
+        release_uploaded_image(*old_image)
+    discard_upload(payload['upload'])
+
+@job_queue.task('release_image')
+def release_image_job(payload, job):
+    release_uploaded_image(payload['image_path'], payload['image_variants'])
+
+def report_admin_error():
+    # Abgefangene Fehler landen im Log und in /metrics, nicht nur in der Flash-Meldung
+    app.logger.exception('Fehler in %s', request.endpoint)
+    metrics.record_handled_error()
+
+def content_changed(location_id=None):
+    # Nach jedem Commit an Speisekarte oder Öffnungszeiten aufrufen; verwirft nur die
+    # Caches dieses Standorts (ohne Angabe der aktuelle)
+    caches(location_id).version.bump()
+    if app.config['STATIC_EXPORT_FOLDER']:
+        schedule_static_export()
+
+def release_fingerprint():
+    # Templates und Assets gehören zum Validator, damit ein Deploy ohne
+    # Inhaltsänderung keine veralteten Seiten aus Browser-Caches bestätigt
+    digest = hashlib.sha1(json.dumps(asset_manifest, sort_keys=True).encode())
+    newest = 0
+    for root, _, files in sorted(os.walk(app.template_folder)):
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                digest.update(f.read())
+            newest = max(newest, os.path.getmtime(path))
+    return digest.hexdigest(), newest
+
+RELEASE_ID, RELEASE_MTIME = release_fingerprint()
+
+def cached_page(key, render, stream=None):
+    # Antwortet mit 304, bevor eine Abfrage oder ein Template ausgeführt wird.
+    # Mit stream wird eine nicht gespeicherte Seite sofort stückweise gesendet
+    # und dabei für die folgenden Aufrufe im Cache abgelegt.
+    scope = caches()
+    version, modified = scope.version.stamp()
+    etag = hashlib.sha1(f'{RELEASE_ID}:{current_location_id()}{request.script_root}:{version}:{key}'.encode()
+                        ).hexdigest()[:24]
+    last_modified = datetime.fromtimestamp(int(max(modified, RELEASE_MTIME)), timezone.utc)
+
+    if not is_resource_modified(request.environ, etag=etag, last_modified=last_modified):
+        response = Response(status=304)
+    else:
+        html = scope.pages.get(key, version)
+        metrics.record_cache('pages', html is not None)
+        if html is None and stream and app.config['STREAM_PAGES']:
+            response = Response(scope.pages.stream(key, stream(), version), mimetype='text/html')
+            response.headers['X-Cache'] = 'STREAM'
+        elif html is None:
+            html = render()
+            scope.pages.put(key, html, version)
+            response = make_response(html)
+            response.headers['X-Cache'] = 'MISS'
+        else:
+            response = make_response(html)
+            response.headers['X-Cache'] = 'HIT'
+    response.set_etag(etag)
+    response.last_modified = last_modified
+    # Darf gespeichert werden, muss aber jedes Mal revalidiert werden
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+@app.before_request
+def start_job_queue():
+    # Einmal pro Prozess, auch nach dem fork der gunicorn-Worker
+    job_queue.start()
+
+@app.after_request
+def cache_immutable_static(response):
+    # Inhaltsadressierte Dateien ändern sich nie und dürfen unbegrenzt gecacht werden
+    if (request.endpoint == 'static' and response.status_code == 200
+            and (is_immutable(request.path) or assets.is_fingerprinted(request.path))):
+        response.cache_control.no_cache = None
+        response.cache_control.public = True
+        response.cache_control.max_age = 31536000
+        response.cache_control.immutable = True
+    return response
+
 @app.route('/')
 def index():
-    try:
-        categories = MenuCategory.query.order_by(MenuCategory.order).all()
-        menu_items = MenuItem.query.all()
-        opening_hours = OpeningHours.query.order_by(
-            case(
-                (OpeningHours.day == 'Montag', 1),
-                (OpeningHours.day == 'Dienstag', 2),
-                (OpeningHours.day == 'Mittwoch', 3),
-                (OpeningHours.day == 'Donnerstag', 4),
-                (OpeningHours.day == 'Freitag', 5),
-                (OpeningHours.day == 'Samstag', 6),
-                (OpeningHours.day == 'Sonntag', 7)
-            )
-        ).all()
-        return render_template('index.html', categories=categories, menu_items=menu_items, opening_hours=opening_hours)
-    except Exception as e:
-        print(f"Fehler auf der Homepage: {str(e)}")
-        init_db()  # Initialisiere die Datenbank falls sie nicht existiert
-        return redirect(url_for('index'))
+    return cached_page('index', render_index)
+
+def render_index():
+    opening_hours = opening_hours_in_week_order()
+    return render_template('index.html', opening_hours=opening_hours)
 
 @app.route('/login', methods=['GET', 'POST'])
 def login():
     if request.method == 'POST':
         username = request.form.get('username')
         password = request.form.get('password')
+        # Vor Datenbankabfrage und Passwort-Hashing, damit Angriffe keine Rechenzeit binden
+        decision = login_limiter.check(request.remote_addr, username)
+        if not decision.allowed:
+            metrics.record_login(f'throttled_{decision.scope}')
+            retry_after = math.ceil(decision.retry_after)
+            flash(f'Zu viele Anmeldeversuche. Bitte in {retry_after} Sekunden erneut versuchen.')
+            response = make_response(render_template('login.html'), 429)
+            response.headers['Retry-After'] = str(retry_after)
+            return response
+
         user = User.query.filter_by(username=username).first()
         
         if user and user.check_password(password):
-            login_user(user)
+            metrics.record_login('success')
+            login_limiter.succeeded(username)
+            login_user(SessionUser(user))
             return redirect(url_for('admin'))
         else:
+            metrics.record_login('failure')
             flash('Ungültige Anmeldedaten')
     
     return render_template('login.html')
@@ -139,111 +458,306 @@ def login():
 def admin():
     return render_template('admin/index.html')
 
+def admin_category_order():
+    # Kategorie-ids des Standorts in der Reihenfolge der Karte (Speisen vor Getränken), neu nur nach Änderungen
+    is_drink = func.coalesce(MenuCategory.is_drink_category, False)
+    order, _ = caches().api.get_or_render('admin-category-order', lambda: [
+        category_id for category_id, in db.session.query(MenuCategory.id).filter(
+            MenuCategory.location_id == current_location_id()).order_by(is_drink, MenuCategory.order, MenuCategory.id)])
+    return order
+
+def location_category_id(value, current=None):
+    # Kategorie aus einem Formular; nur Kategorien des aktuellen Standorts (oder die bisherige) sind erlaubt
+    category_id = int(value)
+    if category_id != current and category_id not in admin_category_order():
+        raise ValueError('Unbekannte Kategorie')
+    return category_id
+
+def location_item_or_404(id):
+    return MenuItem.query.filter_by(id=id, location_id=current_location_id()).first_or_404()
+
+def wants_json():
+    # admin_menu.js fragt per fetch nach JSON, ein gewöhnliches Formular nach HTML
+    return request.accept_mimetypes.best == 'application/json'
+
+def admin_menu_result(message, item=None, status=200):
+    # Für admin_menu.js nur die geänderte Zeile, sonst wie bisher Meldung und zurück zur Liste
+    if wants_json():
+        return jsonify(message=message, item=item), status
+    flash(message)
+    return redirect(url_for('admin_menu'))
+
+def admin_menu_error(message):
+    if wants_json():
+        return jsonify(error=message), 400
+    flash(message)
+    return redirect(url_for('admin_menu'))
+
 @app.route('/admin/menu')
 @login_required
 def admin_menu():
-    categories = MenuCategory.query.order_by(MenuCategory.order).all()
-    menu_items = MenuItem.query.all()
-    return render_template('admin/menu.html', categories=categories, menu_items=menu_items)
+    # Nur die Kategorien für Auswahllisten; die Menüpunkte lädt admin_menu.js seitenweise
+    is_drink = func.coalesce(MenuCategory.is_drink_category, False)
+    categories = MenuCategory.query.filter(MenuCategory.location_id == current_location_id()).order_by(
+        is_drink, MenuCategory.order, MenuCategory.id).all()
+    return render_template('admin/menu.html', categories=categories, page_size=menu_admin.DEFAULT_LIMIT)
+
+@app.route('/admin/api/menu/items')
+@login_required
+def admin_api_menu_items():
+    try:
+        query = menu_admin.parse(request.args, set(admin_category_order()))
+    except ValueError as e:
+        abort(make_response(jsonify(error=str(e)), 400))
+    page = menu_admin.list_items(db.session, MenuItem, MenuCategory, query,
+                                 fts=menu_search_backend() == 'fts', location_id=current_location_id())
+    return jsonify(items=page.items, next=page.next, total=page.total)
 
 @app.route('/admin/menu/add', methods=['POST'])
 @login_required
 def admin_menu_add():
+    upload = None
     try:
         name = request.form.get('name')
         description = request.form.get('description')
         price = float(request.form.get('price'))
-        category_id = int(request.form.get('category'))
+        category_id = location_category_id(request.form.get('category'))
         vegetarian = bool(request.form.get('vegetarian'))
         vegan = bool(request.form.get('vegan'))
         spicy = bool(request.form.get('spicy'))
         
         image = request.files.get('image')
-        image_path = None
         if image and image.filename:
-            filename = secure_filename(image.filename)
-            image_path = os.path.join('uploads', filename)
-            image.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
+            upload = stash_upload(image)
         
         menu_item = MenuItem(
             name=name,
             description=description,
             price=price,
             category_id=category_id,
+            location_id=current_location_id(),
             vegetarian=vegetarian,
             vegan=vegan,
-            spicy=spicy,
-            image_path=image_path
+            spicy=spicy
         )
         
         db.session.add(menu_item)
+        db.session.flush()
+        if upload:
+            enqueue_image(menu_item, upload)
+        # Vor dem Commit serialisieren, danach wären die Attribute abgelaufen und neu zu laden
+        row = menu_admin.serialize_row(menu_item)
         db.session.commit()
-        
-        flash('Menüpunkt erfolgreich hinzugefügt')
+        content_changed()
     except Exception as e:
-        flash(f'Fehler beim Hinzufügen des Menüpunkts: {str(e)}')
+        db.session.rollback()
+        discard_upload(upload)
+        report_admin_error()
+        return admin_menu_error(f'Fehler beim Hinzufügen des Menüpunkts: {str(e)}')
     
-    return redirect(url_for('admin_menu'))
+    return admin_menu_result('Menüpunkt erfolgreich hinzugefügt' +
+                             (', das Bild wird im Hintergrund verarbeitet' if upload else ''), row, 201)
 
 @app.route('/admin/menu/edit/<int:id>', methods=['POST'])
 @login_required
 def admin_menu_edit(id):
+    upload = None
     try:
-        menu_item = MenuItem.query.get_or_404(id)
+        menu_item = location_item_or_404(id)
         
         menu_item.name = request.form.get('name')
         menu_item.description = request.form.get('description')
         menu_item.price = float(request.form.get('price'))
-        menu_item.category_id = int(request.form.get('category'))
+        menu_item.category_id = location_category_id(request.form.get('category'), menu_item.category_id)
         menu_item.vegetarian = bool(request.form.get('vegetarian'))
         menu_item.vegan = bool(request.form.get('vegan'))
         menu_item.spicy = bool(request.form.get('spicy'))
         
         image = request.files.get('image')
         if image and image.filename:
-            # Altes Bild löschen
-            if menu_item.image_path:
-                old_image_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(menu_item.image_path))
-                if os.path.exists(old_image_path):
-                    os.remove(old_image_path)
-            
-            # Neues Bild speichern
-            filename = secure_filename(image.filename)
-            image_path = os.path.join('uploads', filename)
-            image.save(os.path.join(app.config['UPLOAD_FOLDER'], filename))
-            menu_item.image_path = image_path
+            # Das bisherige Bild bleibt sichtbar, bis das neue verarbeitet ist
+            upload = stash_upload(image)
+            enqueue_image(menu_item, upload)
         
+        row = menu_admin.serialize_row(menu_item)
         db.session.commit()
-        flash('Menüpunkt erfolgreich aktualisiert')
+        content_changed()
     except Exception as e:
-        flash(f'Fehler beim Aktualisieren des Menüpunkts: {str(e)}')
+        db.session.rollback()
+        discard_upload(upload)
+        report_admin_error()
+        return admin_menu_error(f'Fehler beim Aktualisieren des Menüpunkts: {str(e)}')
     
-    return redirect(url_for('admin_menu'))
+    return admin_menu_result('Menüpunkt erfolgreich aktualisiert' +
+                             (', das Bild wird im Hintergrund verarbeitet' if upload else ''), row)
 
-@app.route('/admin/menu/delete/<int:id>')
+@app.route('/admin/menu/delete/<int:id>', methods=['GET', 'POST'])
 @login_required
 def admin_menu_delete(id):
     try:
-        menu_item = MenuItem.query.get_or_404(id)
+        menu_item = location_item_or_404(id)
         
-        # Bild löschen wenn vorhanden
         if menu_item.image_path:
-            image_path = os.path.join(app.config['UPLOAD_FOLDER'], os.path.basename(menu_item.image_path))
-            if os.path.exists(image_path):
-                os.remove(image_path)
-        
+            # Bild samt Varianten löschen, sofern es nicht noch anderswo verwendet wird
+            job_queue.enqueue('release_image', {'image_path': menu_item.image_path,
+                                                'image_variants': menu_item.image_variants})
         db.session.delete(menu_item)
         db.session.commit()
-        flash('Menüpunkt erfolgreich gelöscht')
+        content_changed()
     except Exception as e:
-        flash(f'Fehler beim Löschen des Menüpunkts: {str(e)}')
+        report_admin_error()
+        return admin_menu_error(f'Fehler beim Löschen des Menüpunkts: {str(e)}')
     
+    return admin_menu_result('Menüpunkt erfolgreich gelöscht', {'id': id})
+
+def menu_import_plan(stream, fmt):
+    # Kategorien über Name oder Anzeigename, Bestand über (Kategorie, Name) - je eine Abfrage
+    location_id = current_location_id()
+    categories = {}
+    for category in MenuCategory.query.filter_by(location_id=location_id):
+        categories[category.display_name.lower()] = category.id
+        categories[category.name.lower()] = category.id
+    existing = {}
+    columns = (MenuItem.id, MenuItem.category_id, MenuItem.name) + tuple(
+        getattr(MenuItem, field) for field in menu_io.UPDATABLE)
+    for row in db.session.query(*columns).filter(MenuItem.location_id == location_id):
+        current = dict(zip(('id', 'category_id', 'name') + menu_io.UPDATABLE, row))
+        current['price'] = round(current['price'], 2)
+        for flag in menu_io.FLAGS:
+            current[flag] = bool(current[flag])
+        existing[(current['category_id'], current['name'])] = current
+    return menu_io.plan(menu_io.read_rows(stream, fmt), categories, existing)
+
+def apply_menu_import(plan):
+    # Alles in einer Transaktion: ein Mehrfach-INSERT und ein UPDATE über die Primärschlüssel
+    if plan.inserts:
+        location_id = current_location_id()
+        db.session.execute(insert(MenuItem), [dict(row, location_id=location_id) for row in plan.inserts])
+    if plan.updates:
+        db.session.execute(update(MenuItem), [dict(row, id=item_id) for item_id, row, _ in plan.updates])
+    db.session.commit()
+    content_changed()
+
+def menu_export_rows():
+    query = db.session.query(
+        MenuCategory.name, MenuItem.name, MenuItem.description, MenuItem.price,
+        MenuItem.vegetarian, MenuItem.vegan, MenuItem.spicy
+    ).join(MenuCategory, MenuItem.category_id == MenuCategory.id).filter(
+        MenuCategory.location_id == current_location_id()
+    ).order_by(
+        MenuCategory.order, MenuItem.id
+    ).execution_options(yield_per=1000)
+    for row in query:
+        yield dict(zip(menu_io.COLUMNS, row))
+
+@app.route('/admin/menu/export')
+@login_required
+def admin_menu_export():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in menu_io.FORMATS:
+        abort(400)
+    filename = f"speisekarte-{datetime.now().strftime('%Y-%m-%d')}.{fmt}"
+    return Response(stream_with_context(menu_io.export(menu_export_rows(), fmt)),
+                    mimetype=menu_io.FORMATS[fmt],
+                    headers={'Content-Disposition': f'attachment; filename={filename}'})
+
+@app.route('/admin/menu/import', methods=['GET', 'POST'])
+@login_required
+def admin_menu_import():
+    if request.method == 'GET':
+        return render_template('admin/menu_import.html', plan=None)
+
+    upload = request.files.get('file')
+    if not upload or not upload.filename:
+        flash('Bitte eine CSV- oder JSON-Datei auswählen', 'error')
+        return redirect(url_for('admin_menu_import'))
+    dry_run = request.form.get('dry_run') == 'on'
+    try:
+        fmt = menu_io.detect_format(upload.filename, request.form.get('format') or None)
+        plan = menu_import_plan(upload.stream, fmt)
+        if plan.errors or dry_run:
+            category_names = location_category_names()
+            return render_template('admin/menu_import.html', plan=plan, dry_run=dry_run,
+                                   filename=upload.filename, category_names=category_names)
+        apply_menu_import(plan)
+        flash(f'Import abgeschlossen: {len(plan.inserts)} neu, {len(plan.updates)} geändert, '
+              f'{plan.unchanged} unverändert', 'success')
+    except Exception as e:
+        db.session.rollback()
+        report_admin_error()
+        flash(f'Fehler beim Importieren der Speisekarte: {str(e)}', 'error')
+        return redirect(url_for('admin_menu_import'))
+
+    return redirect(url_for('admin_menu'))
+
+# Höchstens so viele Zeilen zeigt die Vorschau einer Sammeländerung
+BULK_PREVIEW_LIMIT = 200
+
+def location_category_names():
+    return {category.id: category.display_name
+            for category in MenuCategory.query.filter_by(location_id=current_location_id())}
+
+def parse_bulk_operation():
+    return menu_bulk.parse(request.form, set(admin_category_order()))
+
+def bulk_condition(operation):
+    # Auch "ganze Karte" meint nur die Karte des aktuellen Standorts
+    return and_(MenuItem.location_id == current_location_id(), menu_bulk.condition(MenuItem, operation))
+
+@app.route('/admin/menu/bulk/preview', methods=['POST'])
+@login_required
+def admin_menu_bulk_preview():
+    try:
+        operation = parse_bulk_operation()
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_menu'))
+
+    # Dieselben Ausdrücke wie beim UPDATE, nur als SELECT: alt und neu nebeneinander
+    condition = bulk_condition(operation)
+    values = menu_bulk.assignments(MenuItem, operation)
+    columns = []
+    for column, expression in values.items():
+        columns += [getattr(MenuItem, column).label(f'{column}_old'), expression.label(f'{column}_new')]
+    total = db.session.query(func.count(MenuItem.id)).filter(condition).scalar()
+    rows = db.session.query(MenuItem.name, MenuItem.category_id, *columns).filter(condition).order_by(
+        MenuItem.category_id, MenuItem.id
+    ).limit(BULK_PREVIEW_LIMIT).all()
+    category_names = location_category_names()
+    return render_template('admin/menu_bulk.html', operation=operation, columns=list(values), rows=rows,
+                           total=total, category_names=category_names, form=request.form)
+
+@app.route('/admin/menu/bulk', methods=['POST'])
+@login_required
+def admin_menu_bulk():
+    try:
+        operation = parse_bulk_operation()
+    except ValueError as e:
+        flash(str(e), 'error')
+        return redirect(url_for('admin_menu'))
+
+    try:
+        # Ein einziges UPDATE für alle betroffenen Gerichte, auch für die ganze Karte
+        result = db.session.execute(
+            update(MenuItem)
+            .where(bulk_condition(operation))
+            .values(menu_bulk.assignments(MenuItem, operation))
+            .execution_options(synchronize_session=False)
+        )
+        db.session.commit()
+        content_changed()
+        flash(f'{result.rowcount} Menüpunkte geändert', 'success')
+    except Exception as e:
+        db.session.rollback()
+        report_admin_error()
+        flash(f'Fehler bei der Sammeländerung: {str(e)}', 'error')
+
     return redirect(url_for('admin_menu'))
 
 @app.route('/admin/categories')
 @login_required
 def admin_categories():
-    categories = MenuCategory.query.order_by(MenuCategory.order).all()
+    categories = MenuCategory.query.filter_by(location_id=current_location_id()).order_by(MenuCategory.order).all()
     return render_template('admin/categories.html', categories=categories)
 
 @app.route('/admin/categories/add', methods=['POST'])
@@ -259,13 +773,16 @@ def admin_add_category():
             name=name,
             display_name=display_name,
             order=order,
-            is_drink_category=is_drink_category
+            is_drink_category=is_drink_category,
+            location_id=current_location_id()
         )
         
         db.session.add(category)
         db.session.commit()
+        content_changed()
         flash('Kategorie erfolgreich hinzugefügt', 'success')
     except Exception as e:
+        report_admin_error()
         flash(f'Fehler beim Hinzufügen der Kategorie: {str(e)}', 'error')
     
     return redirect(url_for('admin_categories'))
@@ -274,11 +791,13 @@ def admin_add_category():
 @login_required
 def admin_delete_category(id):
     try:
-        category = MenuCategory.query.get_or_404(id)
+        category = MenuCategory.query.filter_by(id=id, location_id=current_location_id()).first_or_404()
         db.session.delete(category)
         db.session.commit()
+        content_changed()
         flash('Kategorie erfolgreich gelöscht', 'success')
     except Exception as e:
+        report_admin_error()
         flash(f'Fehler beim Löschen der Kategorie: {str(e)}', 'error')
     
     return redirect(url_for('admin_categories'))
@@ -286,52 +805,547 @@ def admin_delete_category(id):
 @app.route('/admin/hours')
 @login_required
 def admin_hours():
-    opening_hours = OpeningHours.query.order_by(
-        case(
-            (OpeningHours.day == 'Montag', 1),
-            (OpeningHours.day == 'Dienstag', 2),
-            (OpeningHours.day == 'Mittwoch', 3),
-            (OpeningHours.day == 'Donnerstag', 4),
-            (OpeningHours.day == 'Freitag', 5),
-            (OpeningHours.day == 'Samstag', 6),
-            (OpeningHours.day == 'Sonntag', 7)
-        )
-    ).all()
-    return render_template('admin/hours.html', opening_hours=opening_hours)
+    opening_hours = opening_hours_in_week_order()
+    return render_template('admin/hours.html', opening_hours=opening_hours,
+                           special_hours=upcoming_special_hours())
 
 @app.route('/admin/hours/save', methods=['POST'])
 @login_required
 def admin_save_hours():
     try:
-        days = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
-        
-        for day in days:
-            hours = OpeningHours.query.filter_by(day=day).first()
-            if not hours:
-                hours = OpeningHours(day=day)
-                db.session.add(hours)
-            
+        # Alle Tage mit einer Abfrage laden und gesammelt zurückschreiben
+        location_id = current_location_id()
+        existing = {hours.day: hours for hours in OpeningHours.query.filter_by(location_id=location_id)}
+        rows = []
+        for weekday, day in enumerate(WEEKDAYS):
             closed = request.form.get(f'{day}_closed') == 'on'
-            hours.closed = closed
-            
-            if not closed:
-                hours.open_time_1 = request.form.get(f'{day}_open_1')
-                hours.close_time_1 = request.form.get(f'{day}_close_1')
-                hours.open_time_2 = request.form.get(f'{day}_open_2')
-                hours.close_time_2 = request.form.get(f'{day}_close_2')
-        
+            row = {'day': day, 'weekday': weekday, 'closed': closed}
+            for field, suffix in (('open_time_1', 'open_1'), ('close_time_1', 'close_1'),
+                                  ('open_time_2', 'open_2'), ('close_time_2', 'close_2')):
+                # Geschlossene Tage behalten ihre bisherigen Zeiten
+                row[field] = getattr(existing.get(day), field, None) if closed else request.form.get(f'{day}_{suffix}')
+            rows.append(row)
+
+        new_rows = [dict(row, location_id=location_id) for row in rows if row['day'] not in existing]
+        if new_rows:
+            db.session.execute(insert(OpeningHours), new_rows)
+        updates = [dict(row, id=existing[row['day']].id) for row in rows if row['day'] in existing]
+        if updates:
+            db.session.execute(update(OpeningHours), updates)
         db.session.commit()
+        content_changed()
         flash('Öffnungszeiten erfolgreich gespeichert', 'success')
     except Exception as e:
+        report_admin_error()
         flash(f'Fehler beim Speichern der Öffnungszeiten: {str(e)}', 'error')
     
     return redirect(url_for('admin_hours'))
 
+@app.route('/admin/hours/special/add', methods=['POST'])
+@login_required
+def admin_add_special_hours():
+    try:
+        special_date = datetime.strptime(request.form.get('date'), '%Y-%m-%d').date()
+        location_id = current_location_id()
+        special = SpecialOpeningHours.query.filter_by(date=special_date, location_id=location_id).first()
+        if not special:
+            special = SpecialOpeningHours(date=special_date, location_id=location_id)
+            db.session.add(special)
+
+        special.note = request.form.get('note')
+        special.closed = request.form.get('closed') == 'on'
+        special.open_time_1 = None if special.closed else request.form.get('open_1')
+        special.close_time_1 = None if special.closed else request.form.get('close_1')
+        special.open_time_2 = None if special.closed else request.form.get('open_2')
+        special.close_time_2 = None if special.closed else request.form.get('close_2')
+
+        db.session.commit()
+        content_changed()
+        flash('Sonderöffnungszeit gespeichert', 'success')
+    except Exception as e:
+        report_admin_error()
+        flash(f'Fehler beim Speichern der Sonderöffnungszeit: {str(e)}', 'error')
+
+    return redirect(url_for('admin_hours'))
+
+@app.route('/admin/hours/special/delete/<int:id>', methods=['POST'])
+@login_required
+def admin_delete_special_hours(id):
+    try:
+        special = SpecialOpeningHours.query.filter_by(id=id, location_id=current_location_id()).first_or_404()
+        db.session.delete(special)
+        db.session.commit()
+        content_changed()
+        flash('Sonderöffnungszeit gelöscht', 'success')
+    except Exception as e:
+        report_admin_error()
+        flash(f'Fehler beim Löschen der Sonderöffnungszeit: {str(e)}', 'error')
+
+    return redirect(url_for('admin_hours'))
+
 @app.route('/menu')
 def menu():
-    categories = MenuCategory.query.order_by(MenuCategory.order).all()
-    menu_items = MenuItem.query.all()
-    return render_template('menu.html', categories=categories, menu_items=menu_items)
+    return cached_page('menu', render_menu, stream=stream_menu)
+
+def render_menu():
+    snapshot = build_menu_snapshot()
+    return render_template('menu.html',
+                           categories=snapshot.categories,
+                           food_categories=snapshot.food_categories,
+                           drink_categories=snapshot.drink_categories)
+
+def stream_menu():
+    # stream_template hält den Request-Kontext (und damit die Session) bis zum letzten Byte
+    sections = menu_sections()
+    return stream_template('menu.html',
+                           categories=sections.categories,
+                           food_categories=sections.food_categories,
+                           drink_categories=sections.drink_categories)
+
+def json_response(key, build):
+    # Kodierte Bytes (roh, gzip und Brotli) werden pro Inhaltsversion nur einmal erzeugt
+    scope = caches()
+    encoded, hit = scope.api.get_or_render(('json',) + key, lambda: menu_api.encode(build()),
+                                           version=scope.version.current())
+    metrics.record_cache('api', hit)
+    encoding = compression.negotiate(request.accept_encodings)
+    etag = f'{encoded.etag}-{encoding}' if encoding else encoded.etag
+
+    if request.if_none_match.contains(etag):
+        response = Response(status=304)
+    else:
+        response = Response(encoded.compressed[encoding] if encoding else encoded.body, mimetype='application/json')
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+        response.headers['X-Cache'] = 'HIT' if hit else 'MISS'
+    response.set_etag(etag)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.public = True
+    response.cache_control.no_cache = True
+    return response
+
+def menu_data():
+    # Die komplette Speisekarte als Python-Struktur, neu aufgebaut nur nach Änderungen
+    data, _ = caches().api.get_or_render('menu-data', lambda: menu_api.serialize_menu(
+        build_menu_snapshot().categories))
+    return data
+
+def requested_fields():
+    try:
+        return menu_api.parse_fields(request.args.get('fields'))
+    except ValueError as e:
+        abort(make_response(jsonify(error=str(e)), 400))
+
+@app.route('/api/menu')
+def api_menu():
+    fields = requested_fields()
+    return json_response(('menu', fields), lambda: menu_api.select_fields(menu_data(), fields))
+
+@app.route('/api/menu/<category>')
+def api_menu_category(category):
+    fields = requested_fields()
+
+    def build():
+        for entry in menu_data()['categories']:
+            if entry['name'] == category:
+                return menu_api.select_fields({'categories': [entry]}, fields)['categories'][0]
+        abort(make_response(jsonify(error='Kategorie nicht gefunden'), 404))
+
+    return json_response(('menu', category, fields), build)
+
+# Pro Prozess einmal ermittelt: 'fts' oder 'memory'
+search_backend = None
+
+def menu_search_backend():
+    global search_backend
+    if search_backend is None:
+        # Die FTS-Tabelle legt "flask init-db" an, sofern SQLite FTS5 unterstützt
+        use_fts = app.config['MENU_SEARCH_FTS'] and menu_search.fts_available(db.session.connection())
+        search_backend = 'fts' if use_fts else 'memory'
+    return search_backend
+
+def memory_search_index():
+    index, _ = caches().api.get_or_render('search-index', lambda: menu_search.MemoryIndex(menu_data()))
+    return index
+
+@app.route('/api/menu/search')
+def api_menu_search():
+    try:
+        query = menu_search.parse(request.args, {entry['name'] for entry in menu_data()['categories']})
+    except ValueError as e:
+        abort(make_response(jsonify(error=str(e)), 400))
+    backend = menu_search_backend()
+    if backend == 'fts':
+        result = menu_search.search_sql(db.session, MenuItem, MenuCategory, query, menu_api.serialize_item,
+                                        location_id=current_location_id())
+    else:
+        result = memory_search_index().search(query)
+    response = jsonify(
+        q=query.text,
+        page=query.page,
+        per_page=query.per_page,
+        total=result.total,
+        pages=math.ceil(result.total / query.per_page),
+        items=result.items
+    )
+    response.headers['X-Search-Backend'] = backend
+    return response
+
+@app.route('/api/hours')
+def api_hours():
+    return json_response(('hours',), lambda: menu_api.serialize_hours(opening_hours_in_week_order(),
+                                                                      upcoming_special_hours()))
+
+def current_schedule():
+    # Wochenplan wird nur nach einer Änderung neu kompiliert
+    schedule, _ = caches().api.get_or_render('schedule', lambda: Schedule.from_rows(
+        opening_hours_in_week_order(), upcoming_special_hours()))
+    return schedule
+
+@app.route('/api/status')
+def api_status():
+    tz = ZoneInfo(app.config['TIMEZONE'])
+    now = datetime.now(tz)
+    status = current_schedule().status(now)
+    response = jsonify(
+        now=now.isoformat(timespec='minutes'),
+        open=status['open'],
+        closes_at=status['closes_at'] and status['closes_at'].replace(tzinfo=tz).isoformat(),
+        next_opening=status['next_opening'] and status['next_opening'].replace(tzinfo=tz).isoformat()
+    )
+    # Der Status hängt von der Uhrzeit ab, kurze Cachezeit genügt
+    response.cache_control.public = True
+    response.cache_control.max_age = 30
+    return response
+
+@app.route('/events')
+def events():
+    # Server-Sent Events für Menütafeln: eine Meldung je Änderung an Karte und Öffnungszeiten des Standorts
+    last_event_id = request.headers.get('Last-Event-ID') or request.args.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+    try:
+        stream = change_feed.stream(last_event_id, current_location_id())
+    except FeedBusy:
+        response = Response('Zu viele Live-Verbindungen\n', status=503, mimetype='text/plain')
+        response.headers['Retry-After'] = '30'
+        return response
+    response = Response(stream, mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # nginx und andere Proxys sollen nicht puffern
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+@app.route('/admin/cache')
+@login_required
+def admin_cache_stats():
+    # Zähler gelten pro Worker-Prozess, Seiten- und API-Caches je Standort (id und Pfadpräfix)
+    return jsonify(locations=location_caches.stats(), users=user_cache.stats(),
+                   login=login_limiter.stats(), compression=response_compression.stats(),
+                   events=change_feed.stats())
+
+@app.route('/admin/jobs')
+@login_required
+def admin_jobs():
+    return jsonify(job_queue.stats())
+
+@app.route('/admin/jobs/<int:id>/retry', methods=['POST'])
+@login_required
+def admin_retry_job(id):
+    job = BackgroundJob.query.get_or_404(id)
+    if not job_queue.retry(job.id):
+        return jsonify(error='Job läuft noch oder ist nicht fehlgeschlagen', id=job.id, status=job.status), 409
+    db.session.refresh(job)
+    return jsonify(id=job.id, status=job.status)
+
+# Mehrere Änderungen kurz hintereinander ergeben nur einen Export (siehe superseded)
+STATIC_EXPORT_DELAY = 3
+
+# Pfade ohne Endung, die auf dem CDN auf die exportierten JSON-Dateien zeigen
+STATIC_EXPORT_REWRITES = [('/api/menu', '/api/menu.json'), ('/api/hours', '/api/hours.json'),
+                          ('/api/menu/:category', '/api/menu/:category.json')]
+
+def schedule_static_export():
+    job_queue.enqueue('export_static', key='static-export', delay=STATIC_EXPORT_DELAY)
+    db.session.commit()
+
+def static_location_pages(location, prefix, inputs):
+    """Seiten eines Standorts unter prefix ('' oder '<slug>/'); trägt dessen Eingaben in inputs ein."""
+    # Mit dem Präfix als SCRIPT_NAME zeigen alle Links der Seiten auf den Standort
+    base_url = f'http://localhost/{prefix}'
+    environ = {locations.ENVIRON_KEY: location}
+
+    def in_request(path, render):
+        # Eigener Request-Kontext pro Seite, damit z.B. request.endpoint stimmt
+        def run():
+            with app.test_request_context(path, base_url=base_url, environ_overrides=environ):
+                return render().encode('utf-8')
+        return run
+
+    with app.test_request_context('/api/menu', base_url=base_url, environ_overrides=environ):
+        menu = menu_data()
+        menu_json = menu_api.encode(menu).body
+        hours_json = menu_api.encode(menu_api.serialize_hours(opening_hours_in_week_order(),
+                                                              upcoming_special_hours())).body
+    menu_input, hours_input = f'menu:{location.slug}', f'hours:{location.slug}'
+    inputs[menu_input] = static_export.digest(menu_json)
+    inputs[hours_input] = static_export.digest(hours_json)
+    pages = [
+        Page(f'{prefix}index.html', (hours_input, 'release'), in_request('/', render_index)),
+        Page(f'{prefix}menu/index.html', (menu_input, 'release'), in_request('/menu', render_menu)),
+        Page(f'{prefix}api/menu.json', (menu_input,), lambda: menu_json),
+        Page(f'{prefix}api/hours.json', (hours_input,), lambda: hours_json),
+    ]
+    for category in menu['categories']:
+        # Kategorienamen aus dem Admin-Formular nur als sichere Dateinamen übernehmen
+        if category['name'] == secure_filename(category['name']):
+            body = menu_api.encode(category).body
+            pages.append(Page(f"{prefix}api/menu/{category['name']}.json", (menu_input,), lambda body=body: body))
+    return pages
+
+def export_static_site(folder, origin=None, force=False):
+    """Schreibt Startseite, Speisekarte und die JSON-Daten aller Standorte nach folder.
+
+    Der Standard-Standort liegt im Ordner selbst, jeder weitere unter
+    <slug>/. Nur Dateien, deren Eingaben sich geändert haben, werden neu
+    erzeugt (siehe static_export.StaticExport).
+    """
+    default = location_registry.default()
+    prefixes = [(location, '' if location == default else f'{location.slug}/')
+                for location in location_registry.all()]
+    inputs = {
+        # Templates und gehashte Assets
+        'release': static_export.digest(RELEASE_ID + json.dumps(asset_manifest, sort_keys=True)),
+        'origin': origin or '',
+        'locations': static_export.digest(' '.join(prefix for _, prefix in prefixes)),
+    }
+    pages = []
+    rewrites, proxied, forwarded = [], [], []
+    for location, prefix in prefixes:
+        pages += static_location_pages(location, prefix, inputs)
+        root = f'/{prefix}'.rstrip('/')
+        rewrites += [(root + source, root + target) for source, target in STATIC_EXPORT_REWRITES]
+        if prefix:
+            # Die Seiten verweisen auf /<slug>/static/..., exportiert wird static nur einmal
+            rewrites.append((f'{root}/static/*', '/static/:splat'))
+        proxied += [root + path for path in ('/api/status', '/api/menu/search', '/events')]
+        forwarded += [root + path for path in ('/admin/*', '/login', '/logout')]
+    pages += [
+        Page('_headers', ('release', 'locations'), lambda: static_export.netlify_headers(
+            [f'/{prefix}'.rstrip('/') for _, prefix in prefixes])),
+        Page('_redirects', ('origin', 'locations'), lambda: static_export.netlify_redirects(
+            rewrites, origin, proxied=proxied, forwarded=forwarded)),
+    ]
+    return StaticExport(folder).run(pages, inputs, static_folder=app.static_folder, force=force)
+
+@job_queue.task('export_static')
+def export_static_job(payload, job):
+    if job_queue.superseded(job) or not app.config['STATIC_EXPORT_FOLDER']:
+        return
+    report = export_static_site(app.config['STATIC_EXPORT_FOLDER'], app.config['STATIC_EXPORT_ORIGIN'])
+    app.logger.info('Statischer Export: %s neu geschrieben, %s Dateien aus static kopiert',
+                    ', '.join(report.written) or 'nichts', len(report.static_copied))
+
+@app.cli.command('init-db')
+def init_db_command():
+    """Legt die Tabellen an und füllt Admin, Kategorien und Öffnungszeiten vor."""
+    init_db()
+    content_changed()
+    click.echo('Datenbank initialisiert')
+
+@app.cli.command('migrate-db')
+def migrate_db_command():
+    """Wendet ausstehende Schemamigrationen an, ohne bestehende Daten anzufassen."""
+    applied = migrations.upgrade(db.engine)
+    for version, name, duration_ms in applied:
+        click.echo(f'{version:>3} {name} ({duration_ms} ms)')
+    if not applied:
+        click.echo('Schema aktuell')
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Minifiziert CSS/JS und schreibt sie mit Inhalts-Hash nach static/dist."""
+    manifest = assets.build(app.static_folder, app.static_url_path + '/')
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+    for name, built in manifest.items():
+        click.echo(f'{name} -> {built}')
+    # .gz/.br neben die Dateien legen, damit sie ohne Rechenaufwand pro Anfrage ausgeliefert werden
+    original_size = saved = 0
+    for path, size, sizes in compression.precompress(app.static_folder, app.config['COMPRESS_MIN_SIZE']):
+        original_size += size
+        saved += size - min(sizes.values())
+        click.echo(f'{path}: {size} B -> ' + ', '.join(f'{encoding} {compressed} B'
+                                                        for encoding, compressed in sizes.items()))
+    if original_size:
+        click.echo(f'Vorkomprimiert: {saved} von {original_size} Bytes gespart')
+
+@app.cli.command('process-images')
+@click.argument('directories', nargs=-1, type=click.Path(exists=True, file_okay=False))
+def process_images_command(directories):
+    """Erzeugt Bildvarianten für bestehende Gerichte oder für die angegebenen Ordner."""
+    if directories:
+        for directory in directories:
+            for name in images.process_directory(directory):
+                click.echo(f'{directory}/{name}')
+        return
+
+    processed = 0
+    changed_locations = set()
+    for menu_item in MenuItem.query.filter(MenuItem.image_path.isnot(None),
+                                           MenuItem.image_variants.is_(None)).all():
+        source = os.path.join(app.static_folder, menu_item.image_path)
+        if not os.path.exists(source):
+            click.echo(f'Bild fehlt: {menu_item.image_path} ({menu_item.name})', err=True)
+            continue
+        with open(source, 'rb') as f:
+            variants = upload_store.save(f)
+        menu_item.image_path = variants['src']
+        menu_item.image_variants = json.dumps(variants)
+        processed += 1
+        changed_locations.add(menu_item.location_id)
+    db.session.commit()
+    for location_id in changed_locations:
+        content_changed(location_id)
+    click.echo(f'{processed} Bilder verarbeitet')
+
+@app.cli.command('gc-uploads')
+@click.option('--dry-run', is_flag=True, help='Nur anzeigen, nichts löschen.')
+@click.option('--min-age', default=3600, show_default=True,
+              help='Dateien, die jünger sind (Sekunden), bleiben unangetastet.')
+def gc_uploads_command(dry_run, min_age):
+    """Entfernt hochgeladene Dateien, auf die kein Gericht mehr verweist."""
+    referenced = set()
+    for image_path, image_variants in db.session.query(MenuItem.image_path, MenuItem.image_variants):
+        variants = json.loads(image_variants) if image_variants else None
+        referenced.update(os.path.basename(path) for path in upload_store.files_for(image_path, variants))
+
+    freed = 0
+    orphans = upload_store.orphans(referenced, min_age=min_age)
+    for path in orphans:
+        freed += os.path.getsize(path)
+        click.echo(path)
+        if not dry_run:
+            os.remove(path)
+    action = 'gefunden' if dry_run else 'gelöscht'
+    click.echo(f'{len(orphans)} verwaiste Dateien {action} ({freed / 1024:.0f} KiB)')
+
+location_option = click.option('--location', 'location_slug', metavar='SLUG',
+                               help='Standort (Standard: DEFAULT_LOCATION bzw. der älteste).')
+
+def use_location(slug):
+    # Für CLI-Befehle mit --location: current_location() liest ihn aus g
+    if slug:
+        location = location_registry.get(slug)
+        if location is None:
+            raise click.BadParameter(f'Unbekannter Standort: {slug}', param_hint='--location')
+        g.location = location
+
+@app.cli.command('add-location')
+@click.argument('slug')
+@click.argument('name')
+@click.option('--hostname', help='Eigener Hostname des Standorts, z.B. passau.example.de.')
+@click.option('--address', help='Anschrift, Zeilen mit \\n getrennt.')
+def add_location_command(slug, name, hostname, address):
+    """Legt einen Standort mit Standard-Kategorien und -Öffnungszeiten an.
+
+    Er ist danach unter /SLUG/ erreichbar, mit --hostname auch unter eigenem
+    Hostnamen; laufende Worker übernehmen ihn nach LOCATION_CACHE_TTL.
+    """
+    reserved = {rule.rule.lstrip('/').split('/', 1)[0] for rule in app.url_map.iter_rules()}
+    try:
+        locations.validate_slug(slug, reserved)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='SLUG')
+    hostname = locations.normalize_host(hostname) or None
+    if Location.query.filter_by(slug=slug).first():
+        raise click.ClickException(f'Standort {slug} existiert bereits')
+    if hostname and Location.query.filter_by(hostname=hostname).first():
+        raise click.ClickException(f'Hostname {hostname} gehört bereits zu einem Standort')
+    location = Location(slug=slug, name=name, hostname=hostname,
+                        address=address.replace('\\n', '\n') if address else None)
+    db.session.add(location)
+    db.session.flush()
+    seed_location(location.id)
+    db.session.commit()
+    location_registry.refresh()
+    click.echo(f'Standort {name} angelegt: /{slug}/' + (f' und http://{hostname}/' if hostname else ''))
+
+@app.cli.command('import-menu')
+@click.argument('file', type=click.File('rb'))
+@click.option('--format', 'fmt', type=click.Choice(sorted(menu_io.FORMATS)),
+              help='Ohne Angabe aus der Dateiendung ermittelt.')
+@click.option('--dry-run', is_flag=True, help='Nur die Änderungen anzeigen, nichts speichern.')
+@location_option
+def import_menu_command(file, fmt, dry_run, location_slug):
+    """Importiert Gerichte eines Standorts aus CSV oder JSON (Abgleich über Kategorie und Name)."""
+    use_location(location_slug)
+    try:
+        fmt = menu_io.detect_format(file.name, fmt)
+    except ValueError as e:
+        raise click.BadParameter(str(e), param_hint='--format')
+    plan = menu_import_plan(file, fmt)
+    for line, message in plan.errors:
+        click.echo(f'Zeile {line}: {message}' if line else message, err=True)
+    if plan.errors:
+        raise click.ClickException(f'{len(plan.errors)} fehlerhafte Zeilen, nichts importiert')
+    if dry_run:
+        for row in plan.inserts:
+            click.echo(f"+ {row['name']}")
+        for _, row, changes in plan.updates:
+            details = ', '.join(f'{field}: {old!r} -> {new!r}' for field, (old, new) in changes.items())
+            click.echo(f"~ {row['name']} ({details})")
+    else:
+        apply_menu_import(plan)
+    action = 'würden übernommen' if dry_run else 'übernommen'
+    click.echo(f'{len(plan.inserts)} neu, {len(plan.updates)} geändert, {plan.unchanged} unverändert ({action})')
+
+@app.cli.command('export-menu')
+@click.argument('file', default='-', type=click.File('w', encoding='utf-8'))
+@click.option('--format', 'fmt', type=click.Choice(sorted(menu_io.FORMATS)), default='csv', show_default=True)
+@location_option
+def export_menu_command(file, fmt, location_slug):
+    """Schreibt alle Gerichte eines Standorts als CSV oder JSON (ohne Angabe auf die Standardausgabe)."""
+    use_location(location_slug)
+    for chunk in menu_io.export(menu_export_rows(), fmt):
+        file.write(chunk)
+
+@app.cli.command('export-static')
+@click.argument('directory', required=False, type=click.Path(file_okay=False))
+@click.option('--origin', help='Adresse des Flask-Servers für /api/status und /admin '
+                               '(Standard: STATIC_EXPORT_ORIGIN).')
+@click.option('--force', is_flag=True, help='Alle Dateien neu erzeugen, auch ohne Änderungen.')
+def export_static_command(directory, origin, force):
+    """Exportiert die öffentlichen Seiten als statische Dateien (Standard: STATIC_EXPORT_FOLDER).
+
+    Der Ordner kann unverändert auf Netlify oder ein CDN hochgeladen werden.
+    Ein täglicher Lauf hält die Sonderöffnungszeiten in api/hours.json aktuell.
+    """
+    directory = directory or app.config['STATIC_EXPORT_FOLDER']
+    if not directory:
+        raise click.UsageError('Kein Zielordner angegeben und STATIC_EXPORT_FOLDER nicht gesetzt')
+    # Die exportierten Seiten verweisen auf die gehashten Assets
+    manifest = assets.build(app.static_folder, app.static_url_path + '/')
+    asset_manifest.clear()
+    asset_manifest.update(manifest)
+    report = export_static_site(directory, origin or app.config['STATIC_EXPORT_ORIGIN'], force=force)
+    for path in report.written:
+        click.echo(f'geschrieben: {path}')
+    for path in report.removed + report.static_removed:
+        click.echo(f'entfernt: {path}')
+    click.echo(f'{len(report.written)} geschrieben, {len(report.unchanged) + len(report.skipped)} unverändert, '
+               f'{len(report.static_copied)} Dateien aus static kopiert')
+
+@app.cli.command('run-jobs')
+@click.option('--limit', type=int, help='Höchstens so viele Jobs abarbeiten.')
+def run_jobs_command(limit):
+    """Arbeitet fällige Hintergrund-Jobs im Vordergrund ab (z.B. mit JOB_WORKERS=0)."""
+    processed = job_queue.run_pending(limit)
+    stats = job_queue.stats(limit=0)
+    click.echo(f"{processed} Jobs ausgeführt, {stats['counts']['pending']} ausstehend, "
+               f"{stats['counts']['failed']} fehlgeschlagen")
 
 @app.route('/logout')
 @login_required
@@ -340,9 +1354,7 @@ def logout():
     return redirect(url_for('index'))
 
 if __name__ == '__main__':
+    # Nur für den lokalen Entwicklungsserver; in Produktion läuft "flask init-db" beim Deploy
     with app.app_context():
         init_db()
     app.run(debug=True)
-else:
-    with app.app_context():
-        init_db()
@@ -0,0 +1,92 @@
+import hashlib
+import json
+import os
+import re
+from urllib.parse import urljoin
+
+# Gebaute Dateien: dist/<name>.<hash>.<endung>
+HASH_LENGTH = 12
+_FINGERPRINTED = re.compile(r'(^|/)dist/[\w.-]+\.[0-9a-f]{%d}\.(css|js)$' % HASH_LENGTH)
+_CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def is_fingerprinted(path):
+    return bool(_FINGERPRINTED.search(path))
+
+
+def minify_css(source, source_url):
+    # Relative url()-Angaben auf absolute Pfade umschreiben, weil die
+    # gebaute Datei in einem anderen Ordner liegt
+    def absolute(match):
+        url = match.group(2).strip()
+        if url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            return match.group(0)
+        return f"url('{urljoin(source_url, url)}')"
+
+    source = _CSS_URL.sub(absolute, source)
+    source = re.sub(r'/\*.*?\*/', '', source, flags=re.S)
+    source = re.sub(r'\s+', ' ', source)
+    source = re.sub(r'\s*([{};,>])\s*', r'\1', source)
+    # Doppelpunkte nur in Deklarationen verdichten, nicht in Selektoren wie "a :hover"
+    source = re.sub(r'([{;])([\w-]+)\s*:\s*', r'\1\2:', source)
+    return source.replace(';}', '}').strip()
+
+
+def minify_js(source):
+    # Bewusst vorsichtig: nur Einrückung, Leerzeilen und reine Kommentarzeilen
+    # entfernen, Zeilenumbrüche bleiben wegen der automatischen Semikolons erhalten
+    lines = []
+    for line in source.splitlines():
+        line = line.strip()
+        if line and not line.startswith('//'):
+            lines.append(line)
+    return '\n'.join(lines)
+
+
+def build(static_folder, static_url='/static/', output='dist'):
+    """Minifiziert alle CSS/JS-Dateien direkt im static-Ordner und schreibt sie
+    mit Inhalts-Hash nach static/<output>. Liefert das Manifest
+    {logischer Name: gebauter Pfad} und speichert es als manifest.json."""
+    output_dir = os.path.join(static_folder, output)
+    os.makedirs(output_dir, exist_ok=True)
+
+    manifest = {}
+    for name in sorted(os.listdir(static_folder)):
+        stem, extension = os.path.splitext(name)
+        if extension not in ('.css', '.js') or not os.path.isfile(os.path.join(static_folder, name)):
+            continue
+        with open(os.path.join(static_folder, name), encoding='utf-8') as f:
+            source = f.read()
+        if extension == '.css':
+            content = minify_css(source, urljoin(static_url, name))
+        else:
+            content = minify_js(source)
+        digest = hashlib.sha256(content.encode('utf-8')).hexdigest()[:HASH_LENGTH]
+        built_name = f'{stem}.{digest}{extension}'
+        # Gleicher Hash, gleicher Inhalt: vorhandene Builds unberührt lassen
+        if not os.path.exists(os.path.join(output_dir, built_name)):
+            with open(os.path.join(output_dir, built_name), 'w', encoding='utf-8') as f:
+                f.write(content)
+        manifest[name] = f'{output}/{built_name}'
+
+    # Veraltete Builds entfernen
+    current = {os.path.basename(path) for path in manifest.values()} | {'manifest.json'}
+    # Vorkomprimierte Geschwister (siehe compression.precompress) gehören zum Build
+    current |= {name + suffix for name in current for suffix in ('.gz', '.br')}
+    for name in os.listdir(output_dir):
+        if name not in current:
+            os.remove(os.path.join(output_dir, name))
+
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    if load_manifest(manifest_path) != manifest:
+        with open(manifest_path, 'w') as f:
+            json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
@@ -0,0 +1,150 @@
+"""Nebenläufigkeits-Benchmark für die Datenbank-Konfiguration.
+
+Mehrere Leser-Threads führen die Speisekarten-Abfrage aus, während ein
+Schreiber laufend Preise ändert, so wie es der Admin-Bereich unter Last tut.
+Ausgegeben werden p50/p95/p99 je Konfiguration, einmal mit den
+Standardeinstellungen von SQLite und einmal mit db_config (WAL,
+synchronous=NORMAL, busy_timeout, mmap).
+
+    python benchmarks/db_concurrency.py --readers 8 --seconds 5
+    python benchmarks/db_concurrency.py --database-url postgresql://...
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+
+import db_config  # noqa: E402
+from app import db  # noqa: E402
+
+MENU_QUERY = text(
+    'SELECT c.id, c.display_name, i.id, i.name, i.price FROM menu_category c '
+    'LEFT JOIN menu_item i ON i.category_id = c.id ORDER BY c."order", i.id'
+)
+
+
+def percentile(values, fraction):
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summary(latencies):
+    return {
+        'count': len(latencies),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2) if latencies else None,
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2) if latencies else None,
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2) if latencies else None,
+    }
+
+
+def seed(engine, items, categories):
+    db.metadata.drop_all(engine)
+    db.metadata.create_all(engine)
+    with engine.begin() as connection:
+        connection.execute(text(
+            'INSERT INTO menu_category (id, name, display_name, "order", is_drink_category) '
+            'VALUES (:id, :name, :name, :id, 0)'
+        ), [{'id': c + 1, 'name': f'kategorie-{c}'} for c in range(categories)])
+        connection.execute(text(
+            'INSERT INTO menu_item (id, name, price, category_id, vegetarian, vegan, spicy) '
+            'VALUES (:id, :name, 9.5, :category_id, 0, 0, 0)'
+        ), [{'id': i + 1, 'name': f'Gericht {i}', 'category_id': i % categories + 1} for i in range(items)])
+
+
+def run(engine, readers, seconds, write_hold):
+    stop = threading.Event()
+    read_latencies, write_latencies, errors = [], [], []
+    lock = threading.Lock()
+
+    def reader():
+        local = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                with engine.connect() as connection:
+                    connection.execute(MENU_QUERY).fetchall()
+                local.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(f'read: {e.__class__.__name__}')
+        with lock:
+            read_latencies.extend(local)
+
+    def writer():
+        counter = 0
+        while not stop.is_set():
+            counter += 1
+            start = time.perf_counter()
+            try:
+                with engine.begin() as connection:
+                    connection.execute(text('UPDATE menu_item SET price = price + 0.01 WHERE id = :id'),
+                                       {'id': counter % 100 + 1})
+                    # Eine Admin-Anfrage hält die Transaktion einen Moment offen
+                    time.sleep(write_hold)
+                write_latencies.append(time.perf_counter() - start)
+            except Exception as e:
+                with lock:
+                    errors.append(f'write: {e.__class__.__name__}')
+
+    threads = [threading.Thread(target=reader) for _ in range(readers)] + [threading.Thread(target=writer)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    return {
+        'reads': summary(read_latencies),
+        'reads_per_second': round(len(read_latencies) / seconds, 1),
+        'writes': summary(write_latencies),
+        'errors': len(errors),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='statt temporärer SQLite-Dateien diese Datenbank verwenden')
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=5)
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--categories', type=int, default=12)
+    parser.add_argument('--write-hold-ms', type=float, default=5)
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    results = {}
+    configurations = ['configured'] if args.database_url else ['sqlite-default', 'configured']
+    for name in configurations:
+        with tempfile.TemporaryDirectory() as tmp:
+            url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+            if name == 'sqlite-default':
+                engine = create_engine(url, pool_size=args.readers + 1)
+            else:
+                engine = create_engine(url, **db_config.engine_options(url, threads=args.readers + 1))
+                db_config.configure_sqlite(engine)
+            seed(engine, args.items, args.categories)
+            results[name] = run(engine, args.readers, args.seconds, args.write_hold_ms / 1000)
+            engine.dispose()
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for name, result in results.items():
+        reads, writes = result['reads'], result['writes']
+        print(f"{name:<15} Lesen p50 {reads['p50_ms']} ms  p99 {reads['p99_ms']} ms  "
+              f"({result['reads_per_second']}/s)  Schreiben p99 {writes['p99_ms']} ms  "
+              f"Fehler {result['errors']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,117 @@
+"""Render-Benchmark für die Speisekarte.
+
+Rendert templates/menu.html mit synthetischen Daten für wachsende
+Gerichtanzahlen und gibt die Zeit pro Gericht aus. Bleibt dieser Wert
+konstant, wächst die Renderzeit linear mit der Größe der Karte.
+Zum Vergleich wird die frühere Schleife (alle Gerichte je Kategorie
+filtern) mitgemessen.
+
+    python benchmarks/menu_render.py --sizes 100 1000 5000 --categories 40
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from types import SimpleNamespace
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import app, MenuSnapshot  # noqa: E402
+
+# Die alte Variante aus menu.html: jede Kategorie läuft über alle Gerichte
+LEGACY_LOOP = """
+{%- for category in categories %}{% for item in menu_items %}
+{%- if item.category_id == category.id %}<div>{{ item.name }} {{ "%.2f"|format(item.price) }}</div>{% endif %}
+{%- endfor %}{% endfor -%}
+"""
+
+
+def synthetic_snapshot(item_count, category_count):
+    categories = []
+    for c in range(category_count):
+        categories.append(SimpleNamespace(
+            id=c + 1,
+            name=f'kategorie-{c}',
+            display_name=f'Kategorie {c}',
+            order=c,
+            is_drink_category=c % 3 == 0,
+            items=[]
+        ))
+    for i in range(item_count):
+        category = categories[i % category_count]
+        category.items.append(SimpleNamespace(
+            id=i + 1,
+            name=f'Gericht {i}',
+            description='Mit Tzatziki, Pita und Salat',
+            price=9.5 + (i % 20),
+            category_id=category.id,
+            vegetarian=i % 4 == 0,
+            vegan=i % 8 == 0,
+            spicy=i % 5 == 0,
+            image_path=None
+        ))
+    return MenuSnapshot(
+        categories=categories,
+        food_categories=[c for c in categories if not c.is_drink_category],
+        drink_categories=[c for c in categories if c.is_drink_category]
+    )
+
+
+def best_of(repeat, func):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def run(sizes, category_count, repeat, legacy):
+    results = []
+    with app.test_request_context('/menu'):
+        template = app.jinja_env.get_template('menu.html')
+        legacy_template = app.jinja_env.from_string(LEGACY_LOOP)
+        for size in sizes:
+            snapshot = synthetic_snapshot(size, category_count)
+            seconds = best_of(repeat, lambda: template.render(
+                food_categories=snapshot.food_categories,
+                drink_categories=snapshot.drink_categories))
+            result = {
+                'items': size,
+                'categories': category_count,
+                'render_ms': round(seconds * 1000, 3),
+                'us_per_item': round(seconds * 1e6 / size, 3),
+            }
+            if legacy:
+                menu_items = [item for c in snapshot.categories for item in c.items]
+                seconds = best_of(repeat, lambda: legacy_template.render(
+                    categories=snapshot.categories, menu_items=menu_items))
+                result['legacy_loop_ms'] = round(seconds * 1000, 3)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', type=int, nargs='+', default=[100, 500, 1000, 2500, 5000])
+    parser.add_argument('--categories', type=int, default=30)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--no-legacy', dest='legacy', action='store_false',
+                        help='alte verschachtelte Schleife nicht mitmessen')
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    results = run(args.sizes, args.categories, args.repeat, args.legacy)
+    if args.json:
+        print(json.dumps(results, indent=2))
+        return
+    for r in results:
+        line = f"{r['items']:>7} Gerichte  {r['render_ms']:>9.2f} ms  {r['us_per_item']:>7.2f} µs/Gericht"
+        if 'legacy_loop_ms' in r:
+            line += f"  (alte Schleife: {r['legacy_loop_ms']:.2f} ms)"
+        print(line)
+
+
+if __name__ == '__main__':
+    main()
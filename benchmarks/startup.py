@@ -0,0 +1,89 @@
+"""Startzeit-Benchmark: vom Prozessstart bis zum ersten Byte.
+
+Startet gunicorn mit gunicorn_config.py und misst, wie lange es dauert, bis
+"/" die erste Antwort liefert. Mit --no-preload wird preload_app für den
+Vergleich abgeschaltet. Jede Runde startet einen frischen Server.
+
+    python benchmarks/startup.py --runs 5
+"""
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def first_byte(url, started, timeout):
+    while time.perf_counter() - started < timeout:
+        try:
+            with urllib.request.urlopen(url, timeout=1) as response:
+                response.read(1)
+                return time.perf_counter() - started
+        except OSError:
+            time.sleep(0.005)
+    raise TimeoutError(f'Keine Antwort von {url} nach {timeout}s')
+
+
+def run_once(app_module, preload, timeout):
+    port = free_port()
+    config = 'gunicorn_config.py'
+    if not preload:
+        # gunicorn kennt kein --no-preload, deshalb die Konfiguration überschreiben
+        with tempfile.NamedTemporaryFile('w', suffix='.py', delete=False) as f:
+            f.write('from gunicorn_config import *\npreload_app = False\n')
+            config = f.name
+    command = [sys.executable, '-m', 'gunicorn', '-c', config,
+               '--bind', f'127.0.0.1:{port}', app_module]
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=ROOT, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                               env=dict(os.environ, PYTHONPATH=ROOT))
+    try:
+        return first_byte(f'http://127.0.0.1:{port}/', started, timeout)
+    finally:
+        process.terminate()
+        process.wait()
+        if config != 'gunicorn_config.py':
+            os.remove(config)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--app', default='wsgi:app', help='WSGI-Modul für gunicorn')
+    parser.add_argument('--no-preload', dest='preload', action='store_false',
+                        help='preload_app für diesen Lauf abschalten')
+    parser.add_argument('--timeout', type=float, default=30)
+    parser.add_argument('--json', action='store_true', help='Ergebnis als JSON ausgeben')
+    args = parser.parse_args()
+
+    timings = [run_once(args.app, args.preload, args.timeout) for _ in range(args.runs)]
+    result = {
+        'app': args.app,
+        'preload': args.preload,
+        'runs': args.runs,
+        'first_byte_ms_median': round(statistics.median(timings) * 1000, 1),
+        'first_byte_ms_min': round(min(timings) * 1000, 1),
+        'first_byte_ms_max': round(max(timings) * 1000, 1),
+    }
+    if args.json:
+        print(json.dumps(result, indent=2))
+    else:
+        print(f"Erstes Byte nach {result['first_byte_ms_median']} ms (Median aus {args.runs}, "
+              f"min {result['first_byte_ms_min']} ms, max {result['first_byte_ms_max']} ms)")
+
+
+if __name__ == '__main__':
+    main()
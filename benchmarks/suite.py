@@ -0,0 +1,509 @@
+"""Benchmark-Suite: synthetische Karte, Testclient und Lastgenerator gegen gunicorn.
+
+Befüllt eine temporäre SQLite-Datenbank (oder --database-url) mit
+synthetic.seed und misst dann in drei Phasen:
+
+1. Flask-Testclient: "/", "/menu" (aus dem Cache, frisch gerendert, als
+   304 auf If-None-Match und während sich ein zweiter Standort ändert), /api/menu, Login (auch
+   gedrosselt), die seitenweise Admin-Liste sowie Anlegen, Bearbeiten und
+   Löschen im Admin-Bereich.
+   Je Szenario Latenzen, SQL-Anweisungen, gerenderte Templates und Bytes
+   pro Anfrage.
+2. Komprimierung: gesparte Bytes und CPU-Zeit je Kodierung für die
+   öffentlichen Seiten und die Dateien in static/.
+3. HTTP: gunicorn mit gunicorn_config.py, mehrere Threads mit Keep-Alive
+   schicken eine gemischte Last auf die öffentlichen Seiten und bieten wie
+   ein Browser gzip und Brotli an. Die SQL-Anzahl pro Anfrage stammt aus
+   /metrics.
+
+Das Ergebnis ist JSON (Durchsatz, p50/p95/p99, Anfragen pro Sekunde,
+SQL und Bytes pro Anfrage). Mit --thresholds werden Grenzwerte geprüft, mit
+--baseline ein früheres Ergebnis; jede Überschreitung beendet den Lauf
+mit Exit-Code 1.
+
+    python benchmarks/suite.py --items 5000 --thresholds benchmarks/thresholds.json
+    python benchmarks/suite.py --items 50000 --no-http --output result.json
+    python benchmarks/suite.py --baseline result.json --tolerance 0.25
+"""
+import argparse
+import http.client
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from startup import free_port  # noqa: E402
+
+# Öffentliche Last für Phase 2: (Pfad, Flask-Endpoint, Gewicht)
+HTTP_MIX = [
+    ('/', 'index', 3),
+    ('/menu', 'menu', 4),
+    ('/api/menu', 'api_menu', 2),
+    ('/api/hours', 'api_hours', 1),
+    ('/api/status', 'api_status', 1),
+    ('/api/menu/search?q=gyr&vegan=1', 'api_menu_search', 1),
+]
+
+# Seiten, deren Komprimierung (gesparte Bytes, CPU-Zeit) gemessen wird
+COMPRESSED_PATHS = ['/', '/menu', '/api/menu', '/api/hours', '/api/menu/search?q=gyr&vegan=1']
+BROWSER_ENCODINGS = {'Accept-Encoding': 'gzip, deflate, br'}
+ACCEPT_JSON = {'Accept': 'application/json'}
+
+# Werte, die beim Vergleich mit --baseline nicht schlechter werden dürfen
+BASELINE_METRICS = ('p95_ms', 'queries_per_request')
+
+
+def percentile(values, fraction):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def summary(latencies, seconds=None, first_bytes=None):
+    result = {
+        'count': len(latencies),
+        'p50_ms': round(statistics.median(latencies) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 0.95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 0.99) * 1000, 2),
+        'mean_ms': round(statistics.fmean(latencies) * 1000, 2),
+    }
+    result['rps'] = round(len(latencies) / (seconds or sum(latencies)), 1)
+    if first_bytes:
+        # Zeit bis zum ersten Byte: zeigt, ob gestreamte Seiten früher ankommen
+        result['ttfb_p50_ms'] = round(statistics.median(first_bytes) * 1000, 2)
+        result['ttfb_p95_ms'] = round(percentile(first_bytes, 0.95) * 1000, 2)
+        result['ttfb_p99_ms'] = round(percentile(first_bytes, 0.99) * 1000, 2)
+    return result
+
+
+class StatementCounter:
+    """Zählt SQL-Anweisungen der Engine (der Testclient läuft im selben Thread)."""
+
+    def __init__(self, engine):
+        from sqlalchemy import event
+        self.count = 0
+        event.listen(engine, 'after_cursor_execute', self._count)
+
+    def _count(self, *args):
+        self.count += 1
+
+
+def client_phase(iterations, login_iterations):
+    from flask import template_rendered
+
+    from app import (app, db, content_changed, location_caches, location_registry, login_limiter, seed_location,
+                     Location, MenuCategory, MenuItem)
+
+    with app.app_context():
+        counter = StatementCounter(db.engine)
+    renders = [0]
+    template_rendered.connect(lambda sender, **extra: renders.__setitem__(0, renders[0] + 1), app, weak=False)
+    results = {}
+
+    def measure(name, count, send, prepare=None, status=None):
+        latencies, first_bytes, statements, sent = [], [], 0, 0
+        rendered = renders[0]
+        for i in range(count):
+            if prepare:
+                prepare(i)
+            before = counter.count
+            start = time.perf_counter()
+            response = send(i)
+            # Der Testclient puffert nicht; der Body wird erst beim Lesen erzeugt
+            chunks = iter(response.response)
+            chunk = next(chunks, b'')
+            first_bytes.append(time.perf_counter() - start)
+            sent += len(chunk)
+            for chunk in chunks:
+                sent += len(chunk)
+            response.close()
+            latencies.append(time.perf_counter() - start)
+            statements += counter.count - before
+            if status is not None and response.status_code != status or status is None and response.status_code >= 400:
+                raise RuntimeError(f'{name}: Status {response.status_code}')
+        results[name] = dict(summary(latencies, first_bytes=first_bytes),
+                             queries_per_request=round(statements / count, 2),
+                             templates_per_request=round((renders[0] - rendered) / count, 2),
+                             bytes_per_request=sent // count)
+
+    client = app.test_client()
+    measure('index', iterations, lambda i: client.get('/'))
+    measure('menu', iterations, lambda i: client.get('/menu'))
+    # Wiederholter Aufruf mit ETag: 304 ohne SQL und ohne Template
+    for path, name in (('/', 'index_304'), ('/menu', 'menu_304')):
+        response = client.get(path)
+        response.get_data()
+        response.close()
+        etag = {'If-None-Match': response.headers['ETag']}
+        measure(name, iterations, lambda i: client.get(path, headers=etag), status=304)
+    measure('menu_uncached', iterations, lambda i: client.get('/menu'), prepare=lambda i: location_caches.clear())
+    # Zum Vergleich dieselbe Seite ohne Streaming
+    streaming, app.config['STREAM_PAGES'] = app.config['STREAM_PAGES'], False
+    measure('menu_uncached_buffered', iterations, lambda i: client.get('/menu'),
+            prepare=lambda i: location_caches.clear())
+    app.config['STREAM_PAGES'] = streaming
+    # Wie ein Browser mit Accept-Encoding: gecachte Seiten werden nur einmal komprimiert,
+    # gestreamte blockweise
+    measure('menu_br', iterations, lambda i: client.get('/menu', headers=BROWSER_ENCODINGS))
+    measure('menu_uncached_gzip', iterations, lambda i: client.get('/menu', headers={'Accept-Encoding': 'gzip'}),
+            prepare=lambda i: location_caches.clear())
+    # Änderungen an einem anderen Standort lassen die Seiten dieses Standorts im Cache
+    with app.app_context():
+        second = Location(slug='bench-zweite', name='Benchmark Zweite')
+        db.session.add(second)
+        db.session.flush()
+        seed_location(second.id)
+        db.session.commit()
+        second_id = second.id
+    location_registry.refresh()
+    # Erster Aufruf lädt die Standorte neu und füllt den Cache des zweiten Standorts;
+    # eine gestreamte Seite wird erst gespeichert, wenn sie vollständig gelesen ist
+    warmup = client.get('/bench-zweite/menu')
+    warmup.get_data()
+    warmup.close()
+    measure('menu_second_location', iterations, lambda i: client.get('/bench-zweite/menu'))
+    measure('menu_other_changed', iterations, lambda i: client.get('/menu'),
+            prepare=lambda i: content_changed(second_id))
+    measure('api_menu', iterations, lambda i: client.get('/api/menu'))
+    measure('api_menu_br', iterations, lambda i: client.get('/api/menu', headers=BROWSER_ENCODINGS))
+    measure('search', iterations, lambda i: client.get('/api/menu/search?q=gyr&vegan=1'))
+    measure('search_filter', iterations,
+            lambda i: client.get(f'/api/menu/search?vegetarian=1&spicy=0&max_price=12&page={i % 5 + 1}'))
+
+    # Passwort-Hashing ist absichtlich teuer, daher weniger Durchläufe
+    measure('login', login_iterations,
+            lambda i: client.post('/login', data={'username': 'admin', 'password': 'admin'}),
+            prepare=lambda i: login_limiter.reset())
+    # Gedrosselte Versuche werden vor Datenbank und Hashing abgewiesen
+    limit = app.config['LOGIN_LIMIT_IP'][0]
+    for _ in range(limit):
+        client.post('/login', data={'username': 'bench', 'password': 'falsch'}).close()
+    measure('login_throttled', iterations,
+            lambda i: client.post('/login', data={'username': 'admin', 'password': 'falsch'}), status=429)
+    login_limiter.reset()
+    measure('admin_menu', iterations, lambda i: client.get('/admin/menu'))
+    # Die Liste kommt seitenweise als JSON; jede Seite hinter ihrem Cursor, auch die letzten
+    measure('admin_items', iterations, lambda i: client.get('/admin/api/menu/items'))
+    cursors, cursor = [], client.get('/admin/api/menu/items').get_json()['next']
+    while cursor:
+        cursors.append(cursor)
+        cursor = client.get(f'/admin/api/menu/items?after={cursor}').get_json()['next']
+    measure('admin_items_deep', iterations,
+            lambda i: client.get(f'/admin/api/menu/items?after={cursors[-1 - i % len(cursors)]}'))
+    measure('admin_items_search', iterations, lambda i: client.get('/admin/api/menu/items?q=gyr'))
+
+    with app.app_context():
+        category_id = db.session.query(MenuCategory.id).order_by(MenuCategory.order).first()[0]
+        first_new_id = (db.session.query(db.func.max(MenuItem.id)).scalar() or 0) + 1
+
+    def form(i, name):
+        return {'name': f'{name} {i}', 'description': 'Benchmark', 'price': '9.90',
+                'category': str(category_id), 'vegetarian': 'on'}
+
+    # Wie admin_menu.js: Antwort ist nur die geänderte Zeile
+    measure('admin_add', iterations, lambda i: client.post('/admin/menu/add', data=form(i, 'Neu'), headers=ACCEPT_JSON))
+    with app.app_context():
+        new_ids = [row[0] for row in db.session.query(MenuItem.id)
+                   .filter(MenuItem.id >= first_new_id).order_by(MenuItem.id)]
+    if len(new_ids) != iterations:
+        raise RuntimeError(f'admin_add: {len(new_ids)} statt {iterations} Gerichte angelegt')
+    measure('admin_edit', iterations,
+            lambda i: client.post(f'/admin/menu/edit/{new_ids[i]}', data=form(i, 'Geändert'), headers=ACCEPT_JSON))
+    measure('admin_delete', iterations,
+            lambda i: client.post(f'/admin/menu/delete/{new_ids[i]}', headers=ACCEPT_JSON))
+    return results
+
+
+def cpu_ms(function, repeat=5):
+    # Schnellster von mehreren Durchläufen, gemessen als CPU-Zeit des Prozesses
+    timings = []
+    for _ in range(repeat):
+        start = time.process_time()
+        function()
+        timings.append(time.process_time() - start)
+    return round(min(timings) * 1000, 2)
+
+
+def compression_phase():
+    """Gesparte Bytes und CPU-Kosten je Kodierung.
+
+    Dynamische Seiten mit den Einstellungen der Middleware (fällt einmal pro
+    Inhaltsversion an, bei gestreamten Seiten pro Aufruf), static/ mit der
+    höchsten Stufe von "flask build-assets" (fällt nur beim Build an).
+    """
+    import compression
+    from app import app, response_compression
+
+    def describe(data, level, quality):
+        result = {'bytes': len(data)}
+        for encoding in compression.encodings():
+            compressed = compression.compress(data, encoding, level, quality)
+            result[f'{encoding}_bytes'] = len(compressed)
+            result[f'{encoding}_saved_pct'] = round(100 * (1 - len(compressed) / len(data)), 1)
+            result[f'{encoding}_cpu_ms'] = cpu_ms(lambda: compression.compress(data, encoding, level, quality))
+        return result
+
+    results = {}
+    client = app.test_client()
+    for path in COMPRESSED_PATHS:
+        response = client.get(path)
+        results[path] = describe(response.get_data(), response_compression.level, response_compression.quality)
+        response.close()
+
+    static = b''.join(
+        open(os.path.join(app.static_folder, name), 'rb').read()
+        for name in sorted(os.listdir(app.static_folder)) if name.endswith(compression.COMPRESSIBLE_EXTENSIONS)
+    )
+    results['static'] = describe(static, 9, 11)
+    return results
+
+
+def wait_for(port, timeout):
+    started = time.perf_counter()
+    while time.perf_counter() - started < timeout:
+        try:
+            connection = http.client.HTTPConnection('127.0.0.1', port, timeout=1)
+            connection.request('GET', '/api/status')
+            connection.getresponse().read()
+            connection.close()
+            return
+        except OSError:
+            time.sleep(0.05)
+    raise TimeoutError(f'gunicorn antwortet nicht nach {timeout}s')
+
+
+def load(port, concurrency, seconds):
+    schedule = [(path, endpoint) for path, endpoint, weight in HTTP_MIX for _ in range(weight)]
+    stop = threading.Event()
+    lock = threading.Lock()
+    latencies = {path: [] for path, _, _ in HTTP_MIX}
+    first_bytes = {path: [] for path in latencies}
+    received = {path: 0 for path in latencies}
+    errors = []
+
+    def worker(offset):
+        connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        local = {path: [] for path in latencies}
+        local_first = {path: [] for path in latencies}
+        local_bytes = {path: 0 for path in latencies}
+        index = offset
+        while not stop.is_set():
+            path, _ = schedule[index % len(schedule)]
+            index += 1
+            start = time.perf_counter()
+            try:
+                connection.request('GET', path, headers=BROWSER_ENCODINGS)
+                response = connection.getresponse()
+                # getresponse() kehrt nach Statuszeile und Headern zurück
+                first_byte = time.perf_counter() - start
+                body = response.read()
+                if response.status >= 400:
+                    raise RuntimeError(f'{path}: Status {response.status}')
+                local[path].append(time.perf_counter() - start)
+                local_first[path].append(first_byte)
+                local_bytes[path] += len(body)
+            except (OSError, http.client.HTTPException, RuntimeError) as e:
+                with lock:
+                    errors.append(str(e))
+                connection.close()
+                connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+        connection.close()
+        with lock:
+            for path, values in local.items():
+                latencies[path].extend(values)
+                first_bytes[path].extend(local_first[path])
+                received[path] += local_bytes[path]
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(concurrency)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    everything = [value for values in latencies.values() for value in values]
+    everything_first = [value for values in first_bytes.values() for value in values]
+    return {
+        'total': dict(summary(everything, elapsed, everything_first), errors=len(errors)),
+        'paths': {path: dict(summary(values, elapsed, first_bytes[path]),
+                             bytes_per_request=received[path] // len(values))
+                  for path, values in latencies.items() if values},
+        'error_samples': sorted(set(errors))[:5],
+    }
+
+
+def sql_per_endpoint(port):
+    from prometheus_client.parser import text_string_to_metric_families
+
+    connection = http.client.HTTPConnection('127.0.0.1', port, timeout=10)
+    connection.request('GET', '/metrics')
+    body = connection.getresponse().read().decode()
+    connection.close()
+    sums, counts = {}, {}
+    for family in text_string_to_metric_families(body):
+        if family.name != 'http_request_sql_statements':
+            continue
+        for sample in family.samples:
+            endpoint = sample.labels.get('endpoint')
+            if sample.name.endswith('_sum'):
+                sums[endpoint] = sums.get(endpoint, 0) + sample.value
+            elif sample.name.endswith('_count'):
+                counts[endpoint] = counts.get(endpoint, 0) + sample.value
+    return {endpoint: round(sums.get(endpoint, 0) / count, 2) for endpoint, count in counts.items() if count}
+
+
+def http_phase(database_url, workers, threads, concurrency, seconds, warmup):
+    port = free_port()
+    metrics_dir = tempfile.mkdtemp(prefix='alas-bench-metrics-')
+    env = dict(os.environ, PYTHONPATH=ROOT, DATABASE_URL=database_url, PROMETHEUS_MULTIPROC_DIR=metrics_dir,
+               WEB_CONCURRENCY=str(workers), GUNICORN_THREADS=str(threads))
+    env.pop('SLOW_REQUEST_MS', None)
+    env.pop('METRICS_TOKEN', None)
+    env.pop('FLASK_ENV', None)
+    process = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn_config.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        wait_for(port, timeout=30)
+        if warmup:
+            load(port, concurrency, warmup)
+        result = load(port, concurrency, seconds)
+        queries = sql_per_endpoint(port)
+        for path, endpoint, _ in HTTP_MIX:
+            if path in result['paths'] and endpoint in queries:
+                result['paths'][path]['queries_per_request'] = queries[endpoint]
+        return result
+    finally:
+        process.terminate()
+        process.wait()
+        shutil.rmtree(metrics_dir, ignore_errors=True)
+
+
+def check_thresholds(results, thresholds):
+    """Grenzwerte je Szenario: "p95_ms": 50 heißt höchstens, "min_rps": 200 mindestens."""
+    violations = []
+    for phase, scenarios in thresholds.items():
+        for name, limits in scenarios.items():
+            measured = results.get(phase, {})
+            if phase == 'http' and name != 'total':
+                measured = measured.get('paths', {})
+            measured = measured.get(name)
+            if measured is None:
+                continue
+            for key, limit in limits.items():
+                metric = key[4:] if key.startswith('min_') else key
+                value = measured.get(metric)
+                if value is None:
+                    continue
+                if key.startswith('min_') and value < limit:
+                    violations.append(f'{phase}/{name}: {metric} {value} < {limit}')
+                elif not key.startswith('min_') and value > limit:
+                    violations.append(f'{phase}/{name}: {metric} {value} > {limit}')
+    return violations
+
+
+def compare_baseline(results, baseline, tolerance):
+    violations = []
+    pairs = [('client', name, results['client'].get(name), values)
+             for name, values in baseline.get('client', {}).items()]
+    pairs += [('http', path, results.get('http', {}).get('paths', {}).get(path), values)
+              for path, values in baseline.get('http', {}).get('paths', {}).items()]
+    for phase, name, measured, previous in pairs:
+        if measured is None:
+            continue
+        for metric in BASELINE_METRICS:
+            if metric not in measured or metric not in previous:
+                continue
+            if metric == 'queries_per_request':
+                limit = previous[metric]
+            else:
+                # Kleine Latenzen schwanken stark, deshalb mindestens 1 ms Spielraum
+                limit = previous[metric] * (1 + tolerance) + 1
+            if measured[metric] > limit:
+                violations.append(f'{phase}/{name}: {metric} {measured[metric]} > Baseline {previous[metric]}')
+    return violations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='statt einer temporären SQLite-Datei diese Datenbank befüllen')
+    parser.add_argument('--items', type=int, default=1000, help='Anzahl Gerichte (10 bis 50000)')
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--images', type=int, default=8)
+    parser.add_argument('--iterations', type=int, default=100, help='Anfragen je Szenario im Testclient')
+    parser.add_argument('--login-iterations', type=int, default=10)
+    parser.add_argument('--no-http', dest='http', action='store_false', help='Phase 2 (gunicorn) überspringen')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--concurrency', type=int, default=8, help='Threads des Lastgenerators')
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--warmup', type=float, default=2)
+    parser.add_argument('--thresholds', help='JSON-Datei mit Grenzwerten, z.B. benchmarks/thresholds.json')
+    parser.add_argument('--baseline', help='früheres Ergebnis, das nicht schlechter werden darf')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='erlaubte Verschlechterung der Latenz')
+    parser.add_argument('--output', help='Ergebnis zusätzlich in diese Datei schreiben')
+    parser.add_argument('--keep-images', action='store_true', help='Testbilder nach dem Lauf nicht löschen')
+    args = parser.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix='alas-bench-')
+    database_url = args.database_url or f"sqlite:///{os.path.join(tmp, 'bench.db')}"
+    # app liest DATABASE_URL beim Import, deshalb erst danach importieren
+    os.environ['DATABASE_URL'] = database_url
+    os.environ.pop('PROMETHEUS_MULTIPROC_DIR', None)
+    # Der Job-Verteiler fragt im Hintergrund die Datenbank ab und verfälscht sonst die SQL-Zählung
+    os.environ['JOB_WORKERS'] = '0'
+    import synthetic
+    from app import app
+
+    try:
+        with app.app_context():
+            seeded = synthetic.seed(args.items, args.categories, args.images)
+        results = {
+            'config': {key: getattr(args, key) for key in
+                       ('items', 'categories', 'images', 'iterations', 'workers', 'threads', 'concurrency',
+                        'seconds')},
+            'seed': seeded,
+            'client': client_phase(args.iterations, args.login_iterations),
+            'compression': compression_phase(),
+        }
+        if args.http:
+            results['http'] = http_phase(database_url, args.workers, args.threads, args.concurrency,
+                                         args.seconds, args.warmup)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if not args.keep_images:
+            shutil.rmtree(synthetic.image_folder(app.static_folder), ignore_errors=True)
+
+    violations = []
+    if args.thresholds:
+        with open(args.thresholds) as f:
+            violations += check_thresholds(results, json.load(f))
+    if args.baseline:
+        with open(args.baseline) as f:
+            violations += compare_baseline(results, json.load(f), args.tolerance)
+    results['violations'] = violations
+
+    output = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+    print(output)
+    if violations:
+        print('\n'.join(['Grenzwerte überschritten:'] + violations), file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
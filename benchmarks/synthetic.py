@@ -0,0 +1,148 @@
+"""Synthetische Speisekarte für Benchmarks.
+
+Legt die Tabellen an (init_db) und ersetzt alle Kategorien und Gerichte
+des Standard-Standorts durch reproduzierbare Testdaten: beliebig viele Gerichte auf viele
+Kategorien verteilt, ein Teil davon mit Bildern aus dem Upload-Store.
+Ohne --database-url landet alles in DATABASE_URL bzw. restaurant.db.
+
+    python benchmarks/synthetic.py --items 5000 --categories 60 --images 12
+    python benchmarks/synthetic.py --database-url sqlite:////tmp/bench.db --items 50000
+"""
+import argparse
+import json
+import os
+import random
+import sys
+from io import BytesIO
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Unterordner von static/uploads, damit sich Testbilder gezielt entfernen lassen
+IMAGE_PREFIX = 'uploads/bench'
+
+DISHES = ['Gyros', 'Souvlaki', 'Moussaka', 'Bifteki', 'Pastitsio', 'Kalamari', 'Dolmades',
+          'Spanakopita', 'Keftedes', 'Stifado', 'Kleftiko', 'Saganaki', 'Tzatziki', 'Horiatiki']
+STYLES = ['vom Grill', 'mit Pommes', 'mit Reis', 'überbacken', 'nach Art des Hauses',
+          'mit Metaxasoße', 'mit Feta', 'für zwei Personen']
+DRINKS = ['Ouzo', 'Retsina', 'Mythos', 'Frappé', 'Mineralwasser', 'Apfelschorle', 'Rotwein', 'Weißwein']
+SIDES = ['Tzatziki', 'Krautsalat', 'Pita', 'Zwiebeln', 'Peperoni', 'Oliven', 'Knoblauch']
+
+
+def image_folder(static_folder):
+    return os.path.join(static_folder, *IMAGE_PREFIX.split('/'))
+
+
+def make_image(index, size=(1600, 1200)):
+    """Ein eindeutiges JPEG je index, damit der Store jedes Bild neu verarbeitet."""
+    from PIL import Image, ImageDraw
+
+    rng = random.Random(index)
+    img = Image.new('RGB', size, tuple(rng.randrange(256) for _ in range(3)))
+    draw = ImageDraw.Draw(img)
+    for _ in range(24):
+        x, y = rng.randrange(size[0]), rng.randrange(size[1])
+        radius = rng.randrange(40, 300)
+        draw.ellipse((x - radius, y - radius, x + radius, y + radius),
+                     fill=tuple(rng.randrange(256) for _ in range(3)))
+    buffer = BytesIO()
+    img.save(buffer, 'JPEG', quality=90)
+    buffer.seek(0)
+    return buffer
+
+
+def seed(items, categories, images=8, image_share=0.3, drink_share=0.25, random_seed=1):
+    """Ersetzt die Speisekarte des Standard-Standorts; muss im App-Kontext laufen.
+    Liefert eine Zusammenfassung."""
+    from sqlalchemy import func, insert
+
+    from app import app, db, init_db, content_changed, location_registry, MenuCategory, MenuItem
+    from upload_store import UploadStore
+
+    rng = random.Random(random_seed)
+    init_db()
+    location_id = location_registry.default().id
+    db.session.query(MenuItem).filter(MenuItem.location_id == location_id).delete()
+    db.session.query(MenuCategory).filter(MenuCategory.location_id == location_id).delete()
+    # Feste ids hinter denen anderer Standorte
+    category_base = db.session.query(func.coalesce(func.max(MenuCategory.id), 0)).scalar()
+    item_base = db.session.query(func.coalesce(func.max(MenuItem.id), 0)).scalar()
+
+    drink_categories = round(categories * drink_share)
+    category_rows = [
+        {'id': category_base + c + 1, 'name': f'kategorie-{c + 1}', 'display_name': f'Kategorie {c + 1}',
+         'order': c + 1, 'is_drink_category': c >= categories - drink_categories, 'location_id': location_id}
+        for c in range(categories)
+    ]
+    db.session.execute(insert(MenuCategory), category_rows)
+
+    store = UploadStore(image_folder(app.static_folder), url_prefix=IMAGE_PREFIX)
+    image_sets = [store.save(make_image(i)) for i in range(images)]
+
+    rows = []
+    for i in range(items):
+        category = category_rows[i % categories]
+        if category['is_drink_category']:
+            name = f'{rng.choice(DRINKS)} {rng.choice(["0,2 l", "0,4 l", "0,5 l", "1 l"])}'
+            description = None
+        else:
+            name = f'{rng.choice(DISHES)} {rng.choice(STYLES)}'
+            description = 'Mit ' + ', '.join(rng.sample(SIDES, 3))
+        vegan = rng.random() < 0.1
+        row = {
+            'id': item_base + i + 1,
+            'name': f'{name} {i + 1}',
+            'description': description,
+            'price': round(rng.uniform(2.5, 32), 1),
+            'category_id': category['id'],
+            'location_id': location_id,
+            'vegetarian': vegan or rng.random() < 0.2,
+            'vegan': vegan,
+            'spicy': rng.random() < 0.15,
+            'image_path': None,
+            'image_variants': None,
+        }
+        if image_sets and rng.random() < image_share:
+            variants = rng.choice(image_sets)
+            row['image_path'], row['image_variants'] = variants['src'], json.dumps(variants)
+        rows.append(row)
+        if len(rows) == 5000:
+            db.session.execute(insert(MenuItem), rows)
+            rows = []
+    if rows:
+        db.session.execute(insert(MenuItem), rows)
+    db.session.commit()
+    content_changed(location_id)
+
+    return {
+        'items': items,
+        'categories': categories,
+        'drink_categories': drink_categories,
+        'images': len(image_sets),
+        'items_with_image': MenuItem.query.filter(MenuItem.location_id == location_id,
+                                                  MenuItem.image_path.isnot(None)).count(),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database-url', help='Zieldatenbank, sonst DATABASE_URL bzw. restaurant.db')
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--categories', type=int, default=40)
+    parser.add_argument('--images', type=int, default=8, help='Anzahl verschiedener Bilder')
+    parser.add_argument('--image-share', type=float, default=0.3, help='Anteil der Gerichte mit Bild')
+    parser.add_argument('--seed', type=int, default=1, help='Startwert für reproduzierbare Daten')
+    args = parser.parse_args()
+
+    if args.database_url:
+        # app liest DATABASE_URL beim Import
+        os.environ['DATABASE_URL'] = args.database_url
+    from app import app
+
+    with app.app_context():
+        result = seed(args.items, args.categories, args.images, args.image_share, random_seed=args.seed)
+    print(json.dumps(result, indent=2))
+
+
+if __name__ == '__main__':
+    main()
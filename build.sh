@@ -4,8 +4,11 @@ set -o errexit
 
 pip install -r requirements.txt
 
-# Führe zuerst die Migration aus
-python migrations.py
+# CSS/JS minifizieren und mit Inhalts-Hash versehen
+flask --app app build-assets
 
-# Dann initialisiere die restliche DB
-python init_db.py
+# Schema versioniert und ohne Datenverlust auf den aktuellen Stand bringen
+flask --app app migrate-db
+
+# Dann initialisiere die restliche DB (einmalig hier, nicht beim Start der Worker)
+flask --app app init-db
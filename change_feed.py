@@ -0,0 +1,309 @@
+import json
+import os
+import threading
+import time
+from collections import deque, namedtuple
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, insert, select
+
+# Ein Eintrag im Puffer: id aus der Tabelle, Art (z.B. menu_item), fertig kodierte Daten
+# und Standort (None: betrifft alle)
+Change = namedtuple('Change', ['id', 'kind', 'data', 'location_id'])
+
+MAX_BULK_IDS = 100
+
+
+class FeedBusy(Exception):
+    """Alle Plätze für Live-Verbindungen dieses Prozesses sind belegt."""
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _json_default(value):
+    return value.isoformat() if hasattr(value, 'isoformat') else str(value)
+
+
+def sse(event_id, kind, data):
+    return f'id: {event_id}\nevent: {kind}\ndata: {data}\n\n'
+
+
+class ChangeFeed:
+    """Änderungsprotokoll für Speisekarte und Öffnungszeiten, verteilt per Server-Sent Events.
+
+    Jede Änderung an den überwachten Modellen schreibt in derselben
+    Transaktion eine Zeile in die Tabelle model: einzelne Objekte über
+    after_flush, Sammel-INSERT/UPDATE/DELETE über do_orm_execute. So gibt es
+    einen Eintrag genau dann, wenn die Änderung committet wurde, egal in
+    welchem Worker.
+
+    Pro Prozess liest ein Verteiler-Thread neue Zeilen ab einem Cursor (der
+    letzten gesehenen id), hält die letzten buffer_size im Speicher und weckt
+    die wartenden Verbindungen. Er fragt die Datenbank nur ab, solange
+    Verbindungen offen sind, und dann einmal je poll_interval für alle
+    zusammen; Commits im eigenen Prozess wecken ihn sofort.
+
+    In PostgreSQL vergibt die Sequenz die id schon beim INSERT, eine ältere
+    Transaktion kann also nach einer jüngeren committen. Der Cursor rückt
+    deshalb nicht über eine Lücke in den ids hinweg: poll() liest ab der
+    Lücke erneut, bis die fehlende Zeile auftaucht oder die Lücke älter als
+    gap_timeout Sekunden ist (dann war es ein Rollback).
+
+    Jede Meldung trägt den Standort des geänderten Objekts, Sammeländerungen
+    den von location() (z.B. den der Anfrage). Eine Verbindung erhält nur
+    Meldungen ihres Standorts.
+    """
+
+    def __init__(self, app, db, model, tracked, poll_interval=1.0, buffer_size=1000, max_clients=2,
+                 max_age=300, heartbeat=15, keep=timedelta(days=7), location=None, gap_timeout=5):
+        self.app = app
+        self.db = db
+        self.model = model
+        # {Modellklasse: (Art, Felder in der Meldung)}
+        self.tracked = tracked
+        self.location = location or (lambda: None)
+        self.poll_interval = poll_interval
+        self.max_age = max_age
+        self.heartbeat = heartbeat
+        self.keep = keep
+        self.gap_timeout = gap_timeout
+        self.buffer = deque(maxlen=buffer_size)
+        self.cursor = None
+        # Alles bis einschließlich floor ist aus dem Puffer gefallen (oder war nie darin)
+        self.floor = None
+        # {erste fehlende id: monotonic(), seit die Lücke bekannt ist}
+        self._gaps = {}
+        self.clients = 0
+        self._condition = threading.Condition()
+        self._poll_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._slots = threading.BoundedSemaphore(max(max_clients, 1))
+        self._pid = None
+        self._last_cleanup = 0
+        event.listen(db.session, 'after_flush', self._after_flush)
+        event.listen(db.session, 'do_orm_execute', self._bulk_statement)
+
+    # Schreiben
+
+    def _payload(self, obj, action):
+        kind, fields = self.tracked[type(obj)]
+        data = {'action': action, 'id': obj.id}
+        if action != 'deleted':
+            data.update((field, getattr(obj, field)) for field in fields)
+        return kind, data, getattr(obj, 'location_id', None)
+
+    def _insert(self, session, rows):
+        now = utcnow()
+        session.connection().execute(insert(self.model), [
+            {'kind': kind, 'data': json.dumps(data, ensure_ascii=False, separators=(',', ':'),
+                                              default=_json_default),
+             'location_id': location_id, 'created_at': now}
+            for kind, data, location_id in rows
+        ])
+        # Verbindungen im eigenen Prozess nach dem Commit sofort bedienen
+        if not session.info.get('change_feed_wake'):
+            session.info['change_feed_wake'] = True
+            event.listen(session, 'after_commit', self._wake_after_commit, once=True)
+
+    def _wake_after_commit(self, session):
+        session.info.pop('change_feed_wake', None)
+        self._wakeup.set()
+
+    def _after_flush(self, session, flush_context):
+        rows = []
+        for obj in session.new:
+            if type(obj) in self.tracked:
+                rows.append(self._payload(obj, 'created'))
+        for obj in session.dirty:
+            if type(obj) in self.tracked and session.is_modified(obj, include_collections=False):
+                rows.append(self._payload(obj, 'updated'))
+        for obj in session.deleted:
+            if type(obj) in self.tracked:
+                rows.append(self._payload(obj, 'deleted'))
+        if rows:
+            self._insert(session, rows)
+
+    def _bulk_statement(self, orm_execute_state):
+        # INSERT/UPDATE/DELETE ohne einzelne Objekte: eine Meldung je Anweisung
+        if not (orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete):
+            return None
+        mapper = orm_execute_state.bind_mapper
+        if mapper is None or mapper.class_ not in self.tracked:
+            return None
+        result = orm_execute_state.invoke_statement()
+        parameters = orm_execute_state.parameters
+        rows = parameters if isinstance(parameters, list) else [parameters or {}]
+        ids = [row['id'] for row in rows if 'id' in row]
+        if orm_execute_state.is_insert:
+            action = 'created'
+        else:
+            action = 'updated' if orm_execute_state.is_update else 'deleted'
+        count = len(rows) if isinstance(parameters, list) else result.rowcount
+        data = {'action': action, 'bulk': True, 'count': count}
+        if ids and len(ids) <= MAX_BULK_IDS:
+            data['ids'] = ids
+        self._insert(orm_execute_state.session, [(self.tracked[mapper.class_][0], data, self.location())])
+        return result
+
+    # Lesen
+
+    def _fetch(self, after, upto=None, limit=500):
+        Event = self.model
+        query = select(Event.id, Event.kind, Event.data, Event.location_id).where(Event.id > after)
+        if upto is not None:
+            query = query.where(Event.id <= upto)
+        return [Change(row.id, row.kind, row.data, row.location_id)
+                for row in self.db.session.execute(query.order_by(Event.id).limit(limit))]
+
+    def poll(self):
+        """Übernimmt neue Einträge aus der Tabelle in den Puffer und weckt die Verbindungen."""
+        with self._poll_lock:
+            if self.cursor is None:
+                # Beim ersten Mal nur den Stand merken, die Historie bleibt in der Tabelle
+                self.cursor = self.floor = self.db.session.query(
+                    func.coalesce(func.max(self.model.id), 0)).scalar()
+                return
+            changes = self._contiguous(self._fetch(self.cursor))
+            if not changes:
+                return
+            with self._condition:
+                overflow = len(self.buffer) + len(changes) - self.buffer.maxlen
+                if overflow > 0:
+                    self.floor = (list(self.buffer) + changes)[overflow - 1].id
+                self.buffer.extend(changes)
+                self.cursor = changes[-1].id
+                self._condition.notify_all()
+            self._gaps = {gap: since for gap, since in self._gaps.items() if gap > self.cursor}
+
+    def _contiguous(self, changes):
+        # Nur bis vor die erste Lücke, die noch nicht gap_timeout alt ist; der Rest wird
+        # beim nächsten poll() erneut gelesen, samt der bis dahin committeten Zeile
+        expected = self.cursor + 1
+        for index, change in enumerate(changes):
+            if change.id != expected:
+                since = self._gaps.setdefault(expected, time.monotonic())
+                if time.monotonic() - since < self.gap_timeout:
+                    return changes[:index]
+            expected = change.id + 1
+        return changes
+
+    def cleanup(self):
+        Event = self.model
+        self.db.session.query(Event).filter(Event.created_at < utcnow() - self.keep).delete(
+            synchronize_session=False)
+        self.db.session.commit()
+
+    def start(self):
+        """Startet den Verteiler einmal pro Prozess (nach einem fork erneut)."""
+        if self._pid == os.getpid():
+            return
+        with self._poll_lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self.buffer.clear()
+            self.cursor = self.floor = None
+            self._gaps = {}
+            threading.Thread(target=self._dispatch, name='change-feed', daemon=True).start()
+
+    def _dispatch(self):
+        while True:
+            # Ohne Verbindungen schläft der Thread, bis sich jemand anmeldet
+            self._wakeup.wait(self.poll_interval if self.clients else None)
+            self._wakeup.clear()
+            if not self.clients:
+                continue
+            try:
+                with self.app.app_context():
+                    self.poll()
+                    if time.monotonic() - self._last_cleanup > 3600:
+                        self.cleanup()
+                        self._last_cleanup = time.monotonic()
+            except Exception:
+                self.app.logger.exception('Fehler im Änderungs-Verteiler')
+
+    def _backlog(self, since):
+        # Verpasste Einträge aus dem Puffer, sonst einmalig aus der Tabelle.
+        # None heißt: Lücke zu groß, zu alt oder unbekannte id, der Client muss neu laden.
+        with self._condition:
+            if since > self.cursor:
+                return None
+            if since >= self.floor:
+                return [change for change in self.buffer if change.id > since]
+        Event = self.model
+        oldest = self.db.session.query(func.min(Event.id)).scalar()
+        if oldest is None or oldest > since + 1:
+            return None
+        changes = self._fetch(since, upto=self.cursor, limit=self.buffer.maxlen + 1)
+        return None if len(changes) > self.buffer.maxlen else changes
+
+    def stream(self, last_event_id=None, location_id=None):
+        """Bereitet eine Verbindung vor und liefert den Generator der Meldungen (ohne
+        location_id die aller Standorte).
+
+        Alle Datenbankzugriffe passieren hier, noch im Request; der Generator
+        selbst wartet nur auf den Verteiler.
+        """
+        if not self._slots.acquire(blocking=False):
+            raise FeedBusy()
+        try:
+            self.start()
+            with self._condition:
+                self.clients += 1
+            # Der Verteiler hat womöglich geschlafen: Stand jetzt einmal abgleichen
+            self.poll()
+            self._wakeup.set()
+            backlog = self._backlog(last_event_id) if last_event_id is not None else []
+        except Exception:
+            self._release()
+            raise
+        return self._events(self.cursor if last_event_id is None else last_event_id, backlog, location_id)
+
+    def _release(self):
+        with self._condition:
+            self.clients -= 1
+        self._slots.release()
+
+    def _events(self, last, backlog, location_id=None):
+        def visible(change):
+            return location_id is None or change.location_id in (None, location_id)
+
+        try:
+            # Wiederverbinden nach 3 Sekunden, nicht nach der Browser-Vorgabe. Die id gibt
+            # dem Browser einen Stand für Last-Event-ID, auch wenn bis dahin nichts passiert
+            yield f'retry: 3000\nid: {last if backlog is not None else self.cursor}\n\n'
+            if backlog is None:
+                yield sse(self.cursor, 'reset', '{}')
+                last = self.cursor
+            else:
+                for change in backlog:
+                    if visible(change):
+                        yield sse(change.id, change.kind, change.data)
+                    last = max(last, change.id)
+            ends = time.monotonic() + self.max_age
+            while time.monotonic() < ends:
+                with self._condition:
+                    self._condition.wait_for(lambda: self.cursor > last, timeout=self.heartbeat)
+                    # Zu langsam gelesen, der Puffer ist weitergelaufen
+                    pending = None if last < self.floor else [change for change in self.buffer if change.id > last]
+                if pending is None:
+                    yield sse(self.cursor, 'reset', '{}')
+                    last = self.cursor
+                elif pending:
+                    # Meldungen anderer Standorte nur überspringen
+                    for change in pending:
+                        if visible(change):
+                            yield sse(change.id, change.kind, change.data)
+                    last = pending[-1].id
+                else:
+                    # Kommentarzeile hält Proxys wach und erkennt geschlossene Verbindungen
+                    yield ': ping\n\n'
+        finally:
+            self._release()
+
+    def stats(self):
+        with self._condition:
+            return {'pid': os.getpid(), 'clients': self.clients, 'cursor': self.cursor,
+                    'buffered': len(self.buffer)}
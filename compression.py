@@ -0,0 +1,244 @@
+import gzip
+import mimetypes
+import os
+import threading
+import zlib
+from collections import OrderedDict
+
+from flask import request, send_from_directory
+from werkzeug.security import safe_join
+
+try:
+    import brotli
+except ImportError:  # Ohne das Paket Brotli wird nur gzip angeboten
+    brotli = None
+
+# Inhalte, die sich lohnen; Bilder und Schriften sind bereits komprimiert
+COMPRESSIBLE_TYPES = {'text/html', 'text/css', 'text/plain', 'text/javascript', 'application/javascript',
+                      'application/json', 'application/xml', 'image/svg+xml'}
+COMPRESSIBLE_EXTENSIONS = ('.css', '.js', '.json', '.svg', '.html', '.txt', '.xml')
+SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+def encodings():
+    return ['br', 'gzip'] if brotli else ['gzip']
+
+
+def negotiate(accept_encodings):
+    """Beste Kodierung laut Accept-Encoding, bei Gleichstand Brotli; None = unkomprimiert."""
+    return accept_encodings.best_match(encodings())
+
+
+def compress(data, encoding, level=6, quality=4):
+    if encoding == 'br':
+        return brotli.compress(data, quality=quality)
+    # mtime=0: gleiche Eingabe, gleiche Bytes (für ETags und den Export)
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+class _GzipStream:
+    def __init__(self, level):
+        # wbits 16+: gzip-Kopf und -Prüfsumme statt rohem deflate
+        self._compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def chunk(self, data):
+        return self._compressor.compress(data) + self._compressor.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._compressor.flush()
+
+
+class _BrotliStream:
+    def __init__(self, quality):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def chunk(self, data):
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self):
+        return self._compressor.finish()
+
+
+def compress_stream(chunks, encoding, level=6, quality=4):
+    """Komprimiert einen gestreamten Body Stück für Stück.
+
+    Jedes Stück wird sofort bis zur Byte-Grenze geschrieben, damit der Browser
+    den Anfang der Seite nicht erst nach dem letzten Block sieht.
+    """
+    stream = _BrotliStream(quality) if encoding == 'br' else _GzipStream(level)
+    try:
+        for chunk in chunks:
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            if chunk:
+                yield stream.chunk(chunk)
+        yield stream.finish()
+    finally:
+        # Schließt u.a. den Anfragekontext von stream_with_context
+        close = getattr(chunks, 'close', None)
+        if close is not None:
+            close()
+
+
+class Compression:
+    """Komprimiert dynamische Antworten mit gzip oder Brotli nach Accept-Encoding.
+
+    Antworten unter min_size bleiben unverändert, gestreamte Seiten werden
+    blockweise komprimiert. Dateien aus static/ werden hier nicht angefasst:
+    Für sie legt precompress() beim Build .gz/.br-Geschwister an, die
+    serve_precompressed() ohne Rechenaufwand ausliefert. Antworten mit starkem
+    ETag (gecachte Seiten) werden nur einmal je Kodierung komprimiert.
+    """
+
+    def __init__(self, app=None, min_size=500, level=6, quality=4, cache_entries=64,
+                 cache_bytes=32 * 1024 * 1024):
+        self.min_size = min_size
+        self.level = level
+        self.quality = quality
+        self.cache_entries = cache_entries
+        self.cache_bytes = cache_bytes
+        self._cache = OrderedDict()
+        self._cache_size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.min_size = app.config.get('COMPRESS_MIN_SIZE', self.min_size)
+        self.level = app.config.get('COMPRESS_LEVEL', self.level)
+        self.quality = app.config.get('COMPRESS_BROTLI_QUALITY', self.quality)
+        app.after_request(self.after_request)
+        serve_precompressed(app)
+
+    def _cached(self, key, compress_data):
+        with self._lock:
+            data = self._cache.get(key)
+            if data is not None:
+                self._cache.move_to_end(key)
+                self.hits += 1
+                return data
+            self.misses += 1
+        data = compress_data()
+        if len(data) <= self.cache_bytes:
+            with self._lock:
+                if key not in self._cache:
+                    self._cache[key] = data
+                    self._cache_size += len(data)
+                while len(self._cache) > self.cache_entries or self._cache_size > self.cache_bytes:
+                    _, evicted = self._cache.popitem(last=False)
+                    self._cache_size -= len(evicted)
+        return data
+
+    def after_request(self, response):
+        if (request.method == 'HEAD' or response.status_code != 200 or response.direct_passthrough
+                or 'Content-Encoding' in response.headers or response.mimetype not in COMPRESSIBLE_TYPES
+                or 'no-transform' in response.headers.get('Cache-Control', '')):
+            return response
+        if not response.is_streamed and (response.calculate_content_length() or 0) < self.min_size:
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = negotiate(request.accept_encodings)
+        if encoding is None:
+            return response
+
+        etag, weak = response.get_etag()
+        if response.is_streamed:
+            response.response = compress_stream(response.response, encoding, self.level, self.quality)
+            response.headers.pop('Content-Length', None)
+        else:
+            data = response.get_data()
+            if etag and not weak:
+                compressed = self._cached((etag, encoding), lambda: compress(data, encoding, self.level,
+                                                                              self.quality))
+            else:
+                compressed = compress(data, encoding, self.level, self.quality)
+            if len(compressed) >= len(data):
+                return response
+            response.set_data(compressed)
+        response.headers['Content-Encoding'] = encoding
+        if etag:
+            # Andere Bytes, gleiche Ressource: If-None-Match vergleicht ohnehin schwach
+            response.set_etag(etag, weak=True)
+        return response
+
+    def stats(self):
+        with self._lock:
+            return {'pid': os.getpid(), 'entries': len(self._cache), 'bytes': self._cache_size,
+                    'hits': self.hits, 'misses': self.misses, 'encodings': encodings()}
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return 0
+
+
+def serve_precompressed(app):
+    """Liefert static/<datei> als <datei>.br bzw. .gz aus, wenn es die Datei gibt."""
+    original = app.view_functions['static']
+
+    def static(filename):
+        encoding = negotiate(request.accept_encodings)
+        if encoding is not None:
+            source = safe_join(app.static_folder, filename)
+            compressed = source and source + SUFFIXES[encoding]
+            # Ein älteres Geschwister stammt von einem früheren Stand der Datei
+            if compressed and os.path.isfile(compressed) and _mtime(compressed) >= _mtime(source):
+                response = send_from_directory(app.static_folder, filename + SUFFIXES[encoding],
+                                               mimetype=mimetypes.guess_type(filename)[0])
+                response.headers['Content-Encoding'] = encoding
+                response.vary.add('Accept-Encoding')
+                return response
+        response = original(filename=filename)
+        if filename.endswith(COMPRESSIBLE_EXTENSIONS):
+            response.vary.add('Accept-Encoding')
+        return response
+
+    app.view_functions['static'] = static
+
+
+def precompress(folder, min_size=500):
+    """Legt neben jeder komprimierbaren Datei in folder <datei>.gz und <datei>.br an.
+
+    Nur neue oder geänderte Dateien werden komprimiert (höchste Stufe, die
+    Arbeit fällt einmal beim Build an). Geschwister, die nichts sparen oder
+    deren Quelle fehlt, werden entfernt. Liefert [(Pfad, Originalgröße,
+    {Kodierung: Größe})] für alle komprimierten Dateien.
+    """
+    report = []
+    for root, directories, files in os.walk(folder):
+        directories.sort()
+        for name in sorted(files):
+            path = os.path.join(root, name)
+            base, suffix = os.path.splitext(path)
+            if suffix in SUFFIXES.values():
+                if not os.path.exists(base):
+                    os.remove(path)
+                continue
+            if not name.endswith(COMPRESSIBLE_EXTENSIONS):
+                continue
+            stat = os.stat(path)
+            sizes = {}
+            for encoding in encodings():
+                target = path + SUFFIXES[encoding]
+                if os.path.exists(target) and os.stat(target).st_mtime_ns >= stat.st_mtime_ns:
+                    sizes[encoding] = os.path.getsize(target)
+                    continue
+                with open(path, 'rb') as f:
+                    data = f.read()
+                compressed = compress(data, encoding, level=9, quality=11)
+                if stat.st_size < min_size or len(compressed) >= len(data):
+                    if os.path.exists(target):
+                        os.remove(target)
+                    continue
+                tmp_path = f'{target}.{os.getpid()}.tmp'
+                with open(tmp_path, 'wb') as f:
+                    f.write(compressed)
+                os.replace(tmp_path, target)
+                sizes[encoding] = len(compressed)
+            if sizes:
+                report.append((os.path.relpath(path, folder), stat.st_size, sizes))
+    return report
@@ -1,37 +0,0 @@
-from datetime import datetime
-from flask_sqlalchemy import SQLAlchemy
-from flask_login import UserMixin
-
-db = SQLAlchemy()
-
-class MenuItem(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    category = db.Column(db.String(100), nullable=False)
-    name = db.Column(db.String(200), nullable=False)
-    description = db.Column(db.Text)
-    price = db.Column(db.Float, nullable=False)
-    unit = db.Column(db.String(20))  # Für Mengenangaben wie "0,2l" oder "4cl"
-    is_drink = db.Column(db.Boolean, default=False)  # Unterscheidung zwischen Speisen und Getränken
-    active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-
-class MenuCategory(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    display_name = db.Column(db.String(100), nullable=False)  # Der angezeigte Name (z.B. "Vorspeisen")
-    is_drink_category = db.Column(db.Boolean, default=False)
-    order = db.Column(db.Integer, default=0)  # Für die Sortierung
-    active = db.Column(db.Boolean, default=True)
-
-class OpeningHours(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    day = db.Column(db.String(20), nullable=False)
-    day_display = db.Column(db.String(20), nullable=False)  # Deutscher Name
-    open_time = db.Column(db.String(5), nullable=False)
-    close_time = db.Column(db.String(5), nullable=False)
-    closed = db.Column(db.Boolean, default=False)
-
-class Admin(db.Model, UserMixin):
-    id = db.Column(db.Integer, primary_key=True)
-    username = db.Column(db.String(80), unique=True, nullable=False)
-    password_hash = db.Column(db.String(200), nullable=False)
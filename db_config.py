@@ -0,0 +1,91 @@
+import os
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+DEFAULT_DATABASE_URL = 'sqlite:///restaurant.db'
+
+# PRAGMAs für jede neue SQLite-Verbindung: WAL erlaubt Lesen während eines
+# Schreibvorgangs, NORMAL genügt im WAL-Modus für Absturzsicherheit
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'busy_timeout': 5000,
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -16000,
+    'temp_store': 'MEMORY',
+}
+
+
+def database_url():
+    url = os.environ.get('DATABASE_URL', DEFAULT_DATABASE_URL)
+    # Render und Heroku liefern postgres://, SQLAlchemy erwartet postgresql://
+    if url.startswith('postgres://'):
+        url = 'postgresql://' + url[len('postgres://'):]
+    return url
+
+
+def engine_options(url, threads=None, statement_timeout_ms=None):
+    """Engine-Optionen passend zu den gunicorn-Threads eines Workers.
+
+    Jeder Worker-Prozess hat seinen eigenen Pool. Ein Thread braucht höchstens
+    eine Verbindung, der Überlauf deckt CLI-Befehle und Hintergrundarbeit ab.
+    """
+    threads = threads or int(os.environ.get('GUNICORN_THREADS', 4))
+    statement_timeout_ms = statement_timeout_ms or int(os.environ.get('DB_STATEMENT_TIMEOUT_MS', 5000))
+    options = {
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', threads)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 2)),
+        'pool_timeout': 10,
+        'pool_pre_ping': True,
+    }
+    if url.startswith('sqlite'):
+        # Lokale Datei: kein Ping und kein Recycling nötig
+        options['pool_pre_ping'] = False
+        options['connect_args'] = {'timeout': SQLITE_PRAGMAS['busy_timeout'] / 1000, 'check_same_thread': False}
+    else:
+        options['pool_recycle'] = 1800
+        if url.startswith('postgresql'):
+            options['connect_args'] = {'options': f'-c statement_timeout={statement_timeout_ms}'}
+    return options
+
+
+def configure_sqlite(engine, pragmas=None):
+    """Setzt die PRAGMAs auf jeder neuen Verbindung der Engine (nur SQLite)."""
+    if engine.dialect.name != 'sqlite':
+        return
+    pragmas = SQLITE_PRAGMAS if pragmas is None else pragmas
+
+    @event.listens_for(engine, 'connect')
+    def set_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        for name, value in pragmas.items():
+            cursor.execute(f'PRAGMA {name}={value}')
+        cursor.close()
+
+
+@contextmanager
+def ddl_transaction(engine):
+    """Wie engine.begin(), aber in SQLite mit eigenem BEGIN, damit auch DDL zurückgerollt wird.
+
+    pysqlite beginnt Transaktionen erst vor INSERT/UPDATE/DELETE; ein
+    vorangehendes CREATE TABLE liefe sonst außerhalb und bliebe nach einem
+    Fehler bestehen. Nur für Migrationen: In normalen Anfragen würde ein
+    frühes BEGIN Lesen und Schreiben an einen Snapshot binden, und ein
+    Schreibzugriff nach dem Commit eines anderen Workers schlüge im WAL-Modus
+    sofort mit SQLITE_BUSY fehl.
+    """
+    if engine.dialect.name != 'sqlite':
+        with engine.begin() as connection:
+            yield connection
+        return
+    with engine.connect() as connection:
+        # AUTOCOMMIT schaltet das eigene Transaktionshandling von pysqlite ab
+        connection = connection.execution_options(isolation_level='AUTOCOMMIT')
+        connection.exec_driver_sql('BEGIN')
+        try:
+            yield connection
+        except BaseException:
+            connection.exec_driver_sql('ROLLBACK')
+            raise
+        connection.exec_driver_sql('COMMIT')
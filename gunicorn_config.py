@@ -1,4 +1,38 @@
+import os
+import shutil
+
 bind = "0.0.0.0:10000"
-workers = 2
-threads = 4
+wsgi_app = "wsgi:app"
+# Der Datenbank-Pool pro Worker richtet sich nach GUNICORN_THREADS (siehe db_config.py)
+workers = int(os.environ.get("WEB_CONCURRENCY", 2))
+threads = int(os.environ.get("GUNICORN_THREADS", 4))
 timeout = 120
+
+# Die App wird einmal im Master geladen, die Worker entstehen per fork
+# (copy-on-write) und müssen nichts mehr importieren
+preload_app = True
+
+# Gemeinsames Verzeichnis, über das /metrics die Werte aller Worker zusammenführt.
+# Muss gesetzt sein, bevor die App (und damit prometheus_client) geladen wird.
+os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", "/tmp/alas-metrics")
+
+
+def on_starting(server):
+    # Werte eines früheren Laufs verwerfen
+    directory = os.environ["PROMETHEUS_MULTIPROC_DIR"]
+    shutil.rmtree(directory, ignore_errors=True)
+    os.makedirs(directory, exist_ok=True)
+
+
+def post_fork(server, worker):
+    # Verbindungen aus dem Master nicht in die Worker mitnehmen
+    from app import app, db, job_queue
+    with app.app_context():
+        db.engine.dispose(close=False)
+    # Hintergrund-Jobs laufen in den Workern, nie im Master
+    job_queue.start()
+
+
+def child_exit(server, worker):
+    from prometheus_client import multiprocess
+    multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,111 @@
+import os
+
+from PIL import Image, ImageOps
+
+try:
+    # Optionales Plugin, registriert AVIF bei Pillow
+    import pillow_avif  # noqa: F401
+except ImportError:
+    pass
+
+# Maximale Breiten der erzeugten Varianten in Pixeln
+VARIANT_WIDTHS = (320, 640, 960, 1440)
+
+# Reihenfolge entspricht der Priorität im <picture>-Element, JPEG bleibt Fallback
+FORMATS = [
+    ('image/avif', 'AVIF', 'avif', {'quality': 55}),
+    ('image/webp', 'WEBP', 'webp', {'quality': 80, 'method': 6}),
+    ('image/jpeg', 'JPEG', 'jpg', {'quality': 82, 'optimize': True, 'progressive': True}),
+]
+
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.webp', '.gif', '.bmp', '.tif', '.tiff'}
+
+
+def available_formats():
+    Image.init()
+    return [fmt for fmt in FORMATS if fmt[1] in Image.SAVE]
+
+
+def verify(source):
+    """Prüft, ob source ein lesbares Bild ist, ohne es zu dekodieren; sonst ValueError."""
+    try:
+        with Image.open(source) as img:
+            img.verify()
+    except Exception as e:
+        # Pillow meldet kaputte Dateien je nach Format mit unterschiedlichen Fehlern
+        raise ValueError('Keine gültige Bilddatei') from e
+
+
+def _prepare(img, pil_format):
+    has_alpha = img.mode in ('RGBA', 'LA') or (img.mode == 'P' and 'transparency' in img.info)
+    if pil_format == 'JPEG' or not has_alpha:
+        if has_alpha:
+            # JPEG kennt keine Transparenz, deshalb auf weißen Hintergrund legen
+            rgba = img.convert('RGBA')
+            background = Image.new('RGB', rgba.size, (255, 255, 255))
+            background.paste(rgba, mask=rgba.getchannel('A'))
+            return background
+        return img.convert('RGB')
+    return img.convert('RGBA')
+
+
+def make_variants(source, output_dir, stem, url_prefix='uploads', widths=VARIANT_WIDTHS):
+    """Erzeugt verkleinerte Varianten eines Bildes in allen verfügbaren Formaten.
+
+    source ist ein Pfad oder ein Dateiobjekt. Die Dateien landen als
+    <stem>-<breite>.<endung> in output_dir. Metadaten (EXIF, GPS, ICC)
+    werden nicht übernommen, die EXIF-Ausrichtung wird vorher angewendet.
+    Zurück kommt die Beschreibung des Variantensatzes, wie sie in
+    MenuItem.image_variants gespeichert wird; alle Pfade sind relativ
+    zum static-Ordner.
+    """
+    with Image.open(source) as original:
+        original.load()
+        img = ImageOps.exif_transpose(original)
+    if img.mode not in ('RGB', 'RGBA', 'L', 'LA', 'P'):
+        img = img.convert('RGB')
+
+    width, height = img.size
+    targets = sorted({w for w in widths if w < width} | {min(width, max(widths))})
+    os.makedirs(output_dir, exist_ok=True)
+
+    sources = {}
+    largest = None
+    for target in targets:
+        target_height = max(1, round(height * target / width))
+        resized = img if target == width else img.resize((target, target_height), Image.LANCZOS)
+        for mime, pil_format, extension, options in available_formats():
+            filename = f'{stem}-{target}.{extension}'
+            _prepare(resized, pil_format).save(os.path.join(output_dir, filename), pil_format, **options)
+            sources.setdefault(mime, []).append([f'{url_prefix}/{filename}', target])
+        largest = (target, target_height)
+
+    return {
+        'width': largest[0],
+        'height': largest[1],
+        'src': sources['image/jpeg'][-1][0],
+        'sources': sources,
+    }
+
+
+def variant_files(variants):
+    """Alle Dateipfade (relativ zum static-Ordner) eines Variantensatzes."""
+    if not variants:
+        return []
+    return [path for candidates in variants['sources'].values() for path, _ in candidates]
+
+
+def process_directory(directory, widths=VARIANT_WIDTHS):
+    """Erzeugt Varianten für alle Bilder eines Ordners und legt sie daneben ab."""
+    results = {}
+    for name in sorted(os.listdir(directory)):
+        stem, extension = os.path.splitext(name)
+        if extension.lower() not in IMAGE_EXTENSIONS:
+            continue
+        # Bereits erzeugte Varianten (<stem>-<breite>) nicht erneut verarbeiten
+        base, _, suffix = stem.rpartition('-')
+        if base and suffix.isdigit():
+            continue
+        results[name] = make_variants(os.path.join(directory, name), directory, stem,
+                                      url_prefix=os.path.basename(directory), widths=widths)
+    return results
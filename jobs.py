@@ -0,0 +1,239 @@
+import json
+import os
+import threading
+import time
+import traceback
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import event, func, update
+
+PENDING, RUNNING, DONE, FAILED = 'pending', 'running', 'done', 'failed'
+
+
+def utcnow():
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+class JobQueue:
+    """Warteschlange für langsame Nebenarbeiten der Admin-Aktionen.
+
+    Jobs liegen als Zeilen in einer Tabelle (model) und überstehen damit
+    Neustarts. enqueue() fügt sie in die laufende Transaktion ein, so dass
+    ein Job genau dann existiert, wenn die auslösende Änderung committet
+    wurde. Jeder Prozess startet einen Verteiler-Thread, der fällige Jobs
+    per bedingtem UPDATE für sich beansprucht und in einem begrenzten
+    Thread-Pool ausführt. Fehlgeschlagene Jobs werden mit wachsendem
+    Abstand wiederholt; Jobs eines abgestürzten Prozesses gibt die
+    Lease-Zeit wieder frei.
+    """
+
+    def __init__(self, app, db, model, workers=1, poll_interval=5.0, lease=300,
+                 max_attempts=5, backoff=30, keep_done=timedelta(days=7)):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.lease = lease
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.keep_done = keep_done
+        self.handlers = {}
+        self._wakeup = threading.Event()
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def task(self, name):
+        """Registriert handler(payload, job) für Jobs dieses Namens."""
+        def register(handler):
+            self.handlers[name] = handler
+            return handler
+        return register
+
+    def enqueue(self, name, payload=None, key=None, delay=0):
+        """Legt einen Job in der aktuellen Session an; er wird mit ihrem Commit sichtbar.
+
+        Jobs mit demselben key ersetzen ältere, noch nicht erledigte Jobs (siehe superseded).
+        """
+        if name not in self.handlers:
+            raise ValueError(f'Unbekannter Job: {name}')
+        job = self.model(name=name, key=key, payload=json.dumps(payload or {}), status=PENDING,
+                         attempts=0, run_at=utcnow() + timedelta(seconds=delay), created_at=utcnow())
+        session = self.db.session()
+        session.add(job)
+        # Den Verteiler erst wecken, wenn der Job tatsächlich gespeichert ist
+        event.listen(session, 'after_commit', lambda session: self.wake(), once=True)
+        return job
+
+    def superseded(self, job):
+        """True, wenn nach diesem Job ein weiterer mit demselben key angelegt wurde."""
+        if not job.key:
+            return False
+        Job = self.model
+        return self.db.session.query(Job.id).filter(Job.key == job.key, Job.id > job.id).first() is not None
+
+    def wake(self):
+        self._wakeup.set()
+
+    def start(self):
+        """Startet den Verteiler einmal pro Prozess (nach einem fork erneut)."""
+        if self.workers <= 0 or self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._executor = ThreadPoolExecutor(self.workers, thread_name_prefix='job')
+            self._worker_id = f'{os.uname().nodename}:{self._pid}:{uuid.uuid4().hex[:6]}'
+            threading.Thread(target=self._dispatch, name='job-dispatcher', daemon=True).start()
+        # Liegengebliebene Jobs aus der Zeit vor dem Start sofort aufgreifen
+        self.wake()
+
+    def _dispatch(self):
+        last_cleanup = 0
+        while True:
+            self._wakeup.wait(self.poll_interval)
+            self._wakeup.clear()
+            try:
+                with self.app.app_context():
+                    if time.monotonic() - last_cleanup > self.lease:
+                        self.cleanup()
+                        last_cleanup = time.monotonic()
+                    while self._slots.acquire(blocking=False):
+                        job_id = self.claim(self._worker_id)
+                        if job_id is None:
+                            self._slots.release()
+                            break
+                        self._executor.submit(self._run_in_slot, job_id)
+            except Exception:
+                self.app.logger.exception('Fehler im Job-Verteiler')
+
+    def _run_in_slot(self, job_id):
+        try:
+            with self.app.app_context():
+                self.run(job_id)
+        finally:
+            self._slots.release()
+            # Ein frei gewordener Platz kann sofort den nächsten fälligen Job übernehmen
+            self.wake()
+
+    def claim(self, worker_id):
+        """Übernimmt den ältesten fälligen Job; None, wenn keiner ansteht."""
+        Job = self.model
+        session = self.db.session
+        now = utcnow()
+        candidates = session.query(Job.id).filter(Job.status == PENDING, Job.run_at <= now).order_by(
+            Job.run_at, Job.id).limit(5).all()
+        for job_id, in candidates:
+            # Nur ein Prozess gewinnt das bedingte UPDATE
+            claimed = session.execute(
+                update(Job).where(Job.id == job_id, Job.status == PENDING)
+                .values(status=RUNNING, started_at=now, locked_by=worker_id, attempts=Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            ).rowcount
+            session.commit()
+            if claimed:
+                return job_id
+        return None
+
+    def run(self, job_id):
+        session = self.db.session
+        job = session.get(self.model, job_id)
+        handler = self.handlers.get(job.name)
+        try:
+            if handler is None:
+                raise LookupError(f'Kein Handler für {job.name}')
+            handler(json.loads(job.payload), job)
+        except Exception as e:
+            session.rollback()
+            job = session.get(self.model, job_id)
+            job.last_error = ''.join(traceback.format_exception_only(e)).strip()[:2000]
+            if job.attempts >= self.max_attempts:
+                job.status = FAILED
+                job.finished_at = utcnow()
+                self.app.logger.exception('Job %s (%s) endgültig fehlgeschlagen', job.id, job.name)
+            else:
+                job.status = PENDING
+                job.run_at = utcnow() + timedelta(seconds=self.backoff * 2 ** (job.attempts - 1))
+                self.app.logger.warning('Job %s (%s) fehlgeschlagen, Versuch %s: %s',
+                                        job.id, job.name, job.attempts, job.last_error)
+        else:
+            job.status = DONE
+            job.finished_at = utcnow()
+            job.last_error = None
+        session.commit()
+
+    def run_pending(self, limit=None):
+        """Arbeitet fällige Jobs im aktuellen Thread ab (für die CLI); liefert die Anzahl."""
+        self.cleanup()
+        worker_id = f'cli:{os.getpid()}'
+        processed = 0
+        while limit is None or processed < limit:
+            job_id = self.claim(worker_id)
+            if job_id is None:
+                break
+            self.run(job_id)
+            processed += 1
+        return processed
+
+    def cleanup(self):
+        """Gibt Jobs abgestürzter Prozesse frei und löscht alte erledigte Jobs."""
+        Job = self.model
+        now = utcnow()
+        self.db.session.execute(
+            update(Job).where(Job.status == RUNNING, Job.started_at < now - timedelta(seconds=self.lease))
+            .values(status=PENDING, run_at=now, locked_by=None)
+            .execution_options(synchronize_session=False)
+        )
+        self.db.session.query(Job).filter(Job.status == DONE, Job.finished_at < now - self.keep_done).delete(
+            synchronize_session=False)
+        self.db.session.commit()
+
+    def retry(self, job_id):
+        """Stellt einen Job erneut ein; False, wenn er gerade noch läuft oder nicht fehlgeschlagen ist.
+
+        Laufende Jobs werden nur nach abgelaufener Lease übernommen, sonst
+        liefe derselbe Job zweimal gleichzeitig. Wie claim() entscheidet ein
+        bedingtes UPDATE, damit kein Verteiler den Job dazwischen übernimmt.
+        """
+        Job = self.model
+        now = utcnow()
+        retried = self.db.session.execute(
+            update(Job).where(Job.id == job_id, (Job.status == FAILED) | (
+                (Job.status == RUNNING) & (Job.started_at < now - timedelta(seconds=self.lease))))
+            .values(status=PENDING, attempts=0, run_at=now, finished_at=None, locked_by=None)
+            .execution_options(synchronize_session=False)
+        ).rowcount
+        self.db.session.commit()
+        if retried:
+            self.wake()
+        return bool(retried)
+
+    def stats(self, limit=50):
+        Job = self.model
+        session = self.db.session
+        counts = dict(session.query(Job.status, func.count(Job.id)).group_by(Job.status).all())
+
+        def describe(job):
+            return {
+                'id': job.id,
+                'name': job.name,
+                'key': job.key,
+                'status': job.status,
+                'attempts': job.attempts,
+                'run_at': job.run_at.isoformat() if job.run_at else None,
+                'created_at': job.created_at.isoformat() if job.created_at else None,
+                'last_error': job.last_error,
+            }
+
+        open_jobs = Job.query.filter(Job.status.in_([PENDING, RUNNING])).order_by(Job.run_at, Job.id).limit(limit)
+        failed_jobs = Job.query.filter(Job.status == FAILED).order_by(Job.finished_at.desc()).limit(limit)
+        return {
+            'counts': {status: counts.get(status, 0) for status in (PENDING, RUNNING, DONE, FAILED)},
+            'pending': [describe(job) for job in open_jobs],
+            'failed': [describe(job) for job in failed_jobs],
+            'workers': self.workers,
+        }
@@ -0,0 +1,101 @@
+import re
+from collections import namedtuple
+
+from page_cache import TTLCache
+
+# Schlüssel im WSGI-environ, unter dem die Middleware den Standort ablegt
+ENVIRON_KEY = 'restaurant.location'
+
+# Ein Standort ohne Bindung an eine Session, für Middleware, Caches und Templates
+LocationInfo = namedtuple('LocationInfo', ['id', 'slug', 'name', 'hostname', 'address'])
+
+# Alle Standorte eines Ladevorgangs
+Directory = namedtuple('Directory', ['locations', 'by_slug', 'by_hostname', 'default'])
+
+
+def normalize_host(host):
+    return (host or '').split(':', 1)[0].strip().lower().rstrip('.')
+
+
+def validate_slug(slug, reserved):
+    """ValueError, wenn slug kein gültiges Pfadpräfix ist oder mit einem Pfad der App (reserved) kollidiert."""
+    if not re.fullmatch(r'[a-z0-9][a-z0-9-]{0,49}', slug):
+        raise ValueError('Nur Kleinbuchstaben, Ziffern und Bindestriche erlaubt')
+    if slug in reserved:
+        raise ValueError(f'/{slug} ist bereits ein Pfad der Anwendung')
+    return slug
+
+
+class LocationRegistry:
+    """Liste der Standorte, pro Worker für ttl Sekunden zwischengespeichert.
+
+    Standorte ändern sich selten (nur per "flask add-location"); bis ein
+    neuer in allen Workern ankommt, vergeht höchstens ttl. Standard ist
+    default_slug, sonst der älteste Standort.
+    """
+
+    def __init__(self, app, db, model, default_slug=None, ttl=60):
+        self.app = app
+        self.db = db
+        self.model = model
+        self.default_slug = default_slug
+        self._cache = TTLCache(ttl)
+
+    def _load(self):
+        with self.app.app_context():
+            rows = self.db.session.query(self.model).order_by(self.model.id).all()
+            locations = [LocationInfo(row.id, row.slug, row.name, normalize_host(row.hostname) or None,
+                                      row.address) for row in rows]
+        by_slug = {location.slug: location for location in locations}
+        default = by_slug.get(self.default_slug) or (locations[0] if locations else None)
+        return Directory(locations, by_slug, {location.hostname: location for location in locations
+                                              if location.hostname}, default)
+
+    def directory(self):
+        return self._cache.get_or_load('locations', self._load)
+
+    def all(self):
+        return self.directory().locations
+
+    def get(self, slug):
+        return self.directory().by_slug.get(slug)
+
+    def default(self):
+        return self.directory().default
+
+    def refresh(self):
+        self._cache.clear()
+
+    def resolve(self, host, path):
+        """Standort und Pfadpräfix einer Anfrage.
+
+        /<slug>/... hat Vorrang vor dem Hostnamen, ohne beides gilt der
+        Standard-Standort. Das Präfix ist '' ohne Slug im Pfad.
+        """
+        directory = self.directory()
+        first = path.lstrip('/').split('/', 1)[0]
+        if first in directory.by_slug:
+            return directory.by_slug[first], '/' + first
+        return directory.by_hostname.get(normalize_host(host), directory.default), ''
+
+
+class LocationMiddleware:
+    """Ordnet jeder Anfrage ihren Standort zu.
+
+    Ein Pfadpräfix wird von PATH_INFO nach SCRIPT_NAME verschoben: Die
+    Routen bleiben unverändert, und url_for erzeugt für /zweite/menu
+    automatisch Links mit demselben Präfix.
+    """
+
+    def __init__(self, wsgi_app, registry):
+        self.wsgi_app = wsgi_app
+        self.registry = registry
+
+    def __call__(self, environ, start_response):
+        path = environ.get('PATH_INFO', '')
+        location, prefix = self.registry.resolve(environ.get('HTTP_HOST', ''), path)
+        if prefix:
+            environ['SCRIPT_NAME'] = environ.get('SCRIPT_NAME', '').rstrip('/') + prefix
+            environ['PATH_INFO'] = path.lstrip('/')[len(prefix) - 1:] or '/'
+        environ[ENVIRON_KEY] = location
+        return self.wsgi_app(environ, start_response)
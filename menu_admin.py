@@ -0,0 +1,116 @@
+import re
+from collections import namedtuple
+
+from sqlalchemy import and_, case, column, func, literal_column, or_, select, table, tuple_
+
+import menu_api
+import menu_search
+
+DEFAULT_LIMIT = 50
+MAX_LIMIT = 200
+
+# Eine Abfrage der Admin-Liste: Kategorie-id oder None, Suchwörter, Cursor
+# (Sortierschlüssel des letzten Eintrags der vorigen Seite) oder None
+ListQuery = namedtuple('ListQuery', ['category_id', 'text', 'tokens', 'after', 'limit'])
+
+# Eine Seite: serialisierte Zeilen, Cursor der nächsten Seite (None = Ende)
+# und die Gesamtzahl, letztere nur auf der ersten Seite
+ListPage = namedtuple('ListPage', ['items', 'next', 'total'])
+
+
+def encode_cursor(key):
+    # Sortierschlüssel (Getränk 0/1, Reihenfolge der Kategorie, Kategorie-id, id)
+    return '.'.join(str(int(value)) for value in key)
+
+
+def decode_cursor(value):
+    try:
+        key = tuple(int(part) for part in value.split('.'))
+    except ValueError:
+        raise ValueError('Ungültiger Cursor') from None
+    if len(key) != 4:
+        raise ValueError('Ungültiger Cursor')
+    return key
+
+
+def parse(args, category_ids):
+    """Liest die Parameter der Admin-Liste; ValueError bei ungültigen Angaben.
+
+    category: id einer Kategorie, q: Suchwörter (jedes als Präfix, alle
+    müssen vorkommen), after: Cursor aus next der vorigen Seite, limit:
+    Zeilen pro Seite.
+    """
+    category_id = (args.get('category') or '').strip() or None
+    if category_id is not None:
+        if not category_id.isdigit() or int(category_id) not in category_ids:
+            raise ValueError('Unbekannte Kategorie')
+        category_id = int(category_id)
+    text = (args.get('q') or '').strip()
+    after = (args.get('after') or '').strip()
+    after = decode_cursor(after) if after else None
+    limit = args.get('limit') or DEFAULT_LIMIT
+    try:
+        limit = int(limit)
+    except ValueError:
+        raise ValueError('limit muss eine Zahl sein') from None
+    if not 1 <= limit <= MAX_LIMIT:
+        raise ValueError(f'limit muss zwischen 1 und {MAX_LIMIT} liegen')
+    return ListQuery(
+        category_id=category_id,
+        text=text,
+        tokens=tuple(dict.fromkeys(menu_search.tokenize(text)))[:menu_search.MAX_TOKENS],
+        after=after,
+        limit=limit,
+    )
+
+
+def serialize_row(item):
+    return dict(menu_api.serialize_item(item), category_id=item.category_id)
+
+
+def text_condition(item_model, query, fts):
+    """Bedingung für die Suchwörter: über FTS5, sonst als Teilstring in Name oder Beschreibung."""
+    if fts:
+        fts_table = table(menu_search.FTS_TABLE, column('rowid'))
+        return item_model.id.in_(select(fts_table.c.rowid).where(
+            literal_column(menu_search.FTS_TABLE).op('MATCH')(menu_search.match_expression(query.tokens))))
+    # Ohne FTS die Wörter wie eingegeben: die Datenbank vergleicht nicht ohne Umlaute
+    words = re.findall(r'\w+', query.text)[:menu_search.MAX_TOKENS]
+    return and_(*(or_(item_model.name.icontains(word, autoescape=True),
+                      item_model.description.icontains(word, autoescape=True)) for word in words))
+
+
+def list_items(session, item_model, category_model, query, fts=False, location_id=None):
+    """Eine Seite der Admin-Liste per Keyset-Pagination.
+
+    Die Reihenfolge ist die der Karte: Speisen vor Getränken, dann nach
+    Reihenfolge und id der Kategorie, darin nach id. Statt OFFSET setzt jede
+    Seite per Zeilenvergleich hinter dem Sortierschlüssel des Cursors fort;
+    eine Seite ist damit eine Abfrage, egal wie viele Kategorien es gibt und
+    wie weit hinten sie liegt. Die Gesamtzahl kostet eine zweite, nur auf
+    der ersten Seite.
+    """
+    is_drink = case((category_model.is_drink_category.is_(True), 1), else_=0)
+    sort_key = (is_drink, category_model.order, category_model.id, item_model.id)
+    where = [text_condition(item_model, query, fts)] if query.tokens else []
+    if location_id is not None:
+        where.append(item_model.location_id == location_id)
+    if query.category_id is not None:
+        where.append(item_model.category_id == query.category_id)
+
+    statement = select(item_model, is_drink, category_model.order).join(
+        category_model, item_model.category_id == category_model.id).where(*where)
+    if query.after is not None:
+        statement = statement.where(tuple_(*sort_key) > tuple_(*query.after))
+    # Eine Zeile mehr als nötig zeigt an, ob es weitergeht
+    rows = session.execute(statement.order_by(*sort_key).limit(query.limit + 1)).all()
+
+    next_cursor = None
+    if len(rows) > query.limit:
+        rows = rows[:query.limit]
+        item, drink, order = rows[-1]
+        next_cursor = encode_cursor((drink, order, item.category_id, item.id))
+    total = None
+    if query.after is None:
+        total = session.scalar(select(func.count()).select_from(item_model).where(*where))
+    return ListPage([serialize_row(item) for item, _, _ in rows], next_cursor, total)
@@ -0,0 +1,113 @@
+import hashlib
+import json
+from collections import namedtuple
+
+from flask import url_for
+
+import compression
+
+# Felder eines Gerichts, die über ?fields= ausgewählt werden können
+ITEM_FIELDS = ('id', 'name', 'description', 'price', 'vegetarian', 'vegan', 'spicy', 'image')
+
+# Fertig kodierte Antwort: JSON-Bytes und je angebotener Kodierung die komprimierten Bytes
+EncodedJson = namedtuple('EncodedJson', ['body', 'compressed', 'etag'])
+
+
+def serialize_image(item):
+    variants = item.image_set
+    if variants:
+        return {
+            'src': url_for('static', filename=variants['src']),
+            'width': variants['width'],
+            'height': variants['height'],
+            'variants': {
+                mime: [{'url': url_for('static', filename=path), 'width': width} for path, width in candidates]
+                for mime, candidates in variants['sources'].items()
+            },
+        }
+    if item.image_path:
+        return {'src': url_for('static', filename=item.image_path)}
+    return None
+
+
+def serialize_item(item):
+    return {
+        'id': item.id,
+        'name': item.name,
+        'description': item.description,
+        'price': round(item.price, 2),
+        'vegetarian': bool(item.vegetarian),
+        'vegan': bool(item.vegan),
+        'spicy': bool(item.spicy),
+        'image': serialize_image(item),
+    }
+
+
+def serialize_menu(categories):
+    return {
+        'categories': [
+            {
+                'id': category.id,
+                'name': category.name,
+                'display_name': category.display_name,
+                'order': category.order,
+                'is_drink_category': bool(category.is_drink_category),
+                'items': [serialize_item(item) for item in category.items],
+            }
+            for category in categories
+        ]
+    }
+
+
+def _times(hours):
+    times = []
+    if not hours.closed:
+        for open_time, close_time in ((hours.open_time_1, hours.close_time_1),
+                                      (hours.open_time_2, hours.close_time_2)):
+            if open_time and close_time:
+                times.append({'open': open_time, 'close': close_time})
+    return times
+
+
+def serialize_hours(opening_hours, special_hours=()):
+    return {
+        'opening_hours': [
+            {'day': hours.day, 'weekday': hours.weekday, 'closed': bool(hours.closed), 'times': _times(hours)}
+            for hours in opening_hours
+        ],
+        'exceptions': [
+            {'date': special.date.isoformat(), 'note': special.note,
+             'closed': bool(special.closed), 'times': _times(special)}
+            for special in special_hours
+        ],
+    }
+
+
+def parse_fields(value):
+    """Wandelt ?fields=name,price in ein sortiertes Tupel um; None heißt alle Felder."""
+    if not value:
+        return None
+    fields = tuple(sorted({field.strip() for field in value.split(',') if field.strip()}))
+    unknown = [field for field in fields if field not in ITEM_FIELDS]
+    if unknown:
+        raise ValueError(f"Unbekannte Felder: {', '.join(unknown)}")
+    return fields
+
+
+def select_fields(menu, fields):
+    if fields is None:
+        return menu
+    return {
+        'categories': [
+            dict(category, items=[{field: item[field] for field in fields} for item in category['items']])
+            for category in menu['categories']
+        ]
+    }
+
+
+def encode(payload):
+    body = json.dumps(payload, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    # Einmal pro Inhaltsversion; Brotli-Stufe 11 bräuchte für große Karten Sekunden
+    compressed = {encoding: compression.compress(body, encoding, level=9, quality=6)
+                  for encoding in compression.encodings()}
+    return EncodedJson(body, compressed, hashlib.sha1(body).hexdigest()[:24])
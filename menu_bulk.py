@@ -0,0 +1,91 @@
+from collections import namedtuple
+
+from sqlalchemy import Numeric, cast, func, literal, true
+
+FLAGS = ('vegetarian', 'vegan', 'spicy')
+SCOPES = ('selected', 'category', 'all')
+
+# Preise werden auf ganze Cent, 10 Cent oder 50 Cent gerundet (Kehrwert der Schrittweite)
+ROUNDING = {'0.01': 100, '0.10': 10, '0.50': 2}
+
+# Eine Sammeländerung: welche Gerichte (scope mit item_ids bzw. category_id)
+# und was mit ihnen geschieht (action mit params)
+BulkOperation = namedtuple('BulkOperation', ['scope', 'item_ids', 'category_id', 'action', 'params'])
+
+
+def _int(value, message):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        raise ValueError(message) from None
+
+
+def parse(form, category_ids):
+    """Liest eine Sammeländerung aus dem Formular; ValueError bei ungültigen Angaben."""
+    scope = form.get('scope')
+    item_ids, category_id = (), None
+    if scope == 'selected':
+        item_ids = tuple(sorted({_int(value, 'Ungültige Auswahl') for value in form.getlist('ids')}))
+        if not item_ids:
+            raise ValueError('Keine Menüpunkte ausgewählt')
+    elif scope == 'category':
+        category_id = _int(form.get('scope_category'), 'Keine Kategorie gewählt')
+        if category_id not in category_ids:
+            raise ValueError('Unbekannte Kategorie')
+    elif scope != 'all':
+        raise ValueError('Ungültiger Bereich')
+
+    action = form.get('action')
+    if action == 'price':
+        try:
+            percent = float((form.get('percent') or '').replace(',', '.'))
+        except ValueError:
+            raise ValueError('Ungültige Prozentangabe') from None
+        if not -90 <= percent <= 100 or percent == 0:
+            raise ValueError('Die Preisänderung muss zwischen -90 % und +100 % liegen')
+        rounding = form.get('rounding', '0.01')
+        if rounding not in ROUNDING:
+            raise ValueError('Ungültige Rundung')
+        params = {'percent': percent, 'rounding': rounding}
+    elif action == 'flag':
+        flag = form.get('flag')
+        if flag not in FLAGS:
+            raise ValueError('Unbekannte Eigenschaft')
+        params = {'flag': flag, 'value': form.get('value') == '1'}
+    elif action == 'move':
+        target = _int(form.get('target_category'), 'Keine Zielkategorie gewählt')
+        if target not in category_ids:
+            raise ValueError('Unbekannte Zielkategorie')
+        params = {'target_category_id': target}
+    else:
+        raise ValueError('Unbekannte Aktion')
+    return BulkOperation(scope, item_ids, category_id, action, params)
+
+
+def condition(model, operation):
+    """WHERE-Bedingung für die betroffenen Gerichte."""
+    if operation.scope == 'selected':
+        return model.id.in_(operation.item_ids)
+    if operation.scope == 'category':
+        return model.category_id == operation.category_id
+    return true()
+
+
+def assignments(model, operation):
+    """Neue Spaltenwerte als SQL-Ausdrücke, für UPDATE ... SET und für die Vorschau."""
+    params = operation.params
+    if operation.action == 'price':
+        factor = 1 + params['percent'] / 100
+        steps = ROUNDING[params['rounding']]
+        # In der Datenbank gerechnet, damit Vorschau und UPDATE denselben Wert liefern
+        price = func.round(cast(model.price * factor * steps, Numeric(14, 4)), 0) / steps
+        return {'price': price}
+    if operation.action == 'flag':
+        values = {params['flag']: literal(params['value'])}
+        # Vegan schließt vegetarisch ein, nicht vegetarisch schließt vegan aus
+        if params['flag'] == 'vegan' and params['value']:
+            values['vegetarian'] = literal(True)
+        elif params['flag'] == 'vegetarian' and not params['value']:
+            values['vegan'] = literal(False)
+        return values
+    return {'category_id': literal(params['target_category_id'])}
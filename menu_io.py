@@ -0,0 +1,203 @@
+import csv
+import io
+import itertools
+import json
+import math
+import os
+from collections import namedtuple
+
+# Spalten der Import-/Exportdatei. Ein Gericht wird über (Kategorie, Name)
+# wiedererkannt; Bilder werden weder exportiert noch importiert.
+COLUMNS = ('category', 'name', 'description', 'price', 'vegetarian', 'vegan', 'spicy')
+FLAGS = ('vegetarian', 'vegan', 'spicy')
+UPDATABLE = ('description', 'price') + FLAGS
+
+FORMATS = {'csv': 'text/csv', 'json': 'application/json'}
+EXTENSIONS = {'.csv': 'csv', '.json': 'json', '.jsonl': 'json', '.ndjson': 'json'}
+
+TRUE_VALUES = {'1', 'true', 'ja', 'j', 'yes', 'y', 'x', 'on', 'wahr'}
+FALSE_VALUES = {'', '0', 'false', 'nein', 'n', 'no', 'off', 'falsch'}
+
+# Ergebnis der Prüfung: neue Zeilen, (id, Zeile, Änderungen) je geändertem
+# Gericht, Anzahl unveränderter Gerichte und (Zeile, Meldung) je Fehler
+ImportPlan = namedtuple('ImportPlan', ['inserts', 'updates', 'unchanged', 'errors'])
+
+
+def detect_format(filename, fmt=None):
+    if fmt:
+        if fmt not in FORMATS:
+            raise ValueError(f'Unbekanntes Format: {fmt}')
+        return fmt
+    extension = os.path.splitext(filename or '')[1].lower()
+    if extension not in EXTENSIONS:
+        raise ValueError('Format nicht erkennbar, erwartet wird .csv oder .json')
+    return EXTENSIONS[extension]
+
+
+def _iter_csv(text):
+    header = text.readline()
+    # Excel speichert in deutschen Einstellungen mit Semikolon
+    delimiter = ';' if header.count(';') > header.count(',') else ','
+    reader = csv.DictReader(itertools.chain([header], text), delimiter=delimiter)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _iter_json(text, chunk_size=1 << 16):
+    """Liest Objekte einzeln aus einem JSON-Array oder aus JSON Lines,
+    ohne die ganze Datei in den Speicher zu laden."""
+    decoder = json.JSONDecoder()
+    buffer, position, index, eof = '', 0, 0, False
+    while True:
+        # Trennzeichen zwischen den Objekten überspringen
+        while position < len(buffer) and buffer[position] in ' \t\r\n,[]':
+            position += 1
+        if position == len(buffer):
+            if eof:
+                return
+            buffer, position = text.read(chunk_size), 0
+            eof = not buffer
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError as e:
+            if eof:
+                raise ValueError(f'Ungültiges JSON nach Eintrag {index}: {e.msg}') from None
+            chunk = text.read(chunk_size)
+            eof = not chunk
+            buffer, position = buffer[position:] + chunk, 0
+            continue
+        index += 1
+        yield index, value
+        position = end
+
+
+def read_rows(stream, fmt):
+    """Liefert (Zeile bzw. Eintrag, Rohdaten) aus einer binären Datei."""
+    text = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    return _iter_csv(text) if fmt == 'csv' else _iter_json(text)
+
+
+def _flag(value):
+    if isinstance(value, bool):
+        return value
+    text = str(value if value is not None else '').strip().lower()
+    if text in TRUE_VALUES:
+        return True
+    if text in FALSE_VALUES:
+        return False
+    raise ValueError(f'"{value}" ist kein Ja/Nein-Wert')
+
+
+def _price(value):
+    try:
+        price = float(str(value).strip().replace('€', '').replace(',', '.'))
+    except ValueError:
+        raise ValueError(f'Ungültiger Preis "{value}"') from None
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f'Ungültiger Preis "{value}"')
+    return round(price, 2)
+
+
+def parse_row(raw, categories):
+    """Prüft eine Zeile gegen die Kategorien ({name oder Anzeigename in Kleinbuchstaben: id})."""
+    if not isinstance(raw, dict):
+        raise ValueError('Eintrag ist kein Objekt')
+    row = {str(key).strip().lower(): value for key, value in raw.items() if key is not None}
+    category = str(row.get('category') or '').strip()
+    if not category:
+        raise ValueError('Kategorie fehlt')
+    if category.lower() not in categories:
+        raise ValueError(f'Unbekannte Kategorie "{category}"')
+    name = str(row.get('name') or '').strip()
+    if not name:
+        raise ValueError('Name fehlt')
+    if len(name) > 100:
+        raise ValueError('Name ist länger als 100 Zeichen')
+    description = str(row.get('description') or '').strip()
+    parsed = {
+        'category_id': categories[category.lower()],
+        'name': name,
+        'description': description or None,
+        'price': _price(row.get('price')),
+    }
+    for flag in FLAGS:
+        try:
+            parsed[flag] = _flag(row.get(flag))
+        except ValueError as e:
+            raise ValueError(f'{flag}: {e}') from None
+    return parsed
+
+
+def plan(records, categories, existing):
+    """Vergleicht die Datei mit dem Bestand ({(category_id, name): {'id', ...}}).
+
+    Ist errors nicht leer, darf nichts übernommen werden; die Datei wird
+    trotzdem ganz geprüft, damit alle Fehler auf einmal gemeldet werden.
+    """
+    inserts, updates, errors = [], [], []
+    unchanged = 0
+    seen = {}
+    try:
+        for line, raw in records:
+            try:
+                row = parse_row(raw, categories)
+            except ValueError as e:
+                errors.append((line, str(e)))
+                continue
+            key = (row['category_id'], row['name'])
+            if key in seen:
+                errors.append((line, f'"{row["name"]}" steht bereits in Zeile {seen[key]}'))
+                continue
+            seen[key] = line
+            current = existing.get(key)
+            if current is None:
+                inserts.append(row)
+                continue
+            changes = {field: (current[field], row[field]) for field in UPDATABLE if current[field] != row[field]}
+            if changes:
+                updates.append((current['id'], row, changes))
+            else:
+                unchanged += 1
+    except (ValueError, csv.Error, UnicodeDecodeError) as e:
+        errors.append((None, str(e)))
+    return ImportPlan(inserts, updates, unchanged, errors)
+
+
+def _csv_values(row):
+    values = []
+    for column in COLUMNS:
+        value = row[column]
+        if column in FLAGS:
+            value = 'ja' if value else 'nein'
+        elif column == 'price':
+            value = f'{value:.2f}'
+        values.append('' if value is None else value)
+    return values
+
+
+def _json_values(row):
+    return dict(row, price=round(row['price'], 2), **{flag: bool(row[flag]) for flag in FLAGS})
+
+
+def export(rows, fmt, flush_size=16384):
+    """Erzeugt die Exportdatei stückweise aus einem Iterator von Zeilen (dicts mit COLUMNS)."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    if fmt == 'csv':
+        writer.writerow(COLUMNS)
+    else:
+        buffer.write('[')
+    for index, row in enumerate(rows):
+        if fmt == 'csv':
+            writer.writerow(_csv_values(row))
+        else:
+            buffer.write(',\n' if index else '\n')
+            buffer.write(json.dumps(_json_values(row), ensure_ascii=False))
+        if buffer.tell() >= flush_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    if fmt == 'json':
+        buffer.write('\n]\n')
+    yield buffer.getvalue()
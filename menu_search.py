@@ -0,0 +1,307 @@
+import bisect
+import math
+import re
+import unicodedata
+from collections import namedtuple
+
+from sqlalchemy import column, func, literal_column, select, table
+from sqlalchemy.exc import OperationalError
+from sqlalchemy.sql.expression import UnaryExpression
+from sqlalchemy.sql.operators import custom_op
+
+FTS_TABLE = 'menu_item_fts'
+
+DEFAULT_PER_PAGE = 20
+MAX_PER_PAGE = 100
+MAX_TOKENS = 8
+
+# Treffer im Namen zählen zehnmal so viel wie in der Beschreibung
+NAME_WEIGHT = 10.0
+
+# Umschreibungen ohne Umlaut-Taste: "kaese" findet "Käse"
+TRANSCRIPTIONS = (('ae', 'a'), ('oe', 'o'), ('ue', 'u'))
+
+TRUE_VALUES = {'1', 'true', 'ja', 'yes', 'on'}
+FALSE_VALUES = {'0', 'false', 'nein', 'no', 'off'}
+
+# Eine Suchanfrage: Wörter aus q plus Filter, None heißt "egal"
+SearchQuery = namedtuple('SearchQuery', ['text', 'tokens', 'vegetarian', 'vegan', 'spicy', 'category',
+                                         'min_price', 'max_price', 'page', 'per_page'])
+
+# Eine Ergebnisseite; items sind wie in der Menü-API serialisiert, ergänzt um die Kategorie
+SearchResult = namedtuple('SearchResult', ['total', 'items'])
+
+# Externe FTS5-Tabelle über menu_item. unicode61 mit remove_diacritics
+# macht aus "Käse" und "Kase" dasselbe Token; prefix beschleunigt kurze
+# Präfixsuchen. Trigger halten den Index bei jedem INSERT/UPDATE/DELETE
+# aktuell, auch bei Sammeländerungen und Importen.
+FTS_SCHEMA = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} USING fts5(
+        name, description, content='menu_item', content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2', prefix='2 3')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_insert AFTER INSERT ON menu_item BEGIN
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_delete AFTER DELETE ON menu_item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {FTS_TABLE}_update AFTER UPDATE OF name, description ON menu_item BEGIN
+        INSERT INTO {FTS_TABLE}({FTS_TABLE}, rowid, name, description)
+        VALUES ('delete', old.id, old.name, old.description);
+        INSERT INTO {FTS_TABLE}(rowid, name, description) VALUES (new.id, new.name, new.description);
+    END""",
+]
+
+
+def fold(text):
+    """Kleinschreibung ohne Akzente und Umlaut-Punkte, ß als ss."""
+    text = unicodedata.normalize('NFKD', text.lower().replace('ß', 'ss'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokenize(text):
+    return re.findall(r'\w+', fold(text or ''))
+
+
+def variants(token):
+    """Schreibweisen eines Suchworts: mit aufgelösten Umschreibungen und mit ß."""
+    forms = {token}
+    transcribed = token
+    for pair, vowel in TRANSCRIPTIONS:
+        transcribed = transcribed.replace(pair, vowel)
+    forms.add(transcribed)
+    # FTS5 lässt ß stehen, der Index im Speicher schreibt es als ss
+    forms.update(form.replace('ss', 'ß') for form in list(forms) if 'ss' in form)
+    return sorted(forms)
+
+
+def _flag(args, name):
+    value = (args.get(name) or '').strip().lower()
+    if not value:
+        return None
+    if value in TRUE_VALUES:
+        return True
+    if value in FALSE_VALUES:
+        return False
+    raise ValueError(f'{name} muss 1 oder 0 sein')
+
+
+def _price(args, name):
+    value = (args.get(name) or '').strip()
+    if not value:
+        return None
+    try:
+        price = float(value.replace(',', '.'))
+    except ValueError:
+        raise ValueError(f'Ungültiger Preis für {name}') from None
+    if not math.isfinite(price) or price < 0:
+        raise ValueError(f'Ungültiger Preis für {name}')
+    return price
+
+
+def _int(args, name, default, lowest, highest):
+    value = args.get(name)
+    if not value:
+        return default
+    try:
+        number = int(value)
+    except ValueError:
+        raise ValueError(f'{name} muss eine Zahl sein') from None
+    if not lowest <= number <= highest:
+        raise ValueError(f'{name} muss zwischen {lowest} und {highest} liegen')
+    return number
+
+
+def parse(args, category_names):
+    """Liest eine Suchanfrage aus den URL-Parametern; ValueError bei ungültigen Angaben.
+
+    q: Suchwörter (jedes als Präfix, alle müssen vorkommen), vegetarian,
+    vegan, spicy: 1 oder 0, category: Kategoriename, min_price, max_price,
+    page und per_page für die Seitenaufteilung.
+    """
+    text = (args.get('q') or '').strip()
+    tokens = tuple(dict.fromkeys(tokenize(text)))[:MAX_TOKENS]
+    category = (args.get('category') or '').strip() or None
+    if category is not None and category not in category_names:
+        raise ValueError('Unbekannte Kategorie')
+    min_price, max_price = _price(args, 'min_price'), _price(args, 'max_price')
+    if min_price is not None and max_price is not None and min_price > max_price:
+        raise ValueError('min_price ist größer als max_price')
+    return SearchQuery(
+        text=text,
+        tokens=tokens,
+        vegetarian=_flag(args, 'vegetarian'),
+        vegan=_flag(args, 'vegan'),
+        spicy=_flag(args, 'spicy'),
+        category=category,
+        min_price=min_price,
+        max_price=max_price,
+        page=_int(args, 'page', 1, 1, 10000),
+        per_page=_int(args, 'per_page', DEFAULT_PER_PAGE, 1, MAX_PER_PAGE),
+    )
+
+
+def install_fts(connection):
+    """Legt FTS-Tabelle und Trigger an (nur SQLite); False, wenn FTS5 fehlt."""
+    if connection.dialect.name != 'sqlite':
+        return False
+    exists = connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)).first()
+    try:
+        for statement in FTS_SCHEMA:
+            connection.exec_driver_sql(statement)
+    except OperationalError:
+        # SQLite ohne FTS5 ("no such module: fts5")
+        return False
+    if not exists:
+        # Bestehende Gerichte einmalig übernehmen
+        connection.exec_driver_sql(f"INSERT INTO {FTS_TABLE}({FTS_TABLE}) VALUES ('rebuild')")
+    return True
+
+
+def fts_available(connection):
+    if connection.dialect.name != 'sqlite':
+        return False
+    return connection.exec_driver_sql(
+        "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (FTS_TABLE,)).first() is not None
+
+
+def match_expression(tokens):
+    """FTS5-Ausdruck: jedes Wort als Präfix in einer seiner Schreibweisen."""
+    return ' AND '.join('(' + ' OR '.join(f'"{form}"*' for form in variants(token)) + ')' for token in tokens)
+
+
+def _without_index(attribute):
+    # Unäres + hindert SQLite daran, für diese Bedingung einen Index zu wählen
+    return UnaryExpression(attribute, operator=custom_op('+'), type_=attribute.type)
+
+
+def conditions(item_model, category_model, query, use_indexes=True, location_id=None):
+    """WHERE-Bedingungen der Filter über die Spaltenindizes von menu_item.
+
+    Mit location_id nur Gerichte dieses Standorts; Kategorienamen gelten
+    ebenfalls nur innerhalb des Standorts.
+
+    Mit use_indexes=False bleiben die Indizes ungenutzt: Bei einer Textsuche
+    soll immer der FTS-Index die Abfrage anführen. Sonst beginnt SQLite
+    z.B. bei vegan=1 mit allen veganen Gerichten und prüft MATCH für jedes
+    einzeln, was um Größenordnungen langsamer ist.
+    """
+    def col(name):
+        attribute = getattr(item_model, name)
+        return attribute if use_indexes else _without_index(attribute)
+
+    where = []
+    if location_id is not None:
+        where.append(col('location_id') == location_id)
+    for flag in ('vegetarian', 'vegan', 'spicy'):
+        value = getattr(query, flag)
+        if value is not None:
+            where.append(col(flag) == value)
+    if query.category is not None:
+        category = select(category_model.id).where(category_model.name == query.category)
+        if location_id is not None:
+            category = category.where(category_model.location_id == location_id)
+        where.append(col('category_id') == category.scalar_subquery())
+    if query.min_price is not None:
+        where.append(col('price') >= query.min_price)
+    if query.max_price is not None:
+        where.append(col('price') <= query.max_price)
+    return where
+
+
+def search_sql(session, item_model, category_model, query, serialize, location_id=None):
+    """Sucht per FTS5 (mit Wörtern) bzw. nur über die Filter; serialize(item) -> dict."""
+    where = conditions(item_model, category_model, query, use_indexes=not query.tokens, location_id=location_id)
+    rows = select(item_model, category_model.name).join(
+        category_model, item_model.category_id == category_model.id)
+    count = select(func.count()).select_from(item_model)
+    if query.tokens:
+        fts = table(FTS_TABLE, column('rowid'))
+        where.append(literal_column(FTS_TABLE).op('MATCH')(match_expression(query.tokens)))
+        rank = literal_column(f'bm25({FTS_TABLE}, {NAME_WEIGHT}, 1.0)')
+        rows = rows.join(fts, fts.c.rowid == item_model.id).order_by(rank, item_model.id)
+        count = count.join(fts, fts.c.rowid == item_model.id)
+    else:
+        rows = rows.order_by(category_model.order, category_model.id, item_model.id)
+    total = session.scalar(count.where(*where))
+    page = session.execute(rows.where(*where).limit(query.per_page).offset((query.page - 1) * query.per_page))
+    return SearchResult(total, [dict(serialize(item), category=name) for item, name in page])
+
+
+class MemoryIndex:
+    """Suchindex im Speicher für Datenbanken ohne FTS5 (z.B. PostgreSQL).
+
+    Wird aus der serialisierten Speisekarte (menu_api.serialize_menu) gebaut
+    und pro Inhaltsversion einmal pro Worker erzeugt. Präfixe werden per
+    Binärsuche im sortierten Wortschatz aufgelöst.
+    """
+
+    def __init__(self, menu):
+        self.entries = []
+        self.postings = {}
+        self.categories = {}
+        for category in menu['categories']:
+            start = len(self.entries)
+            for item in category['items']:
+                position = len(self.entries)
+                self.entries.append(dict(item, category=category['name']))
+                for weight, field in ((NAME_WEIGHT, item['name']), (1.0, item['description'])):
+                    for token in tokenize(field):
+                        scores = self.postings.setdefault(token, {})
+                        scores[position] = scores.get(position, 0.0) + weight
+            self.categories[category['name']] = range(start, len(self.entries))
+        self.vocabulary = sorted(self.postings)
+
+    def _prefix(self, prefix):
+        start = bisect.bisect_left(self.vocabulary, prefix)
+        end = bisect.bisect_left(self.vocabulary, prefix + '\U0010ffff', start)
+        return self.vocabulary[start:end]
+
+    def _scores(self, token):
+        # Bestes gewichtetes Vorkommen eines der passenden Wörter, seltene Wörter zählen mehr
+        scores = {}
+        for form in variants(token):
+            for word in self._prefix(form):
+                postings = self.postings[word]
+                idf = math.log(1 + len(self.entries) / len(postings))
+                for position, weight in postings.items():
+                    score = weight * idf
+                    if score > scores.get(position, 0.0):
+                        scores[position] = score
+        return scores
+
+    def _matches(self, entry, query):
+        for flag in ('vegetarian', 'vegan', 'spicy'):
+            value = getattr(query, flag)
+            if value is not None and entry[flag] != value:
+                return False
+        if query.category is not None and entry['category'] != query.category:
+            return False
+        if query.min_price is not None and entry['price'] < query.min_price:
+            return False
+        if query.max_price is not None and entry['price'] > query.max_price:
+            return False
+        return True
+
+    def search(self, query):
+        if query.tokens:
+            ranked = None
+            for token in query.tokens:
+                scores = self._scores(token)
+                if ranked is None:
+                    ranked = scores
+                else:
+                    ranked = {position: ranked[position] + score for position, score in scores.items()
+                              if position in ranked}
+                if not ranked:
+                    break
+            positions = sorted(ranked, key=lambda position: (-ranked[position], self.entries[position]['id']))
+        elif query.category is not None:
+            positions = self.categories.get(query.category, ())
+        else:
+            positions = range(len(self.entries))
+        matches = [self.entries[position] for position in positions if self._matches(self.entries[position], query)]
+        start = (query.page - 1) * query.per_page
+        return SearchResult(len(matches), matches[start:start + query.per_page])
@@ -0,0 +1,149 @@
+import os
+import threading
+import time
+
+from flask import Response, abort, g, has_request_context, request
+from flask.signals import before_render_template, template_rendered
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Histogram,
+                               generate_latest, multiprocess, REGISTRY)
+from sqlalchemy import event
+
+# Mit PROMETHEUS_MULTIPROC_DIR schreiben alle gunicorn-Worker in gemeinsame
+# Dateien, /metrics fasst sie beim Abruf zusammen (siehe gunicorn_config.py)
+MULTIPROCESS = bool(os.environ.get('PROMETHEUS_MULTIPROC_DIR'))
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 500)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'Dauer einer Anfrage',
+                            ['endpoint', 'method'], buckets=LATENCY_BUCKETS)
+REQUESTS = Counter('http_requests_total', 'Anfragen nach Statuscode', ['endpoint', 'method', 'status'])
+RESPONSE_SIZE = Histogram('http_response_size_bytes', 'Größe der Antwort', ['endpoint'], buckets=SIZE_BUCKETS)
+SQL_STATEMENTS = Histogram('http_request_sql_statements', 'SQL-Anweisungen pro Anfrage',
+                           ['endpoint'], buckets=COUNT_BUCKETS)
+SQL_DURATION = Histogram('http_request_sql_duration_seconds', 'Gesamte SQL-Zeit pro Anfrage',
+                         ['endpoint'], buckets=LATENCY_BUCKETS)
+TEMPLATE_RENDER = Histogram('template_render_duration_seconds', 'Renderzeit je Template',
+                            ['template'], buckets=LATENCY_BUCKETS)
+CACHE_REQUESTS = Counter('page_cache_requests_total', 'Zugriffe auf die Seiten- und API-Caches',
+                         ['cache', 'result'])
+LOGIN_ATTEMPTS = Counter('login_attempts_total', 'Anmeldeversuche nach Ergebnis', ['result'])
+HANDLED_ERRORS = Counter('app_handled_errors_total', 'Abgefangene Fehler in Admin-Aktionen', ['endpoint'])
+
+_render_starts = threading.local()
+
+
+def _endpoint():
+    return request.endpoint or 'unknown'
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context() and 'sql_stats' in g:
+        conn.info.setdefault('query_start', []).append(time.perf_counter())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('query_start')
+    if not starts or not has_request_context() or 'sql_stats' not in g:
+        return
+    duration = time.perf_counter() - starts.pop()
+    stats = g.sql_stats
+    stats['count'] += 1
+    stats['duration'] += duration
+    if stats['statements'] is not None:
+        stats['statements'].append((duration, statement))
+
+
+def _before_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack is None:
+        stack = _render_starts.stack = []
+    stack.append(time.perf_counter())
+
+
+def _after_render(sender, template, context, **extra):
+    stack = getattr(_render_starts, 'stack', None)
+    if stack:
+        TEMPLATE_RENDER.labels(template.name or 'string').observe(time.perf_counter() - stack.pop())
+
+
+def record_cache(cache, hit):
+    CACHE_REQUESTS.labels(cache, 'hit' if hit else 'miss').inc()
+
+
+def record_login(result):
+    # success, failure, throttled_ip oder throttled_user
+    LOGIN_ATTEMPTS.labels(result).inc()
+
+
+def record_handled_error():
+    HANDLED_ERRORS.labels(_endpoint()).inc()
+
+
+def init_app(app, engine):
+    """Misst jede Anfrage: Dauer, Statuscode, Antwortgröße, SQL-Anweisungen und Renderzeit.
+
+    Mit SLOW_REQUEST_MS (Konfiguration) werden langsame Anfragen samt der
+    ausgeführten SQL-Anweisungen ins Log geschrieben.
+    """
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+    before_render_template.connect(_before_render, app, weak=False)
+    template_rendered.connect(_after_render, app, weak=False)
+
+    @app.before_request
+    def start_request_timer():
+        g.request_started = time.perf_counter()
+        g.sql_stats = {
+            'count': 0,
+            'duration': 0.0,
+            'statements': [] if app.config.get('SLOW_REQUEST_MS') else None,
+        }
+
+    @app.after_request
+    def record_request(response):
+        if 'request_started' not in g:
+            return response
+        started, stats = g.request_started, g.sql_stats
+        endpoint, method, path = _endpoint(), request.method, request.full_path
+
+        def record():
+            duration = time.perf_counter() - started
+            REQUEST_LATENCY.labels(endpoint, method).observe(duration)
+            REQUESTS.labels(endpoint, method, str(response.status_code)).inc()
+            SQL_STATEMENTS.labels(endpoint).observe(stats['count'])
+            SQL_DURATION.labels(endpoint).observe(stats['duration'])
+            if not response.is_streamed:
+                RESPONSE_SIZE.labels(endpoint).observe(response.calculate_content_length() or 0)
+
+            slow_ms = app.config.get('SLOW_REQUEST_MS')
+            if slow_ms and duration * 1000 >= slow_ms:
+                lines = [f'{d * 1000:8.2f} ms  {" ".join(statement.split())}' for d, statement in stats['statements']]
+                app.logger.warning(
+                    'Langsame Anfrage %s %s (%s): %.1f ms, %d SQL-Anweisungen in %.1f ms\n%s',
+                    method, path, endpoint, duration * 1000,
+                    stats['count'], stats['duration'] * 1000, '\n'.join(lines)
+                )
+
+        if response.is_streamed:
+            # Gestreamte Seiten fragen die Datenbank erst beim Senden ab
+            response.call_on_close(record)
+        else:
+            record()
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        token = app.config.get('METRICS_TOKEN')
+        if not token and app.config.get('PRODUCTION'):
+            # Ohne Token wären Zugriffszahlen und Cache-Zähler öffentlich
+            abort(404)
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Nicht autorisiert\n', status=401, mimetype='text/plain')
+        if MULTIPROCESS:
+            registry = CollectorRegistry()
+            multiprocess.MultiProcessCollector(registry)
+        else:
+            registry = REGISTRY
+        return Response(generate_latest(registry), mimetype=CONTENT_TYPE_LATEST)
@@ -1,20 +1,200 @@
-from app import app, db
-from sqlalchemy import text
+import time
+from datetime import datetime, timezone
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, inspect, select, text
+from sqlalchemy.schema import CreateTable
+
+import menu_search
+from db_config import ddl_transaction
+from models import db
+from schedule import WEEKDAYS
+
+# Versionierte Schemaänderungen für den laufenden Betrieb.
+#
+# Jede Migration läuft genau einmal in ihrer eigenen Transaktion (in SQLite
+# samt DDL, siehe db_config.ddl_transaction) und wird in schema_migration
+# vermerkt. Erlaubt sind nur Änderungen, die keine Daten verlieren und
+# möglichst keine Tabelle neu aufbauen: neue Tabellen, neue Spalten ohne
+# NOT NULL (ALTER TABLE ... ADD COLUMN ändert in SQLite und PostgreSQL nur
+# den Katalog) und Indizes. Einzige Ausnahme ist drop_unique, weil SQLite
+# UNIQUE-Bedingungen nicht anders entfernen kann. Die Schritte prüfen
+# selbst, ob ihre Änderung schon vorhanden ist, weil eine neue Datenbank
+# alle Tabellen bereits im aktuellen Stand aus models.py erhält.
+
+MIGRATIONS = []
+
+schema_metadata = MetaData()
+schema_migration = Table(
+    'schema_migration', schema_metadata,
+    Column('version', Integer, primary_key=True),
+    Column('name', String(100), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+    Column('duration_ms', Integer, nullable=False),
+)
+
+
+def migration(version, name):
+    def register(function):
+        MIGRATIONS.append((version, name, function))
+        MIGRATIONS.sort(key=lambda entry: entry[0])
+        return function
+    return register
+
+
+def _columns(connection, table):
+    return {column['name'] for column in inspect(connection).get_columns(table)}
+
+
+def add_column(connection, table, name, definition):
+    if name not in _columns(connection, table):
+        connection.execute(text(f'ALTER TABLE {table} ADD COLUMN {name} {definition}'))
+
+
+def create_index(connection, name, table, columns, unique=False):
+    quoted = ', '.join(f'"{column}"' for column in columns)
+    kind = 'UNIQUE INDEX' if unique else 'INDEX'
+    connection.execute(text(f'CREATE {kind} IF NOT EXISTS {name} ON {table} ({quoted})'))
+
+
+def drop_unique(connection, table, columns):
+    """Entfernt eine UNIQUE-Bedingung über genau columns, falls vorhanden.
+
+    PostgreSQL löscht die benannte Bedingung. In SQLite steht sie ohne Namen
+    in CREATE TABLE; dort wird die Tabelle im Stand aus models.py neu angelegt,
+    die Zeilen werden übernommen und die alte ersetzt. Fremdschlüssel anderer
+    Tabellen verweisen über den Namen und bleiben gültig (SQLite prüft sie
+    ohne PRAGMA foreign_keys nicht).
+    """
+    constraints = [constraint for constraint in inspect(connection).get_unique_constraints(table)
+                   if constraint['column_names'] == list(columns)]
+    if not constraints:
+        return
+    if connection.dialect.name != 'sqlite':
+        for constraint in constraints:
+            connection.execute(text(f'ALTER TABLE {table} DROP CONSTRAINT "{constraint["name"]}"'))
+        return
+    model = db.metadata.tables[table]
+    existing = _columns(connection, table)
+    copied = ', '.join(f'"{column.name}"' for column in model.columns if column.name in existing)
+    create = str(CreateTable(model).compile(dialect=connection.dialect))
+    # Überbleibsel eines abgebrochenen Laufs (nur ohne transaktionales DDL möglich)
+    connection.execute(text(f'DROP TABLE IF EXISTS {table}_rebuild'))
+    connection.execute(text(create.replace(f'CREATE TABLE {table} ', f'CREATE TABLE {table}_rebuild ', 1)))
+    connection.execute(text(f'INSERT INTO {table}_rebuild ({copied}) SELECT {copied} FROM {table}'))
+    connection.execute(text(f'DROP TABLE {table}'))
+    connection.execute(text(f'ALTER TABLE {table}_rebuild RENAME TO {table}'))
+    # Die Indizes der alten Tabelle sind mit ihr verschwunden
+    for index in model.indexes:
+        index.create(connection, checkfirst=True)
+
+
+@migration(1, 'Fehlende Tabellen anlegen')
+def create_missing_tables(connection):
+    # Legt nur Tabellen an, die es noch nicht gibt; bestehende bleiben unberührt
+    db.metadata.create_all(connection, checkfirst=True)
+
+
+@migration(2, 'Bildvarianten der Gerichte')
+def add_image_variants(connection):
+    add_column(connection, 'menu_item', 'image_variants', 'TEXT')
+
+
+@migration(3, 'Wochentag der Öffnungszeiten')
+def add_weekday(connection):
+    add_column(connection, 'opening_hours', 'weekday', 'INTEGER')
+    for index, day in enumerate(WEEKDAYS):
+        connection.execute(text('UPDATE opening_hours SET weekday = :weekday WHERE weekday IS NULL AND day = :day'),
+                           {'weekday': index, 'day': day})
+
+
+@migration(4, 'Indizes für Kategorien, Sortierung und Filter')
+def add_menu_indexes(connection):
+    create_index(connection, 'ix_menu_category_order', 'menu_category', ['order'])
+    create_index(connection, 'ix_menu_item_category_price', 'menu_item', ['category_id', 'price'])
+    for flag in ('vegetarian', 'vegan', 'spicy', 'price'):
+        create_index(connection, f'ix_menu_item_{flag}', 'menu_item', [flag])
+
+
+@migration(5, 'Volltextsuche (nur SQLite mit FTS5)')
+def add_menu_search(connection):
+    menu_search.install_fts(connection)
+
+
+@migration(6, 'Änderungsprotokoll für /events')
+def add_change_event(connection):
+    db.metadata.tables['change_event'].create(connection, checkfirst=True)
+    create_index(connection, 'ix_change_event_created_at', 'change_event', ['created_at'])
+
+
+@migration(7, 'Index für die seitenweise Admin-Liste')
+def add_admin_list_index(connection):
+    create_index(connection, 'ix_menu_item_category_id', 'menu_item', ['category_id', 'id'])
+
+
+@migration(8, 'Standorte')
+def add_locations(connection):
+    location = db.metadata.tables['location']
+    location.create(connection, checkfirst=True)
+    # Der bisherige Betrieb wird zum ersten Standort, alle Daten gehören zu ihm
+    default_id = connection.execute(select(location.c.id).order_by(location.c.id)).scalar()
+    if default_id is None:
+        default_id = connection.execute(location.insert().values(
+            slug='moos', name='Alas Moos', address='Bundesstr. 39\n94554 Moos, Niederbayern'
+        )).inserted_primary_key[0]
+    for table in ('menu_category', 'menu_item', 'opening_hours', 'special_opening_hours'):
+        add_column(connection, table, 'location_id', 'INTEGER REFERENCES location (id)')
+        connection.execute(text(f'UPDATE {table} SET location_id = :id WHERE location_id IS NULL'),
+                           {'id': default_id})
+    add_column(connection, 'change_event', 'location_id', 'INTEGER')
+    # Kategorienamen und Sondertermine sind nur noch je Standort eindeutig
+    drop_unique(connection, 'menu_category', ['name'])
+    drop_unique(connection, 'special_opening_hours', ['date'])
+    connection.execute(text('DROP INDEX IF EXISTS ix_menu_category_order'))
+    create_index(connection, 'ix_menu_category_location_order', 'menu_category', ['location_id', 'order'])
+    create_index(connection, 'ix_menu_item_location_category', 'menu_item', ['location_id', 'category_id', 'id'])
+    create_index(connection, 'ix_opening_hours_location_weekday', 'opening_hours', ['location_id', 'weekday'])
+    create_index(connection, 'uq_menu_category_location_name', 'menu_category', ['location_id', 'name'],
+                 unique=True)
+    create_index(connection, 'uq_special_opening_hours_location_date', 'special_opening_hours',
+                 ['location_id', 'date'], unique=True)
+
+
+def applied_versions(connection):
+    schema_metadata.create_all(connection, checkfirst=True)
+    return set(connection.execute(select(schema_migration.c.version)).scalars())
+
+
+def pending(engine):
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    return [(version, name) for version, name, _ in MIGRATIONS if version not in applied]
+
+
+def upgrade(engine):
+    """Wendet alle ausstehenden Migrationen an; liefert [(Version, Name, Dauer in ms)]."""
+    with engine.begin() as connection:
+        applied = applied_versions(connection)
+    results = []
+    for version, name, function in MIGRATIONS:
+        if version in applied:
+            continue
+        started = time.perf_counter()
+        with ddl_transaction(engine) as connection:
+            function(connection)
+            duration_ms = round((time.perf_counter() - started) * 1000)
+            # Läuft parallel ein zweiter Deploy, scheitert einer am Primärschlüssel
+            # und seine Transaktion wird vollständig zurückgerollt
+            connection.execute(schema_migration.insert().values(
+                version=version, name=name, duration_ms=duration_ms,
+                applied_at=datetime.now(timezone.utc).replace(tzinfo=None)))
+        results.append((version, name, duration_ms))
+    return results
 
-def migrate_db():
-    with app.app_context():
-        # Lösche alle existierenden Tabellen
-        db.session.execute(text('DROP TABLE IF EXISTS menu_item'))
-        db.session.execute(text('DROP TABLE IF EXISTS menu_category'))
-        db.session.execute(text('DROP TABLE IF EXISTS opening_hours'))
-        db.session.execute(text('DROP TABLE IF EXISTS user'))
-        db.session.commit()
-        
-        # Erstelle alle Tabellen neu
-        db.create_all()
-        
-        print("Migration erfolgreich!")
 
 if __name__ == '__main__':
-    migrate_db()
-    print("Migration erfolgreich!")
+    # Entspricht "flask --app app migrate-db"
+    from app import app
+
+    with app.app_context():
+        for version, name, duration_ms in upgrade(db.engine):
+            print(f'{version:>3} {name} ({duration_ms} ms)')
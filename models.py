@@ -1,7 +1,11 @@
-from flask_sqlalchemy import SQLAlchemy
+import json
+
 from flask_login import UserMixin
+from flask_sqlalchemy import SQLAlchemy
 from werkzeug.security import generate_password_hash, check_password_hash
 
+# Das einzige Schema der Anwendung. Änderungen daran brauchen eine Migration
+# in migrations.py, damit bestehende Datenbanken nachziehen.
 db = SQLAlchemy()
 
 class User(UserMixin, db.Model):
@@ -15,13 +19,30 @@ class User(UserMixin, db.Model):
     def check_password(self, password):
         return check_password_hash(self.password_hash, password)
 
-class MenuCategory(db.Model):
+class Location(db.Model):
+    # Ein Restaurant. Speisekarte und Öffnungszeiten gehören jeweils zu genau
+    # einem Standort, ausgewählt über den Hostnamen oder das Pfadpräfix /<slug>
     id = db.Column(db.Integer, primary_key=True)
+    slug = db.Column(db.String(50), unique=True, nullable=False)
     name = db.Column(db.String(100), nullable=False)
-    display_name = db.Column(db.String(100), nullable=False)
-    order = db.Column(db.Integer, default=0)
+    hostname = db.Column(db.String(255), unique=True)
+    address = db.Column(db.Text)
+
+class MenuCategory(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
+    name = db.Column(db.String(50), nullable=False)
+    display_name = db.Column(db.String(50), nullable=False)
+    order = db.Column(db.Integer, nullable=False)
     is_drink_category = db.Column(db.Boolean, default=False)
-    items = db.relationship('MenuItem', backref='category', lazy=True)
+    items = db.relationship('MenuItem', backref='category', lazy=True, order_by='MenuItem.id')
+
+    # Jede Seite der Karte sortiert die Kategorien eines Standorts danach;
+    # Namen (Teil der API-Pfade) sind nur je Standort eindeutig
+    __table_args__ = (
+        db.Index('ix_menu_category_location_order', 'location_id', 'order'),
+        db.Index('uq_menu_category_location_name', 'location_id', 'name', unique=True),
+    )
 
 class MenuItem(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -29,14 +50,83 @@ class MenuItem(db.Model):
     description = db.Column(db.Text)
     price = db.Column(db.Float, nullable=False)
     category_id = db.Column(db.Integer, db.ForeignKey('menu_category.id'), nullable=False)
-    image_path = db.Column(db.String(200))
+    # Immer der Standort der Kategorie; erspart Suche und Zählungen den Join
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
     vegetarian = db.Column(db.Boolean, default=False)
     vegan = db.Column(db.Boolean, default=False)
     spicy = db.Column(db.Boolean, default=False)
+    image_path = db.Column(db.String(255))
+    # JSON-Beschreibung der verkleinerten Bildvarianten (siehe images.make_variants)
+    image_variants = db.Column(db.Text)
+
+    # category_id führt die zusammengesetzten Indizes an und deckt damit auch die
+    # Gerichte einer Kategorie ab; (category_id, id) trägt die seitenweise
+    # Admin-Liste, (location_id, category_id, id) alle Gerichte eines Standorts,
+    # die übrigen dienen den Filtern der Suche
+    __table_args__ = (
+        db.Index('ix_menu_item_category_price', 'category_id', 'price'),
+        db.Index('ix_menu_item_category_id', 'category_id', 'id'),
+        db.Index('ix_menu_item_location_category', 'location_id', 'category_id', 'id'),
+        db.Index('ix_menu_item_vegetarian', 'vegetarian'),
+        db.Index('ix_menu_item_vegan', 'vegan'),
+        db.Index('ix_menu_item_spicy', 'spicy'),
+        db.Index('ix_menu_item_price', 'price'),
+    )
+
+    @property
+    def image_set(self):
+        return json.loads(self.image_variants) if self.image_variants else None
 
 class OpeningHours(db.Model):
     id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
     day = db.Column(db.String(20), nullable=False)
-    open_time = db.Column(db.String(5))
-    close_time = db.Column(db.String(5))
+    weekday = db.Column(db.Integer)  # 0 = Montag ... 6 = Sonntag
+    open_time_1 = db.Column(db.String(5))
+    close_time_1 = db.Column(db.String(5))
+    open_time_2 = db.Column(db.String(5))
+    close_time_2 = db.Column(db.String(5))
     closed = db.Column(db.Boolean, default=False)
+
+    __table_args__ = (db.Index('ix_opening_hours_location_weekday', 'location_id', 'weekday'),)
+
+class BackgroundJob(db.Model):
+    # Warteschlange für langsame Nebenarbeiten der Admin-Aktionen (siehe jobs.py)
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(50), nullable=False)
+    key = db.Column(db.String(100), index=True)
+    payload = db.Column(db.Text, nullable=False, default='{}')
+    status = db.Column(db.String(10), nullable=False, default='pending')
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    run_at = db.Column(db.DateTime, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False)
+    started_at = db.Column(db.DateTime)
+    finished_at = db.Column(db.DateTime)
+    locked_by = db.Column(db.String(100))
+    last_error = db.Column(db.Text)
+
+    __table_args__ = (db.Index('ix_background_job_due', 'status', 'run_at'),)
+
+class SpecialOpeningHours(db.Model):
+    # Feiertage, Betriebsferien oder Sonderöffnungen ersetzen den Wochenplan für ein Datum
+    id = db.Column(db.Integer, primary_key=True)
+    location_id = db.Column(db.Integer, db.ForeignKey('location.id'))
+    date = db.Column(db.Date, nullable=False)
+    note = db.Column(db.String(100))
+    open_time_1 = db.Column(db.String(5))
+    close_time_1 = db.Column(db.String(5))
+    open_time_2 = db.Column(db.String(5))
+    close_time_2 = db.Column(db.String(5))
+    closed = db.Column(db.Boolean, default=True)
+
+    # Ein Eintrag je Standort und Datum
+    __table_args__ = (db.Index('uq_special_opening_hours_location_date', 'location_id', 'date', unique=True),)
+
+class ChangeEvent(db.Model):
+    # Änderungsprotokoll für /events, der Cursor ist die id (siehe change_feed.py)
+    id = db.Column(db.Integer, primary_key=True)
+    # Standort der Änderung, leer bei Sammeländerungen über mehrere Standorte
+    location_id = db.Column(db.Integer)
+    kind = db.Column(db.String(30), nullable=False)
+    data = db.Column(db.Text, nullable=False)
+    created_at = db.Column(db.DateTime, nullable=False, index=True)
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import uuid
+from collections import namedtuple
+
+
+class ContentVersion:
+    """Versionsstempel für Speisekarte und Öffnungszeiten.
+
+    Der Stempel liegt in einer Datei, die sich alle Gunicorn-Worker teilen.
+    Jede Admin-Änderung schreibt einen neuen Wert, woraufhin jeder Worker
+    seine zwischengespeicherten Seiten verwirft.
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def current(self):
+        return self.stamp()[0]
+
+    def stamp(self):
+        """Liefert (Version, Zeitpunkt der letzten Änderung als Unix-Zeit)."""
+        try:
+            with open(self.path) as f:
+                value = f.read().strip()
+                modified = os.fstat(f.fileno()).st_mtime
+        except FileNotFoundError:
+            value = ''
+        if not value:
+            self.bump()
+            return self.stamp()
+        return value, modified
+
+    def bump(self):
+        value = uuid.uuid4().hex
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # Atomar ersetzen, damit kein Worker eine halb geschriebene Datei liest
+        tmp_path = f'{self.path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'w') as f:
+            f.write(value)
+        os.replace(tmp_path, self.path)
+        return value
+
+
+# Gestreamte Seiten werden in Blöcken dieser Größe gesendet. MAX_STREAMED_PAGE
+# schützt nur vor ausufernden Seiten; darunter muss die ganze Karte passen,
+# sonst wird sie bei jedem Aufruf neu gerendert
+STREAM_FLUSH_SIZE = 8 * 1024
+MAX_STREAMED_PAGE = 32 * 1024 * 1024
+
+
+class PageCache:
+    """Prozesslokaler Cache für fertig gerenderte Seiten, gebunden an eine ContentVersion."""
+
+    def __init__(self, version):
+        self.version = version
+        self._pages = {}
+        self._cached_version = None
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key, version=None):
+        """Liefert die gespeicherte Seite oder None; eine neue Version leert den Cache."""
+        if version is None:
+            version = self.version.current()
+        with self._lock:
+            if version != self._cached_version:
+                if self._cached_version is not None:
+                    self.invalidations += 1
+                self._pages.clear()
+                self._cached_version = version
+            page = self._pages.get(key)
+            if page is not None:
+                self.hits += 1
+            else:
+                self.misses += 1
+            return page
+
+    def put(self, key, page, version):
+        # Nur speichern, wenn sich die Version seit dem Lesen nicht geändert hat
+        with self._lock:
+            if self._cached_version == version:
+                self._pages[key] = page
+
+    def get_or_render(self, key, render, version=None):
+        """Liefert (html, hit). Die Version wird vor dem Rendern gelesen, so dass
+        eine parallele Änderung den Eintrag spätestens beim nächsten Aufruf verwirft."""
+        if version is None:
+            version = self.version.current()
+        page = self.get(key, version)
+        if page is not None:
+            return page, True
+        page = render()
+        self.put(key, page, version)
+        return page, False
+
+    def stream(self, key, chunks, version, flush_size=STREAM_FLUSH_SIZE, max_size=MAX_STREAMED_PAGE):
+        """Reicht gerenderte Teilstücke gebündelt weiter und speichert die fertige Seite.
+
+        Bricht der Client vorher ab, wird nichts gespeichert.
+        """
+        parts, pending, pending_size, total = [], [], 0, 0
+        for chunk in chunks:
+            pending.append(chunk)
+            pending_size += len(chunk)
+            if pending_size >= flush_size:
+                block = ''.join(pending)
+                pending, pending_size = [], 0
+                total += len(block)
+                # Sehr große Karten nicht im Speicher sammeln
+                parts = parts if parts is not None and total <= max_size else None
+                if parts is not None:
+                    parts.append(block)
+                yield block
+        block = ''.join(pending)
+        if parts is not None and total + len(block) <= max_size:
+            parts.append(block)
+            self.put(key, ''.join(parts), version)
+        if block:
+            yield block
+
+    def clear(self):
+        with self._lock:
+            self._pages.clear()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'pid': os.getpid(),
+                'version': self._cached_version,
+                'entries': len(self._pages),
+                'hits': self.hits,
+                'misses': self.misses,
+                'invalidations': self.invalidations,
+            }
+
+
+class LocationCaches:
+    """Versionsstempel, Seiten- und API-Cache je Standort.
+
+    Jeder Standort hat eine eigene Stempeldatei (<path>-<id>) und eigene
+    PageCache-Objekte. Eine Änderung an einem Standort verwirft damit nur
+    dessen Seiten, und viele Aufrufe eines Standorts verdrängen nichts aus
+    dem Cache eines anderen.
+
+    Seiten und API-Antworten enthalten Links mit dem Pfadpräfix der Anfrage
+    (root, z.B. '' über den Hostnamen, '/zweite' über /zweite/...). Jedes
+    Präfix eines Standorts hat deshalb eigene Caches, die sich dessen
+    Versionsstempel teilen.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._versions = {}
+        self._scopes = {}
+        self._lock = threading.Lock()
+
+    def get(self, location_id, root=''):
+        scope = self._scopes.get((location_id, root))
+        if scope is None:
+            with self._lock:
+                scope = self._scopes.get((location_id, root))
+                if scope is None:
+                    version = self._versions.get(location_id)
+                    if version is None:
+                        version = self._versions[location_id] = ContentVersion(f'{self.path}-{location_id}')
+                    scope = CacheScope(version, PageCache(version), PageCache(version))
+                    self._scopes[(location_id, root)] = scope
+        return scope
+
+    def clear(self):
+        for scope in list(self._scopes.values()):
+            scope.pages.clear()
+            scope.api.clear()
+
+    def stats(self):
+        return {f'{location_id}{root}': {'pages': scope.pages.stats(), 'api': scope.api.stats()}
+                for (location_id, root), scope in list(self._scopes.items())}
+
+
+# Caches eines Standorts: Versionsstempel, gerenderte Seiten, API-Antworten und abgeleitete Daten
+CacheScope = namedtuple('CacheScope', ['version', 'pages', 'api'])
+
+
+class TTLCache:
+    """Prozesslokaler Cache, dessen Einträge nach ttl Sekunden verfallen.
+
+    Für Daten ohne Versionsstempel, bei denen eine kurze Verzögerung bis
+    zur Aktualisierung in allen Workern hinnehmbar ist.
+    """
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_load(self, key, load):
+        """Liefert den gespeicherten Wert oder lädt ihn; None wird nicht gespeichert."""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > now:
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        value = load()
+        if value is not None and self.ttl > 0:
+            with self._lock:
+                self._entries[key] = (now + self.ttl, value)
+        return value
+
+    def pop(self, key):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self):
+        with self._lock:
+            return {'pid': os.getpid(), 'entries': len(self._entries), 'hits': self.hits, 'misses': self.misses}
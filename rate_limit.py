@@ -0,0 +1,159 @@
+import fcntl
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import namedtuple
+
+# Ein Eimer im Speicher: Hash des Schlüssels, verbleibende Marken, Zeitpunkt der letzten Abbuchung
+SLOT = struct.Struct('<Qdd')
+PROBES = 8
+
+# Ergebnis einer Prüfung; retry_after in Sekunden, 0 wenn erlaubt
+Decision = namedtuple('Decision', ['allowed', 'scope', 'retry_after'])
+
+
+def parse_limit(value):
+    """'10/60' -> (10, 60.0): höchstens 10 Versuche am Stück, danach einer je 6 Sekunden."""
+    count, _, seconds = str(value).partition('/')
+    return int(count), float(seconds or 60)
+
+
+class TokenBuckets:
+    """Token-Bucket pro Schlüssel in einer Datei, die alle Worker per mmap teilen.
+
+    Jeder Eimer fasst capacity Marken und füllt sich in per Sekunden
+    vollständig wieder auf. Die Datei ist eine feste Hash-Tabelle mit
+    slots Einträgen, Zugriffe sind per flock zwischen den Prozessen und per
+    Lock zwischen den Threads geschützt. Ein voll aufgefüllter Eimer
+    unterscheidet sich nicht von einem unbenutzten, sein Platz darf daher
+    jederzeit neu vergeben werden. Ist die Tabelle voll, verdrängt ein neuer
+    Schlüssel den Eimer mit den meisten Marken.
+    """
+
+    def __init__(self, path, capacity, per, slots=4096):
+        self.path = path
+        self.capacity = capacity
+        self.rate = capacity / per
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._pid = None
+
+    def _map(self):
+        # Nach einem fork eigene Datei öffnen: flock gilt pro geöffneter Datei,
+        # eine vom Master geerbte würde die Worker nicht gegeneinander sperren
+        if self._pid != os.getpid():
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+            size = self.slots * SLOT.size
+            if os.fstat(fd).st_size != size:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+                os.ftruncate(fd, size)
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            self._fd, self._mmap, self._pid = fd, mmap.mmap(fd, size), os.getpid()
+        return self._fd, self._mmap
+
+    def _key(self, key):
+        # 0 kennzeichnet einen freien Platz
+        return int.from_bytes(hashlib.blake2b(key.encode('utf-8'), digest_size=8).digest(), 'little') or 1
+
+    def _refilled(self, tokens, updated, now):
+        return min(self.capacity, tokens + (now - updated) * self.rate)
+
+    def _find(self, buffer, hashed, now):
+        start = hashed % self.slots
+        candidate, candidate_tokens = None, -1.0
+        for probe in range(PROBES):
+            index = (start + probe) % self.slots
+            stored, tokens, updated = SLOT.unpack_from(buffer, index * SLOT.size)
+            if stored == hashed:
+                return index, self._refilled(tokens, updated, now)
+            tokens = self.capacity if stored == 0 else self._refilled(tokens, updated, now)
+            if tokens > candidate_tokens:
+                candidate, candidate_tokens = index, tokens
+        return candidate, float(self.capacity)
+
+    def take(self, key, cost=1):
+        """Bucht cost Marken von key ab, falls vorhanden.
+
+        Liefert 0 oder die Sekunden, bis wieder genug Marken da sind.
+        """
+        now = time.time()
+        hashed = self._key(key)
+        with self._lock:
+            fd, buffer = self._map()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                index, tokens = self._find(buffer, hashed, now)
+                if tokens < cost:
+                    return (cost - tokens) / self.rate
+                SLOT.pack_into(buffer, index * SLOT.size, hashed, tokens - cost, now)
+                return 0
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+    def reset(self, key=None):
+        """Füllt den Eimer von key wieder auf, ohne key alle."""
+        with self._lock:
+            fd, buffer = self._map()
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if key is None:
+                    buffer[:] = bytes(len(buffer))
+                    return
+                hashed = self._key(key)
+                start = hashed % self.slots
+                for probe in range(PROBES):
+                    index = (start + probe) % self.slots
+                    if SLOT.unpack_from(buffer, index * SLOT.size)[0] == hashed:
+                        SLOT.pack_into(buffer, index * SLOT.size, 0, 0.0, 0.0)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+
+
+def _normalize(username):
+    return (username or '').strip().lower()
+
+
+class LoginLimiter:
+    """Begrenzt Anmeldeversuche je IP-Adresse und je Benutzername.
+
+    check() läuft vor der Passwortprüfung und bucht einen Versuch von beiden
+    Eimern ab; ist einer leer, wird der Versuch ohne Datenbankzugriff und ohne
+    Hashing abgelehnt. Nach einer erfolgreichen Anmeldung ist der Eimer des
+    Benutzernamens wieder voll, damit der echte Inhaber nicht an Fehlversuchen
+    eines Angreifers hängen bleibt.
+    """
+
+    def __init__(self, folder, ip_limit, user_limit):
+        self.ip = TokenBuckets(os.path.join(folder, 'login_ip.buckets'), *ip_limit)
+        self.user = TokenBuckets(os.path.join(folder, 'login_user.buckets'), *user_limit)
+        self.allowed = 0
+        self.throttled = {'ip': 0, 'user': 0}
+
+    def check(self, ip, username):
+        retry_after = self.ip.take(ip or 'unknown')
+        if retry_after:
+            self.throttled['ip'] += 1
+            return Decision(False, 'ip', retry_after)
+        retry_after = self.user.take(_normalize(username))
+        if retry_after:
+            self.throttled['user'] += 1
+            return Decision(False, 'user', retry_after)
+        self.allowed += 1
+        return Decision(True, None, 0)
+
+    def succeeded(self, username):
+        self.user.reset(_normalize(username))
+
+    def reset(self):
+        self.ip.reset()
+        self.user.reset()
+
+    def stats(self):
+        # Zähler pro Worker; die Summe aller Worker steht in /metrics (login_attempts_total)
+        return {'pid': os.getpid(), 'allowed': self.allowed, 'throttled': dict(self.throttled)}
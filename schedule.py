@@ -0,0 +1,193 @@
+from bisect import bisect_left, bisect_right
+from datetime import datetime, time, timedelta
+
+WEEKDAYS = ['Montag', 'Dienstag', 'Mittwoch', 'Donnerstag', 'Freitag', 'Samstag', 'Sonntag']
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+# Obergrenze für die Suche nach der nächsten Öffnung (z.B. lange Betriebsferien)
+MAX_LOOKAHEAD_DAYS = 400
+
+
+def parse_minutes(value):
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+def time_ranges(hours):
+    """Die (öffnet, schließt)-Paare eines Datensatzes in Minuten seit Mitternacht."""
+    if hours.closed:
+        return []
+    ranges = []
+    for open_time, close_time in ((hours.open_time_1, hours.close_time_1),
+                                  (hours.open_time_2, hours.close_time_2)):
+        if open_time and close_time:
+            ranges.append((parse_minutes(open_time), parse_minutes(close_time)))
+    return ranges
+
+
+def _merge(intervals):
+    merged = []
+    for start, end in sorted(intervals):
+        if merged and start <= merged[-1][1]:
+            merged[-1][1] = max(merged[-1][1], end)
+        else:
+            merged.append([start, end])
+    return merged
+
+
+class Schedule:
+    """Vorberechneter Wochenplan mit Ausnahmetagen.
+
+    Die regulären Öffnungszeiten liegen als sortierte, überschneidungsfreie
+    Intervalle in Minuten seit Montag 00:00 vor; Abfragen laufen per
+    Binärsuche. Ein Ausnahmetag (Feiertag, Betriebsferien, Sonderöffnung)
+    ersetzt den regulären Plan für diesen Kalendertag vollständig.
+    Alle Zeiten sind lokale Wandzeit ohne Zeitzone.
+    """
+
+    def __init__(self, weekly, exceptions=None):
+        # weekly: {Wochentag 0-6: [(öffnet, schließt), ...]}, Schließzeit <= Öffnung heißt über Mitternacht
+        intervals = []
+        for weekday, ranges in weekly.items():
+            for open_minute, close_minute in ranges:
+                start = weekday * MINUTES_PER_DAY + open_minute
+                end = weekday * MINUTES_PER_DAY + close_minute
+                if close_minute <= open_minute:
+                    end += MINUTES_PER_DAY
+                if end > MINUTES_PER_WEEK:
+                    # Sonntag über Mitternacht: Rest gehört zum Montag
+                    intervals.append((0, end - MINUTES_PER_WEEK))
+                    end = MINUTES_PER_WEEK
+                intervals.append((start, end))
+        merged = _merge(intervals)
+        self.starts = [start for start, _ in merged]
+        self.ends = [end for _, end in merged]
+
+        # exceptions: {date: [(öffnet, schließt), ...]}, leere Liste heißt geschlossen
+        self.exceptions = {}
+        for day, ranges in (exceptions or {}).items():
+            self.exceptions[day] = [
+                (open_minute, close_minute if close_minute > open_minute else MINUTES_PER_DAY)
+                for open_minute, close_minute in sorted(ranges)
+            ]
+        self.exception_dates = sorted(self.exceptions)
+
+    @classmethod
+    def from_rows(cls, opening_hours, special_hours=()):
+        weekly = {hours.weekday: time_ranges(hours) for hours in opening_hours if hours.weekday is not None}
+        exceptions = {special.date: time_ranges(special) for special in special_hours}
+        return cls(weekly, exceptions)
+
+    @staticmethod
+    def _week_start(moment):
+        return datetime.combine(moment.date() - timedelta(days=moment.weekday()), time())
+
+    @staticmethod
+    def _minute_of_week(moment):
+        return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+    def _wraps(self):
+        # Ein Intervall läuft von Sonntag über Mitternacht in den Montag hinein
+        return len(self.starts) > 1 and self.starts[0] == 0 and self.ends[-1] == MINUTES_PER_WEEK
+
+    def _span(self, week_start, index):
+        start = week_start + timedelta(minutes=self.starts[index])
+        end = week_start + timedelta(minutes=self.ends[index])
+        if self._wraps():
+            if index == 0:
+                start = week_start - timedelta(minutes=MINUTES_PER_WEEK - self.starts[-1])
+            elif index == len(self.starts) - 1:
+                end += timedelta(minutes=self.ends[0])
+        return start, end
+
+    def _regular_interval(self, moment):
+        """Das reguläre Intervall (Beginn, Ende) als datetime, das moment enthält."""
+        minute = self._minute_of_week(moment)
+        index = bisect_right(self.starts, minute) - 1
+        if index >= 0 and minute < self.ends[index]:
+            return self._span(self._week_start(moment), index)
+        return None
+
+    def _regular_starts(self, moment):
+        """Reguläre Öffnungen (Beginn, Ende) nach moment, aufsteigend."""
+        week_start = self._week_start(moment)
+        index = bisect_right(self.starts, self._minute_of_week(moment))
+        while self.starts:
+            if index == len(self.starts):
+                index = 0
+                week_start += timedelta(days=7)
+            # Die Fortsetzung vom Sonntag ist keine eigene Öffnung
+            if not (index == 0 and self._wraps()):
+                yield self._span(week_start, index)
+            index += 1
+
+    def _exception_intervals(self, after):
+        index = bisect_left(self.exception_dates, after.date())
+        for day in self.exception_dates[index:]:
+            midnight = datetime.combine(day, time())
+            for open_minute, close_minute in self.exceptions[day]:
+                yield midnight + timedelta(minutes=open_minute), midnight + timedelta(minutes=close_minute)
+
+    def _clip(self, start, end):
+        # Ausnahmetage überschreiben reguläre Intervalle, die in sie hineinreichen
+        for day in self.exception_dates[bisect_left(self.exception_dates, start.date()):]:
+            midnight = datetime.combine(day, time())
+            if midnight >= end:
+                break
+            if day == start.date():
+                return None
+            return start, midnight
+        return start, end
+
+    def current_interval(self, moment):
+        """Das Intervall (Beginn, Ende), in dem moment liegt, oder None."""
+        moment = moment.replace(second=0, microsecond=0, tzinfo=None)
+        if moment.date() in self.exceptions:
+            midnight = datetime.combine(moment.date(), time())
+            for open_minute, close_minute in self.exceptions[moment.date()]:
+                start = midnight + timedelta(minutes=open_minute)
+                end = midnight + timedelta(minutes=close_minute)
+                if start <= moment < end:
+                    return start, end
+            return None
+        interval = self._regular_interval(moment)
+        if interval:
+            interval = self._clip(*interval)
+        if interval and interval[0] <= moment < interval[1]:
+            return interval
+        return None
+
+    def is_open(self, moment):
+        return self.current_interval(moment) is not None
+
+    def next_opening(self, moment):
+        """Beginn der nächsten Öffnung nach moment, oder None wenn keine in Sicht ist."""
+        moment = moment.replace(second=0, microsecond=0, tzinfo=None)
+        limit = moment + timedelta(days=MAX_LOOKAHEAD_DAYS)
+        candidate = None
+        for start, end in self._regular_starts(moment):
+            if start > limit:
+                break
+            clipped = self._clip(start, end)
+            if clipped:
+                candidate = clipped[0]
+                break
+        for start, _ in self._exception_intervals(moment):
+            if candidate is not None and start >= candidate:
+                break
+            if start > moment:
+                candidate = start
+                break
+        return candidate
+
+    def status(self, moment):
+        interval = self.current_interval(moment)
+        closes_at = interval[1] if interval else None
+        next_opening = self.next_opening(closes_at or moment)
+        return {
+            'open': interval is not None,
+            'closes_at': closes_at,
+            'next_opening': next_opening,
+        }
+
@@ -0,0 +1,245 @@
+// Admin-Speisekarte: seitenweise Liste über /admin/api/menu/items, Anlegen,
+// Bearbeiten und Löschen ohne Neuladen der Seite
+const filterForm = document.getElementById('menu-filter');
+const menuRows = document.getElementById('menu-rows');
+const moreButton = document.getElementById('menu-more');
+const menuStatus = document.getElementById('menu-status');
+const addForm = document.querySelector('.add-form');
+const editModal = document.getElementById('editModal');
+const editForm = document.getElementById('editForm');
+const categoryNames = {};
+// Zuletzt geladene Daten je Zeile, für das Bearbeiten-Formular
+const loadedItems = new Map();
+let nextCursor = null;
+let lastCategory = null;
+let listRequest = 0;
+let filterTimer = null;
+
+document.querySelectorAll('#filter-category option').forEach(option => {
+    if (option.value) categoryNames[option.value] = option.textContent.trim();
+});
+
+function itemUrl(template, id) {
+    return template.replace(/0$/, id);
+}
+
+function showStatus(text, error = false) {
+    menuStatus.textContent = text;
+    menuStatus.classList.toggle('error', error);
+}
+
+function badge(className, text) {
+    const span = document.createElement('span');
+    span.className = `badge ${className}`;
+    span.textContent = text;
+    return span;
+}
+
+function cell(text) {
+    const td = document.createElement('td');
+    td.textContent = text ?? '';
+    return td;
+}
+
+function itemRow(item) {
+    const row = document.createElement('tr');
+    row.dataset.id = item.id;
+    row.dataset.category = item.category_id;
+
+    const select = document.createElement('td');
+    const checkbox = document.createElement('input');
+    checkbox.type = 'checkbox';
+    checkbox.name = 'ids';
+    checkbox.value = item.id;
+    checkbox.setAttribute('form', 'bulk-form');
+    select.appendChild(checkbox);
+
+    const properties = document.createElement('td');
+    properties.className = 'properties';
+    if (item.vegetarian) properties.appendChild(badge('badge-success', 'Vegetarisch'));
+    if (item.vegan) properties.appendChild(badge('badge-success', 'Vegan'));
+    if (item.spicy) properties.appendChild(badge('badge-danger', 'Scharf'));
+
+    const actions = document.createElement('td');
+    const edit = document.createElement('button');
+    edit.type = 'button';
+    edit.className = 'btn btn-primary btn-sm';
+    edit.textContent = 'Bearbeiten';
+    edit.addEventListener('click', () => editItem(item.id));
+    const remove = document.createElement('a');
+    remove.href = itemUrl(filterForm.dataset.deleteUrl, item.id);
+    remove.className = 'btn btn-danger btn-sm';
+    remove.textContent = 'Löschen';
+    remove.addEventListener('click', event => {
+        event.preventDefault();
+        if (confirm('Wirklich löschen?')) deleteItem(item.id, remove.href);
+    });
+    actions.append(edit, ' ', remove);
+
+    row.append(select, cell(item.name), cell(item.description), cell(`${item.price.toFixed(2)} €`),
+               properties, actions);
+    loadedItems.set(item.id, item);
+    return row;
+}
+
+function categoryRow(categoryId) {
+    const row = document.createElement('tr');
+    row.className = 'category-row';
+    const th = document.createElement('th');
+    th.colSpan = 6;
+    th.textContent = categoryNames[categoryId] || '';
+    row.appendChild(th);
+    return row;
+}
+
+function appendItems(items) {
+    const rows = [];
+    items.forEach(item => {
+        // Überschrift, sobald eine neue Kategorie beginnt
+        if (item.category_id !== lastCategory) {
+            rows.push(categoryRow(item.category_id));
+            lastCategory = item.category_id;
+        }
+        rows.push(itemRow(item));
+    });
+    menuRows.append(...rows);
+}
+
+function filterParams() {
+    const params = new URLSearchParams();
+    new FormData(filterForm).forEach((value, name) => {
+        if (String(value).trim() !== '') params.set(name, String(value).trim());
+    });
+    params.set('limit', filterForm.dataset.limit);
+    return params;
+}
+
+function loadItems(reset) {
+    const params = filterParams();
+    if (!reset && nextCursor) params.set('after', nextCursor);
+    const request = ++listRequest;
+    moreButton.disabled = true;
+    fetch(`${filterForm.action}?${params}`, { headers: { Accept: 'application/json' } })
+        .then(response => response.json().then(data => response.ok ? data : Promise.reject(data)))
+        .then(data => {
+            // Antworten älterer Eingaben ignorieren
+            if (request !== listRequest) return;
+            if (reset) {
+                menuRows.replaceChildren();
+                loadedItems.clear();
+                lastCategory = null;
+                showStatus(data.total === 1 ? '1 Menüpunkt' : `${data.total} Menüpunkte`);
+            }
+            appendItems(data.items);
+            nextCursor = data.next;
+            moreButton.hidden = !nextCursor;
+            moreButton.disabled = false;
+        })
+        .catch(error => {
+            if (request !== listRequest) return;
+            moreButton.disabled = false;
+            showStatus((error && error.error) || 'Die Liste konnte nicht geladen werden', true);
+        });
+}
+
+function matchesFilter(item) {
+    const category = filterForm.elements.category.value;
+    return !category || Number(category) === item.category_id;
+}
+
+function send(url, body) {
+    return fetch(url, { method: 'POST', body, headers: { Accept: 'application/json' } })
+        .then(response => response.json().then(data => response.ok ? data : Promise.reject(data)))
+        .catch(error => {
+            showStatus((error && error.error) || 'Die Änderung konnte nicht gespeichert werden', true);
+            return Promise.reject(error);
+        });
+}
+
+function markChanged(row) {
+    row.classList.add('changed');
+    row.scrollIntoView({ block: 'nearest', behavior: 'smooth' });
+}
+
+function editItem(itemId) {
+    const item = loadedItems.get(itemId);
+    editForm.reset();
+    document.getElementById('edit-name').value = item.name;
+    document.getElementById('edit-price').value = item.price.toFixed(2);
+    document.getElementById('edit-category').value = item.category_id;
+    document.getElementById('edit-description').value = item.description || '';
+    document.getElementById('edit-vegetarian').checked = item.vegetarian;
+    document.getElementById('edit-vegan').checked = item.vegan;
+    document.getElementById('edit-spicy').checked = item.spicy;
+    editForm.action = itemUrl(filterForm.dataset.editUrl, itemId);
+    editModal.style.display = 'block';
+}
+
+function deleteItem(itemId, url) {
+    send(url).then(data => {
+        const row = menuRows.querySelector(`tr[data-id="${itemId}"]`);
+        if (row) row.remove();
+        loadedItems.delete(itemId);
+        showStatus(data.message);
+    }).catch(() => {});
+}
+
+addForm.addEventListener('submit', event => {
+    event.preventDefault();
+    send(addForm.action, new FormData(addForm)).then(data => {
+        addForm.reset();
+        showStatus(data.message);
+        if (!matchesFilter(data.item)) return;
+        // Neue Menüpunkte oben, an ihren Platz rücken sie beim nächsten Laden
+        const row = itemRow(data.item);
+        menuRows.prepend(row);
+        markChanged(row);
+    }).catch(() => {});
+});
+
+editForm.addEventListener('submit', event => {
+    event.preventDefault();
+    send(editForm.action, new FormData(editForm)).then(data => {
+        editModal.style.display = 'none';
+        showStatus(data.message);
+        const row = menuRows.querySelector(`tr[data-id="${data.item.id}"]`);
+        if (!row) return;
+        if (matchesFilter(data.item)) {
+            const updated = itemRow(data.item);
+            row.replaceWith(updated);
+            markChanged(updated);
+        } else {
+            row.remove();
+            loadedItems.delete(data.item.id);
+        }
+    }).catch(() => {});
+});
+
+filterForm.addEventListener('input', () => {
+    clearTimeout(filterTimer);
+    filterTimer = setTimeout(() => loadItems(true), 200);
+});
+
+filterForm.addEventListener('submit', event => {
+    event.preventDefault();
+    loadItems(true);
+});
+
+moreButton.addEventListener('click', () => loadItems(false));
+
+document.querySelector('#menu-table .select-all').addEventListener('change', event => {
+    menuRows.querySelectorAll('input[name="ids"]').forEach(checkbox => {
+        checkbox.checked = event.target.checked;
+    });
+});
+
+// Modal schließen
+editModal.querySelector('.close').addEventListener('click', () => {
+    editModal.style.display = 'none';
+});
+
+window.addEventListener('click', event => {
+    if (event.target === editModal) editModal.style.display = 'none';
+});
+
+loadItems(true);
@@ -0,0 +1,80 @@
+// Mobile Menu Toggle
+const menuBtn = document.querySelector('.menu-btn');
+const navLinks = document.querySelector('.nav-links');
+
+menuBtn.addEventListener('click', () => {
+    menuBtn.classList.toggle('open');
+    navLinks.classList.toggle('active');
+});
+
+// Close menu when clicking a link
+document.querySelectorAll('.nav-links a').forEach(link => {
+    link.addEventListener('click', () => {
+        menuBtn.classList.remove('open');
+        navLinks.classList.remove('active');
+    });
+});
+
+// Navbar scroll effect
+window.addEventListener('scroll', () => {
+    const navbar = document.querySelector('.navbar');
+    if (window.scrollY > 50) {
+        navbar.classList.add('scrolled');
+    } else {
+        navbar.classList.remove('scrolled');
+    }
+});
+
+// Live-Status "Jetzt geöffnet" (die Seite selbst ist gecacht, der Status nicht)
+const openStatus = document.getElementById('open-status');
+
+function formatOpening(iso) {
+    const date = new Date(iso);
+    const time = date.toLocaleTimeString('de-DE', { hour: '2-digit', minute: '2-digit', timeZone: 'Europe/Berlin' });
+    const today = new Date().toLocaleDateString('de-DE', { timeZone: 'Europe/Berlin' });
+    if (date.toLocaleDateString('de-DE', { timeZone: 'Europe/Berlin' }) === today) {
+        return `heute ${time} Uhr`;
+    }
+    const day = date.toLocaleDateString('de-DE', { weekday: 'long', timeZone: 'Europe/Berlin' });
+    return `${day} ${time} Uhr`;
+}
+
+// Pfadpräfix des Standorts (z.B. /passau), leer für den Standard-Standort
+const siteRoot = document.body.dataset.root || '';
+
+function updateOpenStatus() {
+    fetch(`${siteRoot}/api/status`)
+        .then(response => response.json())
+        .then(status => {
+            if (status.open) {
+                openStatus.textContent = `Jetzt geöffnet · bis ${formatOpening(status.closes_at).replace('heute ', '')}`;
+            } else if (status.next_opening) {
+                openStatus.textContent = `Geschlossen · öffnet ${formatOpening(status.next_opening)}`;
+            } else {
+                openStatus.textContent = 'Derzeit geschlossen';
+            }
+            openStatus.classList.toggle('open', status.open);
+            openStatus.hidden = false;
+        })
+        .catch(() => {});
+}
+
+if (openStatus) {
+    updateOpenStatus();
+    setInterval(updateOpenStatus, 60000);
+}
+
+// Anzeigetafeln (Seite mit ?live aufrufen): statt regelmäßig neu zu laden
+// nur bei einer Änderung an Speisekarte oder Öffnungszeiten
+if (new URLSearchParams(window.location.search).has('live') && window.EventSource) {
+    const changes = new EventSource(`${siteRoot}/events`);
+    let reloadTimer = null;
+    const reloadSoon = () => {
+        // Mehrere Meldungen einer Admin-Aktion nur einmal beantworten
+        clearTimeout(reloadTimer);
+        reloadTimer = setTimeout(() => window.location.reload(), 1000);
+    };
+    ['menu_item', 'menu_category', 'opening_hours', 'special_opening_hours', 'reset'].forEach(kind => {
+        changes.addEventListener(kind, reloadSoon);
+    });
+}
@@ -0,0 +1,119 @@
+// Suche und Filter auf der Speisekarte über /api/menu/search
+const searchForm = document.getElementById('menu-search');
+const searchResults = document.getElementById('search-results');
+const menuContent = document.querySelector('.menu-content');
+let searchPage = 1;
+let searchTimer = null;
+let searchRequest = 0;
+
+function searchParams() {
+    const params = new URLSearchParams();
+    new FormData(searchForm).forEach((value, name) => {
+        if (String(value).trim() !== '') {
+            params.set(name, String(value).trim());
+        }
+    });
+    return params;
+}
+
+function tag(className, text) {
+    const span = document.createElement('span');
+    span.className = `tag ${className}`;
+    span.textContent = text;
+    return span;
+}
+
+function resultCard(item) {
+    const card = document.createElement('div');
+    card.className = 'menu-item';
+    if (item.image) {
+        const picture = document.createElement('div');
+        picture.className = 'item-image';
+        const img = document.createElement('img');
+        img.src = item.image.src;
+        img.alt = item.name;
+        img.loading = 'lazy';
+        picture.appendChild(img);
+        card.appendChild(picture);
+    }
+    const content = document.createElement('div');
+    content.className = 'item-content';
+    const header = document.createElement('div');
+    header.className = 'item-header';
+    const name = document.createElement('h3');
+    name.textContent = item.name;
+    const price = document.createElement('span');
+    price.className = 'price';
+    price.textContent = `${item.price.toFixed(2)} €`;
+    header.append(name, price);
+    content.appendChild(header);
+    if (item.description) {
+        const description = document.createElement('p');
+        description.className = 'description';
+        description.textContent = item.description;
+        content.appendChild(description);
+    }
+    const tags = document.createElement('div');
+    tags.className = 'item-tags';
+    if (item.vegetarian) tags.appendChild(tag('vegetarian', '🥗 Vegetarisch'));
+    if (item.vegan) tags.appendChild(tag('vegan', '🌱 Vegan'));
+    if (item.spicy) tags.appendChild(tag('spicy', '🌶️ Scharf'));
+    content.appendChild(tags);
+    card.appendChild(content);
+    return card;
+}
+
+function showResults(data) {
+    const summary = searchResults.querySelector('.search-summary');
+    const list = searchResults.querySelector('.menu-items');
+    summary.textContent = data.total === 1 ? '1 Treffer' : `${data.total} Treffer`;
+    if (data.pages > 1) {
+        summary.textContent += ` · Seite ${data.page} von ${data.pages}`;
+    }
+    list.replaceChildren(...data.items.map(resultCard));
+    searchResults.querySelector('[data-page="-1"]').disabled = data.page <= 1;
+    searchResults.querySelector('[data-page="1"]').disabled = data.page >= data.pages;
+    searchResults.querySelector('.search-pages').hidden = data.pages <= 1;
+}
+
+function runSearch() {
+    const params = searchParams();
+    if ([...params.keys()].length === 0) {
+        // Ohne Suchbegriff und Filter wieder die ganze Karte zeigen
+        searchResults.hidden = true;
+        menuContent.hidden = false;
+        return;
+    }
+    params.set('page', searchPage);
+    const request = ++searchRequest;
+    fetch(`${searchForm.action}?${params}`)
+        .then(response => response.ok ? response.json() : Promise.reject(response))
+        .then(data => {
+            // Antworten älterer Eingaben ignorieren
+            if (request !== searchRequest) return;
+            showResults(data);
+            searchResults.hidden = false;
+            menuContent.hidden = true;
+        })
+        .catch(() => {});
+}
+
+if (searchForm) {
+    searchForm.addEventListener('input', () => {
+        searchPage = 1;
+        clearTimeout(searchTimer);
+        searchTimer = setTimeout(runSearch, 200);
+    });
+    searchForm.addEventListener('submit', event => {
+        event.preventDefault();
+        searchPage = 1;
+        runSearch();
+    });
+    searchResults.querySelectorAll('[data-page]').forEach(button => {
+        button.addEventListener('click', () => {
+            searchPage += Number(button.dataset.page);
+            runSearch();
+            searchResults.scrollIntoView({ behavior: 'smooth' });
+        });
+    });
+}
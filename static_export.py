@@ -0,0 +1,155 @@
+import hashlib
+import json
+import os
+import shutil
+import threading
+from collections import namedtuple
+
+MANIFEST = '.export-manifest.json'
+
+# Eine Datei der Ausgabe: relativer Pfad, Namen der Eingaben, von denen sie
+# abhängt, und eine Funktion, die ihren Inhalt als Bytes erzeugt
+Page = namedtuple('Page', ['path', 'inputs', 'render'])
+
+# Ergebnis eines Laufs, jeweils Listen relativer Pfade
+ExportReport = namedtuple('ExportReport', ['written', 'unchanged', 'skipped', 'removed', 'static_copied',
+                                           'static_removed'])
+
+
+def digest(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    return hashlib.sha256(data).hexdigest()
+
+
+class StaticExport:
+    """Schreibt die öffentlichen Seiten als statische Dateien in einen Ordner.
+
+    Jede Seite nennt die Eingaben (z.B. Speisekarte, Öffnungszeiten), aus denen
+    sie entsteht. Im Manifest steht pro Seite der Hash dieser Eingaben und des
+    erzeugten Inhalts: Seiten mit unveränderten Eingaben werden gar nicht erst
+    gerendert, Seiten mit gleichem Ergebnis nicht neu geschrieben. Dateien
+    werden atomar ersetzt, so dass ein parallel laufender Upload nie eine
+    halbe Datei sieht.
+    """
+
+    def __init__(self, folder):
+        self.folder = folder
+        self._lock = threading.Lock()
+
+    def _path(self, relative):
+        return os.path.join(self.folder, *relative.split('/'))
+
+    def load_manifest(self):
+        try:
+            with open(self._path(MANIFEST)) as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {'pages': {}, 'static': {}}
+
+    def _write(self, relative, data):
+        path = self._path(relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+    def _remove(self, relative):
+        try:
+            os.remove(self._path(relative))
+        except FileNotFoundError:
+            pass
+
+    def run(self, pages, inputs, static_folder=None, force=False):
+        """Exportiert pages; inputs ordnet jedem Eingabenamen einen Hash zu.
+
+        Seiten aus einem früheren Lauf, die es nicht mehr gibt (z.B. eine
+        gelöschte Kategorie), werden entfernt.
+        """
+        with self._lock:
+            manifest = self.load_manifest()
+            previous = manifest.get('pages', {})
+            current = {}
+            written, unchanged, skipped = [], [], []
+            for page in pages:
+                key = digest('\n'.join(f'{name}={inputs[name]}' for name in sorted(page.inputs)))
+                old = previous.get(page.path)
+                if not force and old and old['inputs'] == key and os.path.exists(self._path(page.path)):
+                    current[page.path] = old
+                    skipped.append(page.path)
+                    continue
+                data = page.render()
+                content = digest(data)
+                if old and old['content'] == content and os.path.exists(self._path(page.path)):
+                    unchanged.append(page.path)
+                else:
+                    self._write(page.path, data)
+                    written.append(page.path)
+                current[page.path] = {'inputs': key, 'content': content}
+
+            removed = sorted(set(previous) - set(current))
+            for relative in removed:
+                self._remove(relative)
+
+            static_copied, static_removed = [], []
+            static = manifest.get('static', {})
+            if static_folder:
+                static, static_copied, static_removed = self._sync_static(static_folder, static)
+
+            self._write(MANIFEST, json.dumps({'pages': current, 'static': static}, indent=1,
+                                             sort_keys=True).encode())
+            return ExportReport(written, unchanged, skipped, removed, static_copied, static_removed)
+
+    def _sync_static(self, static_folder, previous):
+        # Kopiert nur neue oder geänderte Dateien (Größe und Änderungszeit)
+        # und entfernt, was im static-Ordner nicht mehr existiert
+        current, copied = {}, []
+        for root, directories, files in os.walk(static_folder):
+            directories.sort()
+            for name in sorted(files):
+                # Vorkomprimierte Geschwister braucht der Export nicht, das CDN komprimiert selbst
+                if name.endswith(('.gz', '.br')):
+                    continue
+                source = os.path.join(root, name)
+                relative = 'static/' + os.path.relpath(source, static_folder).replace(os.sep, '/')
+                stat = os.stat(source)
+                signature = [stat.st_size, stat.st_mtime_ns]
+                current[relative] = signature
+                if previous.get(relative) == signature and os.path.exists(self._path(relative)):
+                    continue
+                target = self._path(relative)
+                os.makedirs(os.path.dirname(target), exist_ok=True)
+                tmp_path = f'{target}.{os.getpid()}.tmp'
+                shutil.copy2(source, tmp_path)
+                os.replace(tmp_path, target)
+                copied.append(relative)
+        removed = sorted(set(previous) - set(current))
+        for relative in removed:
+            self._remove(relative)
+        return current, copied, removed
+
+
+def netlify_headers(roots=('',)):
+    """Cache-Regeln für Netlify: gehashte Assets unbegrenzt, auch unter den
+    Pfadpräfixen roots (z.B. '/zweite'). Alles andere behält Netlifys Vorgabe
+    (revalidieren), weil sich dort mehrere Regeln addieren würden."""
+    return ''.join(f'{root}/static/dist/*\n  Cache-Control: public, max-age=31536000, immutable\n'
+                   for root in roots).encode()
+
+
+def netlify_redirects(rewrites, origin=None, proxied=(), forwarded=()):
+    """Regeln für Netlify (_redirects).
+
+    rewrites bildet Pfade ohne Endung auf exportierte Dateien ab. Mit origin
+    werden proxied (z.B. /api/status) vom Flask-Server durchgereicht und
+    forwarded (z.B. /admin/*) dorthin umgeleitet. Netlify wendet die erste
+    passende Regel an, deshalb stehen die Pfade des Servers vorne.
+    """
+    lines = []
+    if origin:
+        origin = origin.rstrip('/')
+        lines += [f'{path}  {origin}{path.replace("*", ":splat")}  200' for path in proxied]
+        lines += [f'{path}  {origin}{path.replace("*", ":splat")}  302' for path in forwarded]
+    lines += [f'{source}  {target}  200' for source, target in rewrites]
+    return ('\n'.join(lines) + '\n').encode()
@@ -0,0 +1,41 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# app liest die Konfiguration beim Import: eigene Datenbank, keine Job-Threads
+_database = tempfile.NamedTemporaryFile(prefix='restaurant-test-', suffix='.db', delete=False)
+_database.close()
+os.environ['DATABASE_URL'] = f'sqlite:///{_database.name}'
+os.environ['JOB_WORKERS'] = '0'
+
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app, init_db
+
+    with app.app_context():
+        init_db()
+    yield app
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.remove(_database.name + suffix)
+        except FileNotFoundError:
+            pass
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def admin_client(app):
+    client = app.test_client()
+    response = client.post('/login', data={'username': 'admin', 'password': 'admin'})
+    assert response.status_code == 302
+    return client
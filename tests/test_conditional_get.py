@@ -0,0 +1,78 @@
+from contextlib import contextmanager
+
+import pytest
+from flask import template_rendered
+from sqlalchemy import event
+
+from app import db, MenuCategory, MenuItem
+
+PAGES = ['/', '/menu']
+
+
+@contextmanager
+def recorded(app):
+    """Zählt SQL-Anweisungen und gerenderte Templates innerhalb des Blocks."""
+    counts = {'statements': 0, 'templates': 0}
+
+    def statement(*args):
+        counts['statements'] += 1
+
+    def rendered(sender, **extra):
+        counts['templates'] += 1
+
+    with app.app_context():
+        engine = db.engine
+    event.listen(engine, 'before_cursor_execute', statement)
+    template_rendered.connect(rendered, app)
+    try:
+        yield counts
+    finally:
+        template_rendered.disconnect(rendered, app)
+        event.remove(engine, 'before_cursor_execute', statement)
+
+
+def fetch(client, path, **headers):
+    # Gestreamte Seiten landen erst nach vollständigem Lesen im Cache
+    response = client.get(path, headers=headers)
+    response.get_data()
+    response.close()
+    return response
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_if_none_match_answers_304_without_sql_or_templates(app, client, path):
+    etag = fetch(client, path).headers['ETag']
+    with recorded(app) as counts:
+        response = fetch(client, path, **{'If-None-Match': etag})
+    assert response.status_code == 304
+    assert counts == {'statements': 0, 'templates': 0}
+
+
+@pytest.mark.parametrize('path', PAGES)
+def test_if_modified_since_answers_304_without_sql_or_templates(app, client, path):
+    last_modified = fetch(client, path).headers['Last-Modified']
+    with recorded(app) as counts:
+        response = fetch(client, path, **{'If-Modified-Since': last_modified})
+    assert response.status_code == 304
+    assert counts == {'statements': 0, 'templates': 0}
+
+
+def test_admin_edit_changes_etag(app, client, admin_client):
+    with app.app_context():
+        category = MenuCategory.query.first()
+        item = MenuItem(name='Testgericht', description='', price=9.5, category_id=category.id,
+                        location_id=category.location_id)
+        db.session.add(item)
+        db.session.commit()
+        item_id, category_id = item.id, category.id
+    etag = fetch(client, '/menu').headers['ETag']
+    assert fetch(client, '/menu', **{'If-None-Match': etag}).status_code == 304
+
+    response = admin_client.post(f'/admin/menu/edit/{item_id}', data={
+        'name': 'Testgericht neu', 'description': '', 'price': '10.5', 'category': category_id})
+    assert response.status_code < 400
+
+    response = fetch(client, '/menu', **{'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    assert 'Testgericht neu' in response.get_data(as_text=True)
@@ -0,0 +1,119 @@
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+from io import BytesIO
+
+import images
+
+# Dateinamen im Store: <digest>-<breite>.<endung> bzw. <digest>.json als Manifest
+DIGEST_LENGTH = 32
+_STORED_NAME = re.compile(r'^([0-9a-f]{%d})(?:-\d+\.\w+|\.json)$' % DIGEST_LENGTH)
+
+
+def is_immutable(filename):
+    """True für Dateien, deren Name aus dem Inhalt abgeleitet ist."""
+    return bool(_STORED_NAME.match(os.path.basename(filename)))
+
+
+class UploadStore:
+    """Inhaltsadressierter Ablageort für hochgeladene Bilder.
+
+    Dateien werden nach dem SHA-256 des Originals benannt. Identische
+    Uploads landen deshalb nur einmal auf der Platte; die Varianten werden
+    dann aus dem Manifest <digest>.json wiederverwendet, statt sie neu zu
+    berechnen. Ob eine Datei noch gebraucht wird, entscheidet der Aufrufer
+    anhand der Datenbank.
+    """
+
+    def __init__(self, folder, url_prefix='uploads'):
+        self.folder = folder
+        self.url_prefix = url_prefix
+
+    def _manifest_path(self, digest):
+        return os.path.join(self.folder, f'{digest}.json')
+
+    def save(self, file):
+        data = file.read()
+        digest = hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+        manifest_path = self._manifest_path(digest)
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                variants = json.load(f)
+            paths = [manifest_path] + [os.path.join(self.folder, os.path.basename(path))
+                                       for path in images.variant_files(variants)]
+            if all(os.path.exists(path) for path in paths):
+                # Zeitstempel erneuern, damit die Aufräumfunktion den wiederverwendeten
+                # Satz nicht vor dem Commit des neuen Gerichts entfernt
+                for path in paths:
+                    os.utime(path)
+                return variants
+
+        os.makedirs(self.folder, exist_ok=True)
+        # In einem temporären Ordner erzeugen und erst danach verschieben, damit
+        # parallele Uploads desselben Bildes keine halbfertigen Dateien sehen
+        tmp_dir = tempfile.mkdtemp(dir=self.folder, prefix='.tmp-')
+        try:
+            variants = images.make_variants(BytesIO(data), tmp_dir, digest, url_prefix=self.url_prefix)
+            for name in os.listdir(tmp_dir):
+                os.replace(os.path.join(tmp_dir, name), os.path.join(self.folder, name))
+            # Das Manifest zuletzt schreiben: es markiert den Satz als vollständig
+            tmp_manifest = os.path.join(tmp_dir, 'manifest.json')
+            with open(tmp_manifest, 'w') as f:
+                json.dump(variants, f)
+            os.replace(tmp_manifest, manifest_path)
+        finally:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+        return variants
+
+    def files_for(self, image_path, variants):
+        """Absolute Pfade aller Dateien, die zu einem Bild gehören."""
+        names = {os.path.basename(path) for path in images.variant_files(variants)}
+        if image_path:
+            names.add(os.path.basename(image_path))
+        match = _STORED_NAME.match(os.path.basename(image_path or ''))
+        if match:
+            names.add(f'{match.group(1)}.json')
+        return [os.path.join(self.folder, name) for name in sorted(names)]
+
+    def remove(self, image_path, variants, min_age=0):
+        """Löscht die Dateien eines Bildes; liefert False, wenn sie bleiben.
+
+        Ist eine Datei jünger als min_age Sekunden, hat save() den Satz gerade
+        erst angelegt oder wiederverwendet und ein neues Gericht verweist
+        womöglich gleich darauf. Dann bleibt alles liegen; verwaiste Dateien
+        entfernt später "flask gc-uploads".
+        """
+        paths = [path for path in self.files_for(image_path, variants) if os.path.exists(path)]
+        cutoff = time.time() - min_age
+        if any(os.path.getmtime(path) > cutoff for path in paths):
+            return False
+        # Manifest zuerst löschen, damit ein unvollständiger Satz nie wiederverwendet wird
+        for path in sorted(paths, key=lambda p: not p.endswith('.json')):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+        return True
+
+    def orphans(self, referenced, min_age=3600):
+        """Dateien im Store, die in referenced (Menge von Dateinamen) nicht vorkommen.
+
+        Dateien jünger als min_age Sekunden werden ausgelassen, weil sie zu
+        einem Upload gehören können, dessen Commit noch aussteht.
+        """
+        if not os.path.isdir(self.folder):
+            return []
+        cutoff = time.time() - min_age
+        result = []
+        for name in sorted(os.listdir(self.folder)):
+            path = os.path.join(self.folder, name)
+            if name in referenced or not os.path.isfile(path):
+                continue
+            if os.path.getmtime(path) > cutoff:
+                continue
+            result.append(path)
+        return result
@@ -1,5 +1,6 @@
-from app import app, init_db
+# Einstiegspunkt für gunicorn (siehe gunicorn_config.py). Der Import ist frei
+# von Datenbankzugriffen; das Schema legt "flask --app app init-db" an.
+from app import app
 
 if __name__ == "__main__":
-    init_db()
     app.run()